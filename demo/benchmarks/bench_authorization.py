@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Authorization Token Verification Benchmark
+
+Verifies a settlement's worth of signed authorization tokens three ways:
+    - one by one: TokenVerifier.verify with the cache disabled
+    - batched: one TokenVerifier.verify_many call, cache cold
+    - cached: the same batch again, as retries and the re-checks made
+      under the mandate locks see it
+
+Usage:
+    python benchmarks/bench_authorization.py [--tokens 2000] [--users 100]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from shared.authorization import AuthorizationSigner, TokenVerifier, mandate_digest
+from shared.money import Money
+
+
+def signed_checks(count: int, users: int) -> list[tuple[str, bytes, str]]:
+    signers = [AuthorizationSigner.for_demo_user(f"user_{u}") for u in range(users)]
+    checks = []
+    for i in range(count):
+        user_id = f"user_{i % users}"
+        digest = mandate_digest(f"MND-{i:08x}", user_id, "flight_merchant_agent", Money(95200 + i, "USD"))
+        checks.append((signers[i % users].sign(digest), digest, user_id))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    checks = signed_checks(args.tokens, args.users)
+    print(f"tokens={args.tokens} users={args.users}")
+
+    verifier = TokenVerifier(demo_keys=True, cache_size=0)
+    start = time.perf_counter()
+    for check in checks:
+        verifier.verify(*check)
+    one_by_one = time.perf_counter() - start
+
+    verifier = TokenVerifier(demo_keys=True)
+    start = time.perf_counter()
+    assert not any(verifier.verify_many(checks))
+    batched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert not any(verifier.verify_many(checks))
+    cached = time.perf_counter() - start
+
+    print(f"{'mode':<12}{'seconds':>10}{'tokens/s':>14}{'us/token':>10}")
+    for mode, seconds in (("one by one", one_by_one), ("batched", batched), ("cached", cached)):
+        print(f"{mode:<12}{seconds:>10.3f}{args.tokens / seconds:>14,.0f}{seconds / args.tokens * 1e6:>10.1f}")
+    print(f"cache speedup: {batched / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
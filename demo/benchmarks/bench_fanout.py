@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Multi-Merchant Search Benchmark
+
+Starts N stub A2A merchants on a local server, each answering
+search_flights after a fixed latency with an overlapping set of offers,
+and searches them one after another and then all at once with
+fan_out_search. Some merchants can be made slower than the deadline to
+show partial results.
+
+Usage:
+    python benchmarks/bench_fanout.py [--merchants 8] [--latency-ms 100] [--slow 1] [--deadline-ms 500]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from shopper_agent.a2a_client import A2AClient
+from shopper_agent.fanout import fan_out_search, merge_offers, search_merchant
+
+AIRLINES = ["SkyHigh Airways", "Budget Air", "Premium Jets", "Coastal Wings"]
+
+
+def make_flights(merchant: int, shared: int, own: int) -> list[dict]:
+    """Flights every merchant sells (at its own price) plus some only it sells."""
+    rng = random.Random(merchant)
+    flights = []
+    for i in range(shared + own):
+        departure_hour = 6 + i % 16
+        # Shared offers match across merchants; the rest depart on a day of their own
+        day = f"2026-03-{15 + i // 16:02d}" if i < shared else f"2026-04-{merchant % 28 + 1:02d}"
+        flights.append({
+            "flight_id": f"M{merchant}F{i:03d}",
+            "airline": AIRLINES[i % len(AIRLINES)],
+            "origin": "SFO",
+            "destination": "JFK",
+            "departure": f"{day}T{departure_hour:02d}:00",
+            "arrival": f"{day}T{(departure_hour + 5) % 24:02d}:30",
+            "price": round(300 + 10 * (i % 20) + rng.uniform(-25, 25), 2),
+            "class": "economy",
+            "seats_available": 9,
+        })
+    return flights
+
+
+def build_app(latencies: list[float], flights: list[list[dict]]) -> Starlette:
+    """One route per merchant, answering like an ADK agent over A2A."""
+    def endpoint(merchant: int):
+        async def rpc(request: Request) -> JSONResponse:
+            body = await request.json()
+            await asyncio.sleep(latencies[merchant])
+            response = {"status": "success", "flights": flights[merchant], "count": len(flights[merchant])}
+            part = {
+                "kind": "data",
+                "data": {"id": "call", "name": "search_flights", "response": response},
+                "metadata": {"adk_type": "function_response"},
+            }
+            task = {
+                "kind": "task",
+                "id": "task",
+                "contextId": "context",
+                "status": {"state": "completed"},
+                "history": [{"kind": "message", "role": "agent", "messageId": "m", "parts": [part]}],
+            }
+            return JSONResponse({"jsonrpc": "2.0", "id": body["id"], "result": task})
+        return rpc
+
+    return Starlette(routes=[
+        Route(f"/a2a/merchant_{i}", endpoint(i), methods=["POST"]) for i in range(len(latencies))
+    ])
+
+
+def serve(app: Starlette) -> tuple[uvicorn.Server, int]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, port
+
+
+async def run(clients: dict[str, A2AClient], deadline: float) -> None:
+    arguments = {"origin": "SFO", "destination": "JFK"}
+
+    # Warm up the connection pool so neither mode pays for connecting
+    await fan_out_search(clients, arguments, deadline)
+
+    start = time.perf_counter()
+    sequential = [
+        await search_merchant(merchant, client, arguments, deadline)
+        for merchant, client in clients.items()
+    ]
+    sequential_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    searches = await fan_out_search(clients, arguments, deadline)
+    fan_out_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    offers = merge_offers(searches)
+    merge_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{'merchant':<14}{'status':>10}{'offers':>8}{'ms':>10}")
+    for search in searches:
+        summary = search.summary()
+        print(f"{search.merchant:<14}{search.status:>10}{summary['offers']:>8}{summary['elapsed_ms']:>10}")
+
+    answered = sum(1 for search in searches if search.status == "ok")
+    received = sum(len(search.flights) for search in searches)
+    print(f"answered: {answered}/{len(searches)}  offers received: {received}  "
+          f"after dedupe: {len(offers)}  merge: {merge_ms:.2f}ms")
+    print(f"{'mode':<12}{'seconds':>10}")
+    print(f"{'sequential':<12}{sequential_seconds:>10.3f}")
+    print(f"{'fan-out':<12}{fan_out_seconds:>10.3f}")
+    print(f"speedup: {sequential_seconds / fan_out_seconds:.1f}x")
+
+    assert all(s.status == f.status for s, f in zip(sequential, searches))
+    for client in clients.values():
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--merchants", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="response time of a normal merchant")
+    parser.add_argument("--slow", type=int, default=1, help="merchants that answer after the deadline")
+    parser.add_argument("--deadline-ms", type=float, default=500.0, help="per-merchant deadline")
+    parser.add_argument("--shared", type=int, default=40, help="offers sold by every merchant")
+    parser.add_argument("--own", type=int, default=10, help="offers sold by one merchant only")
+    args = parser.parse_args()
+
+    deadline = args.deadline_ms / 1000
+    latencies = [
+        deadline * 2 if i >= args.merchants - args.slow else args.latency_ms / 1000
+        for i in range(args.merchants)
+    ]
+    flights = [make_flights(i, args.shared, args.own) for i in range(args.merchants)]
+
+    server, port = serve(build_app(latencies, flights))
+    clients = {
+        f"merchant_{i}": A2AClient(f"http://127.0.0.1:{port}/a2a/merchant_{i}", retries=0)
+        for i in range(args.merchants)
+    }
+
+    print(f"merchants={args.merchants} (slow={args.slow}) latency={args.latency_ms}ms "
+          f"deadline={args.deadline_ms}ms offers/merchant={args.shared + args.own}")
+    try:
+        asyncio.run(run(clients, deadline))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
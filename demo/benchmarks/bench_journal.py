@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Mandate Journal Benchmark
+
+Writes a journal shaped like real merchant traffic (each mandate is
+created, authorized and completed, then gets a booking and a receipt),
+from several threads at once so their commits group, and then replays
+it: first the raw event scan, which should beat SCAN_TARGET, then a
+full JournaledMandateStore restore, which also decodes every record.
+
+Usage:
+    python benchmarks/bench_journal.py [--mandates 100000] [--threads 8] [--no-fsync]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from merchant_agent.journal import EventLog
+from merchant_agent.store import JournaledMandateStore
+from shared.ap2_types import LineItem, PaymentMandate, PaymentStatus
+
+EVENTS_PER_MANDATE = 5
+
+# Replay scan throughput the journal is built for (events/s, see
+# merchant_agent/journal.py); a restore also decodes every record, so
+# it runs well below this
+SCAN_TARGET = 750_000
+
+
+def make_mandate(i: int) -> PaymentMandate:
+    created = datetime(2025, 3, 1) + timedelta(seconds=i)
+    mandate = PaymentMandate.trusted(
+        mandate_id=str(uuid.UUID(int=i)),
+        shopper_agent_id="travel_shopper_agent",
+        merchant_agent_id="flight_merchant_agent",
+        user_id=f"user_{i % 1000:05d}",
+        line_items=[
+            LineItem.trusted(description=f"Flight FL{i % 500:03d}: SFO → CDG", unit_price=850.00),
+            LineItem.trusted(description="Taxes and fees", unit_price=102.00),
+        ],
+        created_at=created,
+        merchant_reference=f"FL{i % 500:03d}",
+        description="Flight booking for Demo User",
+    )
+    mandate.set_ttl(900)
+    return mandate
+
+
+def settle(store: JournaledMandateStore, i: int) -> None:
+    """One mandate's lifecycle: five journal events, three commits."""
+    mandate = make_mandate(i)
+    store.save_mandate(mandate)
+    mandate.authorize(f"auth_{i:012x}")
+    store.save_mandate(mandate)
+    with store.batch():
+        mandate.status = PaymentStatus.COMPLETED
+        store.save_mandate(mandate)
+        booking_id = f"BK{i:08d}"
+        store.save_booking({
+            "booking_id": booking_id,
+            "mandate_id": mandate.mandate_id,
+            "flight_id": mandate.merchant_reference,
+            "passenger_name": "Demo User",
+            "status": "confirmed",
+            "transaction_id": f"txn_{i:012x}",
+        })
+        store.save_receipt(mandate.mandate_id, f"idem_{i}", {
+            "status": "success",
+            "booking_id": booking_id,
+            "transaction_id": f"txn_{i:012x}",
+        })
+
+
+def write(path: str, mandates: int, threads: int, fsync: bool) -> tuple[float, int]:
+    store = JournaledMandateStore(path, fsync=fsync)
+
+    def worker(offset: int) -> None:
+        for i in range(offset, mandates, threads):
+            settle(store, i)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    seconds = time.perf_counter() - start
+    commits = store._log.commits
+    store.close()
+    return seconds, commits
+
+
+def scan(path: str, events: int) -> float:
+    """Return the seconds to replay every event of the journal (best of three runs)."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        replayed = sum(1 for _ in EventLog(path).replay())
+        best = min(best, time.perf_counter() - start)
+        assert replayed == events
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mandates", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=8, help="concurrent writers")
+    parser.add_argument("--no-fsync", action="store_true", help="commit to the OS only")
+    args = parser.parse_args()
+    events = args.mandates * EVENTS_PER_MANDATE
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "merchant.journal")
+        seconds, commits = write(path, args.mandates, args.threads, not args.no_fsync)
+        size = os.path.getsize(path)
+        print(f"{args.mandates:,} mandates, {events:,} events, {size / 1e6:.1f} MB, "
+              f"fsync={'off' if args.no_fsync else 'on'}")
+        print(f"write:   {events / seconds:>12,.0f} events/s  "
+              f"({commits:,} commits for {args.mandates * 3:,} durable writes, "
+              f"{events / commits:.1f} events/commit)")
+
+        seconds = scan(path, events)
+        print(f"scan:    {events / seconds:>12,.0f} events/s  ({seconds:.2f}s, best of three; "
+              f"target {SCAN_TARGET:,} events/s)")
+
+        start = time.perf_counter()
+        store = JournaledMandateStore(path)
+        seconds = time.perf_counter() - start
+        store.close()
+        assert len(store.mandates) == len(store.bookings) == len(store.receipts) == args.mandates
+        assert all(mandate.status == PaymentStatus.COMPLETED for mandate in store.mandates.values())
+        print(f"restore: {events / seconds:>12,.0f} events/s  ({seconds:.2f}s, "
+              f"{args.mandates / seconds:,.0f} mandates/s rebuilt)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Mandate Memory Benchmark
+
+Builds the same settled mandates as pydantic PaymentMandate models and
+as compact MandateRecords, and reports the bytes each representation
+allocates per mandate (measured with tracemalloc).
+
+Usage:
+    python benchmarks/bench_mandate_memory.py [--count 100000] [--items 2]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from shared.ap2_types import LineItem, PaymentMandate, PaymentStatus
+from shared.records import MandateRecord
+
+
+def build_mandates(count: int, items: int) -> list[PaymentMandate]:
+    """Settled mandates shaped like the merchant's flight bookings."""
+    created = datetime(2025, 3, 1)
+    mandates = []
+    for i in range(count):
+        mandate = PaymentMandate.trusted(
+            mandate_id=str(uuid.UUID(int=i)),
+            shopper_agent_id="travel_shopper_agent",
+            merchant_agent_id="flight_merchant_agent",
+            user_id=f"user_{i % 1000:05d}",
+            line_items=[
+                LineItem.trusted(description=f"Flight FL{i % 500:03d}: SFO → CDG", unit_price=850.00 + i % 100),
+                *(LineItem.trusted(description="Taxes and fees", unit_price=102.00) for _ in range(items - 1)),
+            ],
+            status=PaymentStatus.COMPLETED,
+            user_authorization_token=f"auth_{i:012x}",
+            authorization_timestamp=created + timedelta(seconds=i, milliseconds=500),
+            expires_at=created + timedelta(seconds=i + 900),
+            created_at=created + timedelta(seconds=i),
+            merchant_reference=f"FL{i % 500:03d}",
+            description="Flight booking for Demo User",
+        )
+        mandate.total_minor  # warm the cached total, as a settled mandate has
+        mandates.append(mandate)
+    return mandates
+
+
+def measure(build) -> tuple[object, int]:
+    """Return build()'s result and the bytes still allocated for it."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=2, help="line items per mandate")
+    args = parser.parse_args()
+
+    # Source strings shared by both representations are built up front,
+    # so each side is charged only for what it allocates itself
+    mandates, model_bytes = measure(lambda: build_mandates(args.count, args.items))
+    records, record_bytes = measure(lambda: [MandateRecord.from_model(m) for m in mandates])
+
+    # Lossless round trip
+    for mandate, record in zip(mandates[:1000], records[:1000]):
+        assert record.to_model() == mandate
+        assert record.to_model().to_summary() == mandate.to_summary()
+
+    # The records reuse the models' strings and datetimes; count the
+    # bytes of those shared objects too so the comparison is fair
+    _, shared_bytes = measure(lambda: [
+        (m.mandate_id, m.user_authorization_token, m.description, m.user_id, m.merchant_reference,
+         m.created_at, m.expires_at, m.authorization_timestamp,
+         [item.description for item in m.line_items])
+        for m in build_mandates(args.count, args.items)
+    ])
+
+    print(f"{args.count:,} settled mandates x {args.items} line items")
+    print(f"{'representation':<18}{'bytes/mandate':>15}")
+    print(f"{'pydantic models':<18}{model_bytes / args.count:>15,.0f}")
+    print(f"{'MandateRecord':<18}{(record_bytes + shared_bytes) / args.count:>15,.0f}")
+    print(f"saving: {1 - (record_bytes + shared_bytes) / model_bytes:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+PaymentMandate Construction Benchmark
+
+Compares mandates per second for the validated construction path
+(LineItem/PaymentMandate constructors) against the trusted path
+(LineItem.trusted/PaymentMandate.trusted) used by the merchant, each
+followed by the to_summary() call create_booking_mandate makes.
+
+Usage:
+    python benchmarks/bench_mandates.py [--count 50000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from shared.ap2_types import LineItem, PaymentMandate
+
+
+FLIGHT = {"flight_id": "FL001", "origin": "SFO", "destination": "CDG", "price": 850.00}
+
+
+def build_validated(flight: dict) -> dict:
+    mandate = PaymentMandate(
+        shopper_agent_id="travel_shopper_agent",
+        merchant_agent_id="flight_merchant_agent",
+        user_id="user_12345",
+        line_items=[
+            LineItem(
+                description=f"Flight {flight['flight_id']}: {flight['origin']} → {flight['destination']}",
+                unit_price=flight["price"],
+            ),
+            LineItem(description="Taxes and fees", unit_price=round(flight["price"] * 0.12, 2)),
+        ],
+        description="Flight booking for Demo User",
+        merchant_reference=flight["flight_id"],
+    )
+    summary = mandate.to_summary()
+    prompt = f"Do you authorize payment of USD {mandate.total_amount:.2f}?"
+    return {"mandate": summary, "prompt": prompt}
+
+
+def build_trusted(flight: dict) -> dict:
+    mandate = PaymentMandate.trusted(
+        shopper_agent_id="travel_shopper_agent",
+        merchant_agent_id="flight_merchant_agent",
+        user_id="user_12345",
+        line_items=[
+            LineItem.trusted(
+                description=f"Flight {flight['flight_id']}: {flight['origin']} → {flight['destination']}",
+                unit_price=flight["price"],
+            ),
+            LineItem.trusted(description="Taxes and fees", unit_price=round(flight["price"] * 0.12, 2)),
+        ],
+        description="Flight booking for Demo User",
+        merchant_reference=flight["flight_id"],
+    )
+    summary = mandate.to_summary()
+    prompt = f"Do you authorize payment of {summary['total']}?"
+    return {"mandate": summary, "prompt": prompt}
+
+
+def measure(build, count: int) -> float:
+    """Return mandates per second (best of three runs)."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(count):
+            build(FLIGHT)
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # Both paths must describe the same mandate
+    assert build_validated(FLIGHT)["mandate"]["total"] == build_trusted(FLIGHT)["mandate"]["total"]
+
+    validated = measure(build_validated, args.count)
+    trusted = measure(build_trusted, args.count)
+
+    print(f"{'path':<12}{'mandates/s':>14}")
+    print(f"{'validated':<12}{validated:>14,.0f}")
+    print(f"{'trusted':<12}{trusted:>14,.0f}")
+    print(f"speedup: {trusted / validated:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
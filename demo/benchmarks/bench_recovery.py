@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Merchant Recovery Benchmark
+
+Builds journals with a growing history and measures how long a
+JournaledMandateStore takes to start from them: once replaying the
+whole journal, and once from a snapshot plus a short journal tail.
+
+Every booked mandate leaves five events behind (created, authorized,
+completed, booking, receipt) and every abandoned checkout three
+(created, expired, evicted); a snapshot keeps one record per mandate,
+booking and receipt and nothing of abandoned checkouts. Settled
+records go to the cold segment, which startup skips; "cold load" is
+the one-off cost of the first lookup that needs it.
+
+Usage:
+    python benchmarks/bench_recovery.py [--sizes 10000 50000 100000] [--tail 1000] [--abandoned 1.0]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_journal import make_mandate, settle
+from merchant_agent.store import JournaledMandateStore
+
+
+def abandon(store: JournaledMandateStore, i: int) -> None:
+    """A checkout that is never paid: created, expired, evicted."""
+    mandate = make_mandate(i)
+    store.save_mandate(mandate)
+    mandate.expire()
+    store.save_mandate(mandate)
+    store.evict_mandate(mandate.mandate_id)
+
+
+def build_history(store: JournaledMandateStore, first: int, count: int, abandoned: float) -> None:
+    abandon_every = 1 / abandoned if abandoned else 0
+    carry = 0.0
+    for i in range(first, first + count):
+        settle(store, i)
+        store.save_seats(f"FL{i % 500:03d}", 100 - i % 100)
+        if abandon_every:
+            carry += abandoned
+            while carry >= 1:
+                abandon(store, 10_000_000 + i)
+                carry -= 1
+
+
+def restart_seconds(path: str) -> tuple[float, float, int]:
+    """Seconds to start, then to load the cold segment (by counting every mandate), and that count."""
+    start = time.perf_counter()
+    store = JournaledMandateStore(path, fsync=False)
+    seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    mandates = store.count_mandates()
+    cold_seconds = time.perf_counter() - start
+    store.close()
+    return seconds, cold_seconds, mandates
+
+
+def journal_bytes(path: str) -> int:
+    return sum(os.path.getsize(file) for file in glob.glob(f"{path}*"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000],
+                        help="booked mandates in the history")
+    parser.add_argument("--tail", type=int, default=1000, help="mandates booked after the snapshot")
+    parser.add_argument("--abandoned", type=float, default=1.0, help="abandoned checkouts per booking")
+    args = parser.parse_args()
+
+    print(f"{'history':>10}{'events':>12}{'journal s':>12}{'journal MB':>12}"
+          f"{'snapshot s':>12}{'snapshot MB':>13}{'speedup':>9}{'cold load s':>13}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            journal_path = os.path.join(directory, "journal-only")
+            snapshot_path = os.path.join(directory, "snapshotted")
+            for path, snapshot in ((journal_path, False), (snapshot_path, True)):
+                store = JournaledMandateStore(path, fsync=False)
+                build_history(store, 0, size - args.tail, args.abandoned)
+                if snapshot:
+                    store.snapshot()
+                build_history(store, size - args.tail, args.tail, args.abandoned)
+                store.close()
+
+            events = size * 5 + int(size * args.abandoned) * 3
+            journal_seconds, _, journal_mandates = restart_seconds(journal_path)
+            snapshot_seconds, cold_seconds, snapshot_mandates = restart_seconds(snapshot_path)
+            assert journal_mandates == snapshot_mandates == size
+            print(f"{size:>10,}{events:>12,}{journal_seconds:>12.2f}{journal_bytes(journal_path) / 1e6:>12.1f}"
+                  f"{snapshot_seconds:>12.2f}{journal_bytes(snapshot_path) / 1e6:>13.1f}"
+                  f"{journal_seconds / snapshot_seconds:>8.1f}x{cold_seconds:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Seat Reservation Stress Benchmark
+
+Hammers SeatInventory from many threads with a mix of commits,
+cancellations and expiring holds, then checks that no flight was
+oversold and that every seat is accounted for.
+
+Usage:
+    python benchmarks/bench_seat_reservations.py [--threads 32] [--flights 8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from merchant_agent.catalog import FlightCatalog
+from merchant_agent.seats import HoldExpiredError, SeatInventory, SeatUnavailableError
+
+
+def make_catalog(flights: int, seats: int) -> FlightCatalog:
+    return FlightCatalog(
+        {
+            "flight_id": f"BENCH{i:03d}",
+            "airline": "Bench Air",
+            "origin": "SFO",
+            "destination": "CDG",
+            "departure": "2025-03-15 10:00",
+            "arrival": "2025-03-16 06:30",
+            "price": 500.0 + i,
+            "class": "economy",
+            "seats_available": seats,
+        }
+        for i in range(flights)
+    )
+
+
+def worker(inventory, flight_ids, attempts, sold, counters, lock, seed):
+    rng = random.Random(seed)
+    local = {"held": 0, "sold": 0, "cancelled": 0, "expired": 0, "rejected": 0}
+    local_sold: dict[str, int] = {}
+
+    for _ in range(attempts):
+        flight_id = rng.choice(flight_ids)
+        mandate_id = str(uuid.uuid4())
+        roll = rng.random()
+        # A few holds are born already expired to exercise the release path
+        ttl = 0.0 if roll < 0.05 else None
+
+        try:
+            inventory.hold(flight_id, mandate_id, ttl=ttl)
+        except SeatUnavailableError:
+            local["rejected"] += 1
+            continue
+        local["held"] += 1
+
+        if roll < 0.75:
+            try:
+                inventory.commit(mandate_id)
+                local["sold"] += 1
+                local_sold[flight_id] = local_sold.get(flight_id, 0) + 1
+            except HoldExpiredError:
+                local["expired"] += 1
+        else:
+            inventory.release(mandate_id)
+            local["cancelled"] += 1
+
+        if roll > 0.98:
+            inventory.release_expired()
+
+    with lock:
+        for key, value in local.items():
+            counters[key] += value
+        for flight_id, count in local_sold.items():
+            sold[flight_id] = sold.get(flight_id, 0) + count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--flights", type=int, default=8)
+    parser.add_argument("--seats", type=int, default=500)
+    parser.add_argument("--attempts", type=int, default=2_000, help="hold attempts per thread")
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.flights, args.seats)
+    inventory = SeatInventory(catalog)
+    flight_ids = list(catalog)
+
+    sold: dict[str, int] = {}
+    counters = {"held": 0, "sold": 0, "cancelled": 0, "expired": 0, "rejected": 0}
+    lock = threading.Lock()
+
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(inventory, flight_ids, args.attempts, sold, counters, lock, seed),
+        )
+        for seed in range(args.threads)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    inventory.release_expired()
+
+    operations = args.threads * args.attempts
+    print(f"threads={args.threads} flights={args.flights} seats/flight={args.seats}")
+    print(f"{operations} hold attempts in {elapsed:.2f}s ({operations / elapsed:,.0f} ops/s)")
+    print(", ".join(f"{key}={value}" for key, value in counters.items()))
+
+    failures = []
+    for flight_id in flight_ids:
+        remaining = catalog[flight_id]["seats_available"]
+        flight_sold = sold.get(flight_id, 0)
+        if remaining < 0:
+            failures.append(f"{flight_id}: negative inventory ({remaining})")
+        if flight_sold > args.seats:
+            failures.append(f"{flight_id}: oversold ({flight_sold} > {args.seats})")
+        if remaining + flight_sold != args.seats:
+            failures.append(
+                f"{flight_id}: seats unaccounted for (remaining={remaining}, sold={flight_sold})"
+            )
+
+    if failures:
+        print("FAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+    print("OK: no flight oversold, every seat accounted for")
+
+
+if __name__ == "__main__":
+    main()
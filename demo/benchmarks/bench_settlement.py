@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Payment Settlement Benchmark
+
+Settles the same number of authorized mandates one at a time through
+process_authorized_payment and in batches through
+process_authorized_payments, against a stub processor that charges a
+fixed latency per round trip.
+
+Usage:
+    python benchmarks/bench_settlement.py [--mandates 500] [--batch-size 50] [--latency-ms 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from merchant_agent import agent
+from merchant_agent.payments import StubPaymentProcessor
+from shared.authorization import AuthorizationSigner
+
+
+SIGNER = AuthorizationSigner.for_demo_user("bench_user")
+agent.AUTHORIZATION_VERIFIER.trust("bench_user", SIGNER.public_key_hex)
+
+
+def create_mandates(count: int) -> list[tuple[str, str]]:
+    """Create mandates and sign them as the user would: (mandate_id, authorization_token) pairs."""
+    agent.FLIGHT_CATALOG.update("FL004", seats_available=agent.FLIGHT_CATALOG["FL004"]["seats_available"] + count)
+    payments = []
+    for i in range(count):
+        mandate_id = agent.create_booking_mandate("FL004", f"Passenger {i}", "bench_shopper", "bench_user")["mandate_id"]
+        digest = agent._authorization_digest(agent.MANDATE_STORE.get_mandate(mandate_id))
+        payments.append((mandate_id, SIGNER.sign(digest)))
+    return payments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mandates", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="processor latency per round trip")
+    args = parser.parse_args()
+
+    agent.PAYMENT_PROCESSOR = StubPaymentProcessor(round_trip_seconds=args.latency_ms / 1000)
+    agent.SETTLEMENT_BATCH_SIZE = args.batch_size
+
+    print(f"mandates={args.mandates} batch_size={args.batch_size} latency={args.latency_ms}ms/round trip")
+
+    payments = create_mandates(args.mandates)
+    agent.SETTLEMENT_METRICS.reset()
+    start = time.perf_counter()
+    for mandate_id, token in payments:
+        result = agent.process_authorized_payment(mandate_id, token)
+        assert result["status"] == "success", result
+    sequential = time.perf_counter() - start
+    sequential_trips = agent.SETTLEMENT_METRICS.snapshot()["round_trips"]
+
+    payments = create_mandates(args.mandates)
+    agent.SETTLEMENT_METRICS.reset()
+    start = time.perf_counter()
+    result = agent.process_authorized_payments(
+        [{"mandate_id": mandate_id, "authorization_token": token} for mandate_id, token in payments]
+    )
+    batched = time.perf_counter() - start
+    assert result["settled"] == args.mandates, result["message"]
+    batched_trips = agent.SETTLEMENT_METRICS.snapshot()["round_trips"]
+
+    print(f"{'mode':<12}{'round trips':>12}{'seconds':>10}{'mandates/s':>14}")
+    print(f"{'sequential':<12}{sequential_trips:>12}{sequential:>10.3f}{args.mandates / sequential:>14,.0f}")
+    print(f"{'batched':<12}{batched_trips:>12}{batched:>10.3f}{args.mandates / batched:>14,.0f}")
+    print(f"speedup: {sequential / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
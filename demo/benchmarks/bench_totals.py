@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Mandate Totals Benchmark
+
+Totals a settlement batch of mandates four ways:
+    - float: the original float line totals, rounded per mandate
+    - sum_money: shared.money.sum_money per mandate, over Money line totals
+    - batch_totals: one vectorized pass over Money line totals
+    - batch_totals_minor: one vectorized pass over int64 minor-unit columns
+
+Then totals real PaymentMandates one at a time (total_amount) and all at
+once (mandate_totals, as settlement does), and reports the drift that
+float accumulation shows on a batch where the exact answer is known.
+
+Usage:
+    python benchmarks/bench_totals.py [--mandates 100000] [--items 4]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from shared.ap2_types import LineItem, PaymentMandate, mandate_totals
+from shared.money import Money, batch_totals, batch_totals_minor, sum_money
+
+
+def best_of(fn, repeat: int = 3, setup=None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(title: str, count: int, timings: dict[str, float]) -> None:
+    baseline = next(iter(timings.values()))
+    print(title)
+    print(f"{'path':<22}{'mandates/s':>16}{'speedup':>10}")
+    for name, elapsed in timings.items():
+        print(f"{name:<22}{count / elapsed:>16,.0f}{baseline / elapsed:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mandates", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=4, help="line items per mandate")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    cents = [[rng.randint(100, 200_000) for _ in range(args.items)] for _ in range(args.mandates)]
+
+    float_groups = [[c / 100 for c in group] for group in cents]
+    money_groups = [[Money(c) for c in group] for group in cents]
+    minor_units = np.asarray([c for group in cents for c in group], dtype=np.int64)
+    group_sizes = np.full(args.mandates, args.items, dtype=np.int64)
+
+    float_totals = [round(sum(group), 2) for group in float_groups]
+    money_totals = [sum_money(group) for group in money_groups]
+    assert [round(t.minor / 100, 2) for t in money_totals] == float_totals
+    assert batch_totals(money_groups) == money_totals
+    assert batch_totals_minor(minor_units, group_sizes).tolist() == [t.minor for t in money_totals]
+
+    report(f"{args.mandates:,} mandates x {args.items} line items", args.mandates, {
+        "float": best_of(lambda: [round(sum(group), 2) for group in float_groups]),
+        "sum_money": best_of(lambda: [sum_money(group) for group in money_groups]),
+        "batch_totals": best_of(lambda: batch_totals(money_groups)),
+        "batch_totals_minor": best_of(lambda: batch_totals_minor(minor_units, group_sizes)),
+    })
+
+    # The same totals on PaymentMandates, with their cached totals cleared
+    # before every run
+    mandates = [
+        PaymentMandate(
+            shopper_agent_id="shopper",
+            merchant_agent_id="merchant",
+            user_id="user",
+            line_items=[LineItem(description=f"Item {i}", unit_price=Money(c)) for i, c in enumerate(group)],
+        )
+        for group in cents
+    ]
+
+    def clear():
+        for mandate in mandates:
+            mandate._total_minor = None
+
+    clear()
+    assert mandate_totals(mandates) == money_totals
+
+    print()
+    report(f"{args.mandates:,} PaymentMandates", args.mandates, {
+        "total_amount": best_of(lambda: [mandate.total_amount for mandate in mandates], setup=clear),
+        "mandate_totals": best_of(lambda: mandate_totals(mandates), setup=clear),
+    })
+
+    # Drift: a batch of ten-cent items whose exact total is known
+    count = 1_000_000
+    float_sum = sum(0.1 for _ in range(count))
+    exact = batch_totals_minor(np.full(count, 10, dtype=np.int64), np.asarray([count]))[0]
+    print(f"\n{count:,} x 0.10 -> float: {float_sum!r}, minor units: {Money(int(exact))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,14 @@ This agent acts as a merchant in the AP2 protocol, offering flight
 booking services and accepting payments from shopper agents.
 """
 
+import asyncio
+import concurrent.futures
+import functools
 import os
 import sys
-from typing import Any
+import time
+from datetime import datetime
+from typing import Any, Iterator
 
 # Add shared module to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -20,6 +25,47 @@ from shared.ap2_types import (
     PaymentMandate,
     PaymentStatus,
     create_ap2_extension,
+    mandate_totals,
+)
+from shared.aio import async_tool, run_sync
+from shared.authorization import (
+    InvalidAuthorizationToken,
+    TokenVerifier,
+    mandate_digest,
+    parse_trusted_keys,
+)
+from shared.expiry import ExpiryQueue
+from shared.money import Money
+
+from .catalog import FlightCatalog
+from .columnar import ColumnarFlightCatalog
+from .results import SORT_FIELDS, decode_cursor, encode_cursor, paginate
+from .query import FilterPlan
+from .search_cache import SearchCache
+from .seats import (
+    DEFAULT_HOLD_TTL_SECONDS,
+    HoldExpiredError,
+    SeatInventory,
+    SeatUnavailableError,
+)
+from .locking import KeyedLocks
+from .payments import (
+    Charge,
+    ChargeResult,
+    PaymentProcessor,
+    SettlementMetrics,
+    SimulatedPaymentProcessor,
+    StubPaymentProcessor,
+    batched,
+    unanswered,
+)
+from .pipeline import SettlementPipeline
+from .store import (
+    DuplicateReceiptError,
+    InMemoryMandateStore,
+    JournaledMandateStore,
+    MandateStore,
+    SQLiteMandateStore,
 )
 
 
@@ -74,21 +120,212 @@ FLIGHTS_DB = [
     },
 ]
 
-# In-memory storage for bookings and mandates
-BOOKINGS: dict[str, dict] = {}
-PAYMENT_MANDATES: dict[str, PaymentMandate] = {}
+
+def build_flight_catalog(flights: list[dict]) -> FlightCatalog | ColumnarFlightCatalog:
+    """
+    Build the flight catalog for the configured catalog mode.
+
+    MERCHANT_CATALOG_MODE selects the representation:
+        - "indexed" (default): dict per flight plus search indexes
+        - "columnar": NumPy columns with vectorized filtering
+    """
+    mode = os.getenv("MERCHANT_CATALOG_MODE", "indexed").lower()
+    if mode == "columnar":
+        return ColumnarFlightCatalog(flights)
+    return FlightCatalog(flights)
+
+
+# Flights keyed by flight_id, with search indexes kept in step
+FLIGHT_CATALOG = build_flight_catalog(FLIGHTS_DB)
+
+
+def build_mandate_store() -> MandateStore:
+    """
+    Build the mandate/booking store.
+
+    Set MERCHANT_STORE_PATH to persist mandates and bookings in SQLite
+    (shared by every worker pointing at the same file); otherwise they
+    are kept in memory, with settled mandates held as compact records
+    when MERCHANT_COMPACT_MANDATES=1. Set MERCHANT_JOURNAL_PATH to
+    journal every in-memory change to an append-only event log that is
+    replayed on restart (MERCHANT_JOURNAL_FSYNC=0 skips fsync); a
+    snapshot is taken in the background each time the journal grows by
+    MERCHANT_SNAPSHOT_MB megabytes (0 disables snapshots).
+    """
+    path = os.getenv("MERCHANT_STORE_PATH")
+    if path:
+        return SQLiteMandateStore(path)
+    compact_settled = os.getenv("MERCHANT_COMPACT_MANDATES") == "1"
+    journal_path = os.getenv("MERCHANT_JOURNAL_PATH")
+    if journal_path:
+        return JournaledMandateStore(
+            journal_path,
+            compact_settled=compact_settled,
+            fsync=os.getenv("MERCHANT_JOURNAL_FSYNC", "1") != "0",
+            snapshot_bytes=int(os.getenv("MERCHANT_SNAPSHOT_MB", 64)) * 1024 * 1024,
+        )
+    return InMemoryMandateStore(compact_settled=compact_settled)
+
+
+# Storage for bookings and mandates
+MANDATE_STORE = build_mandate_store()
+
+# Serializes payment processing per mandate
+MANDATE_LOCKS = KeyedLocks()
+
+# Seconds a mandate may stay pending before it expires
+MANDATE_TTL_SECONDS = float(os.getenv("MERCHANT_MANDATE_TTL", 15 * 60))
+
+# Deadlines of pending mandates, so expiry never scans the store (and of
+# payments found still processing after a restart)
+MANDATE_EXPIRY = ExpiryQueue()
+
+# Seconds a payment may go without a recorded processor answer (its reply
+# was lost, or the merchant restarted) before the processor is asked again
+SETTLEMENT_TIMEOUT_SECONDS = float(os.getenv("MERCHANT_SETTLEMENT_TIMEOUT", 120))
+
+# Recent search results (MERCHANT_SEARCH_CACHE_SIZE=0 disables caching)
+SEARCH_CACHE = SearchCache(
+    max_entries=int(os.getenv("MERCHANT_SEARCH_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("MERCHANT_SEARCH_CACHE_TTL", 30)),
+    owns_records=isinstance(FLIGHT_CATALOG, ColumnarFlightCatalog),
+)
+
+
+def _seats_changed(flight: dict[str, Any]) -> None:
+    SEARCH_CACHE.invalidate_flight(flight)
+    MANDATE_STORE.save_seats(flight["flight_id"], flight["seats_available"])
+
+
+# Seat holds for pending mandates (MERCHANT_SEAT_HOLD_TTL is in seconds);
+# every seat change drops the cached searches the flight appears in and
+# is recorded by stores that persist seat inventory. A store shared by
+# several workers keeps the seat counts and holds for all of them.
+SEAT_INVENTORY = SeatInventory(
+    FLIGHT_CATALOG,
+    hold_ttl=float(os.getenv("MERCHANT_SEAT_HOLD_TTL", DEFAULT_HOLD_TTL_SECONDS)),
+    on_change=_seats_changed,
+    ledger=MANDATE_STORE if MANDATE_STORE.shares_seats else None,
+)
+
+
+def restore_merchant_state() -> None:
+    """
+    Pick up where the previous run left off, for durable stores.
+
+    Pending mandates are tracked for expiry again and, when the store
+    persists seat inventory, seat counts are reloaded and the pending
+    mandates' seat holds put back.
+
+    Payments still processing were cut off before the processor's answer
+    was recorded. They are tracked the same way and reconciled once
+    SETTLEMENT_TIMEOUT_SECONDS have passed since they were authorized
+    (another worker sharing the store may still be charging a recent
+    one): the charge is resent under the mandate's idempotency key and
+    whatever the processor reports is recorded. Client idempotency keys
+    are not persisted, so their receipts are filed under the default
+    key, the mandate_id.
+    """
+    now = datetime.utcnow()
+    pending = []
+    for mandate in MANDATE_STORE.find_mandates(status=PaymentStatus.PENDING):
+        ttl = (mandate.expires_at - now).total_seconds() if mandate.expires_at else MANDATE_TTL_SECONDS
+        MANDATE_EXPIRY.schedule_in(mandate.mandate_id, ttl)
+        pending.append((mandate.mandate_id, mandate.merchant_reference, 1, ttl))
+
+    for mandate in MANDATE_STORE.find_mandates(status=PaymentStatus.PROCESSING):
+        authorized = mandate.authorization_timestamp or now
+        MANDATE_EXPIRY.schedule_in(
+            mandate.mandate_id,
+            SETTLEMENT_TIMEOUT_SECONDS - (now - authorized).total_seconds(),
+        )
+
+    seats = MANDATE_STORE.load_seats()
+    if seats:
+        SEAT_INVENTORY.restore(seats, pending)
+
+
+restore_merchant_state()
+
+
+def build_token_verifier() -> TokenVerifier:
+    """
+    Build the verifier for users' payment authorization tokens.
+
+    MERCHANT_TRUSTED_KEYS lists each user's device public keys as
+    comma-separated user_id:public_key_hex pairs. With no keys
+    configured every payment authorization is rejected, unless
+    MERCHANT_ALLOW_DEMO_KEYS=1 opts in to accepting every user's
+    well-known demo key instead (anyone can derive those, so demos
+    only). Tokens older than MERCHANT_TOKEN_MAX_AGE seconds (default:
+    the mandate TTL; 0 for no limit) are rejected.
+    MERCHANT_TOKEN_CACHE_SIZE bounds the cache of verified tokens (0
+    disables it).
+    """
+    max_age = float(os.getenv("MERCHANT_TOKEN_MAX_AGE", MANDATE_TTL_SECONDS))
+    return TokenVerifier(
+        parse_trusted_keys(os.getenv("MERCHANT_TRUSTED_KEYS", "")),
+        demo_keys=os.getenv("MERCHANT_ALLOW_DEMO_KEYS") == "1",
+        cache_size=int(os.getenv("MERCHANT_TOKEN_CACHE_SIZE", 65536)),
+        max_age=max_age or None,
+    )
+
+
+# Checks that each payment was signed by its user's device
+AUTHORIZATION_VERIFIER = build_token_verifier()
+
+# Captures authorized mandates; the stub approves everything locally
+PAYMENT_PROCESSOR: PaymentProcessor = StubPaymentProcessor()
+
+# Mandates per processor round trip in process_authorized_payments
+SETTLEMENT_BATCH_SIZE = int(os.getenv("MERCHANT_SETTLEMENT_BATCH_SIZE", 50))
+
+# Processor round trips, approvals and throughput since startup
+SETTLEMENT_METRICS = SettlementMetrics()
+
+# Payments waiting on the processor, so concurrent retries share one charge
+SETTLEMENTS_IN_FLIGHT: dict[str, concurrent.futures.Future] = {}
+
+# Payments whose charge outcome is unknown, by mandate_id, until
+# expire_stale_mandates reconciles them: (client idempotency key, whether
+# the payment was submitted through the settlement pipeline)
+UNRESOLVED_PAYMENTS: dict[str, tuple[str, bool]] = {}
+
+
+def build_settlement_pipeline() -> SettlementPipeline:
+    """
+    Build the asynchronous settlement pipeline used by submit_authorized_payment.
+
+    It runs against the local processor simulator, configured with
+    MERCHANT_PROCESSOR_LATENCY_MS, MERCHANT_PROCESSOR_DECLINE_RATE,
+    MERCHANT_PROCESSOR_ERROR_RATE and MERCHANT_PROCESSOR_TIMEOUT_RATE.
+    """
+    processor = SimulatedPaymentProcessor(
+        latency=float(os.getenv("MERCHANT_PROCESSOR_LATENCY_MS", 50)) / 1000,
+        decline_rate=float(os.getenv("MERCHANT_PROCESSOR_DECLINE_RATE", 0)),
+        error_rate=float(os.getenv("MERCHANT_PROCESSOR_ERROR_RATE", 0)),
+        timeout_rate=float(os.getenv("MERCHANT_PROCESSOR_TIMEOUT_RATE", 0)),
+    )
+    return SettlementPipeline(processor, batch_size=SETTLEMENT_BATCH_SIZE, metrics=SETTLEMENT_METRICS)
+
+
+# Settles submitted payments in the background; started on first use
+SETTLEMENT_PIPELINE = build_settlement_pipeline()
 
 
 # ============================================================================
 # Merchant Tools
 # ============================================================================
 
-def search_flights(
+async def search_flights_async(
     origin: str,
     destination: str,
     date: str | None = None,
     travel_class: str | None = None,
     max_price: float | None = None,
+    sort_by: str | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
 ) -> dict[str, Any]:
     """
     Search for available flights.
@@ -99,33 +336,71 @@ def search_flights(
         date: Optional travel date (YYYY-MM-DD)
         travel_class: Optional class filter ('economy', 'business', 'first')
         max_price: Optional maximum price filter
+        sort_by: Optional ordering ('price', 'departure', 'duration')
+        limit: Optional maximum number of flights to return
+        cursor: Optional cursor from a previous response's next_cursor
 
     Returns:
         Dictionary containing matching flights
     """
-    results = []
+    if sort_by and sort_by not in SORT_FIELDS:
+        return {
+            "status": "error",
+            "message": f"Unsupported sort_by '{sort_by}' (expected one of: {', '.join(SORT_FIELDS)})"
+        }
 
-    for flight in FLIGHTS_DB:
-        # Filter by origin/destination
-        if flight["origin"].upper() != origin.upper():
-            continue
-        if flight["destination"].upper() != destination.upper():
-            continue
+    if limit is not None and limit < 1:
+        return {
+            "status": "error",
+            "message": "limit must be a positive integer"
+        }
 
-        # Filter by class if specified
-        if travel_class and flight["class"] != travel_class.lower():
-            continue
+    try:
+        offset = decode_cursor(cursor) if cursor else 0
+    except ValueError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
 
-        # Filter by price if specified
-        if max_price and flight["price"] > max_price:
-            continue
+    # Expiring abandoned mandates writes to the store, and the catalog
+    # and cache take blocking locks: keep both off the event loop
+    return await asyncio.to_thread(
+        _search_flights, origin, destination, date, travel_class, max_price, sort_by, offset, limit,
+    )
 
-        # Filter by date if specified
-        if date and not flight["departure"].startswith(date):
-            continue
 
-        if flight["seats_available"] > 0:
-            results.append(flight)
+def _search_flights(
+    origin: str,
+    destination: str,
+    date: str | None,
+    travel_class: str | None,
+    max_price: float | None,
+    sort_by: str | None,
+    offset: int,
+    limit: int | None,
+) -> dict[str, Any]:
+    """The blocking part of search_flights_async, run in a worker thread."""
+    release_abandoned_seats()
+
+    if SEARCH_CACHE.max_entries > 0:
+        # Every page and ordering of a search is cut from one cached result set
+        plan = FilterPlan.from_query(origin, destination, date, travel_class, max_price)
+        matches = SEARCH_CACHE.get_or_search(plan, lambda: FLIGHT_CATALOG.search_plan(plan))
+        results, total = paginate(matches, sort_by, offset, limit)
+    else:
+        results, total = FLIGHT_CATALOG.search_page(
+            origin,
+            destination,
+            date=date,
+            travel_class=travel_class,
+            max_price=max_price,
+            sort_by=sort_by,
+            offset=offset,
+            limit=limit,
+        )
+
+    next_offset = offset + len(results)
 
     return {
         "status": "success",
@@ -135,67 +410,78 @@ def search_flights(
             "date": date,
             "class": travel_class,
             "max_price": max_price,
+            "sort_by": sort_by,
         },
         "results_count": len(results),
+        "total_results": total,
+        "next_cursor": encode_cursor(next_offset) if next_offset < total else None,
         "flights": results,
     }
 
 
-def get_flight_details(flight_id: str) -> dict[str, Any]:
-    """
-    Get detailed information about a specific flight.
+def search_flights(
+    origin: str,
+    destination: str,
+    date: str | None = None,
+    travel_class: str | None = None,
+    max_price: float | None = None,
+    sort_by: str | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> dict[str, Any]:
+    """Synchronous wrapper for search_flights_async."""
+    return run_sync(search_flights_async(
+        origin, destination, date, travel_class, max_price, sort_by, limit, cursor
+    ))
 
-    Args:
-        flight_id: The unique flight identifier
 
-    Returns:
-        Flight details or error if not found
+def stream_flights(
+    origin: str,
+    destination: str,
+    date: str | None = None,
+    travel_class: str | None = None,
+    max_price: float | None = None,
+    sort_by: str | None = None,
+) -> Iterator[dict[str, Any]]:
     """
-    for flight in FLIGHTS_DB:
-        if flight["flight_id"] == flight_id:
-            return {
-                "status": "success",
-                "flight": flight,
-                "policies": {
-                    "cancellation": "Free cancellation up to 24 hours before departure",
-                    "baggage": "1 carry-on included, checked bags extra",
-                    "changes": "Changes allowed with $75 fee",
-                }
-            }
+    Stream matching flights one at a time.
 
-    return {
-        "status": "error",
-        "message": f"Flight {flight_id} not found"
-    }
+    Generator counterpart of search_flights for callers that consume
+    results incrementally (e.g. server-side streaming). Flights are
+    produced lazily, so stopping early never pays for the full result set.
 
+    Args:
+        origin: Origin airport code (e.g., 'SFO')
+        destination: Destination airport code (e.g., 'CDG')
+        date: Optional travel date (YYYY-MM-DD)
+        travel_class: Optional class filter ('economy', 'business', 'first')
+        max_price: Optional maximum price filter
+        sort_by: Optional ordering ('price', 'departure', 'duration')
 
-def create_booking_mandate(
-    flight_id: str,
-    passenger_name: str,
-    shopper_agent_id: str,
-    user_id: str,
-) -> dict[str, Any]:
+    Yields:
+        Matching flights
     """
-    Create an AP2 payment mandate for booking a flight.
+    yield from FLIGHT_CATALOG.iter_search(
+        origin,
+        destination,
+        date=date,
+        travel_class=travel_class,
+        max_price=max_price,
+        sort_by=sort_by,
+    )
 
-    This initiates the AP2 payment flow by creating a mandate that
-    must be authorized by the user before payment can proceed.
+
+def get_flight_details(flight_id: str) -> dict[str, Any]:
+    """
+    Get detailed information about a specific flight.
 
     Args:
-        flight_id: The flight to book
-        passenger_name: Name of the passenger
-        shopper_agent_id: ID of the shopper agent making the request
-        user_id: ID of the user who will authorize the payment
+        flight_id: The unique flight identifier
 
     Returns:
-        Payment mandate details for authorization
+        Flight details or error if not found
     """
-    # Find the flight
-    flight = None
-    for f in FLIGHTS_DB:
-        if f["flight_id"] == flight_id:
-            flight = f
-            break
+    flight = FLIGHT_CATALOG.get(flight_id)
 
     if not flight:
         return {
@@ -203,30 +489,46 @@ def create_booking_mandate(
             "message": f"Flight {flight_id} not found"
         }
 
-    if flight["seats_available"] <= 0:
-        return {
-            "status": "error",
-            "message": "No seats available on this flight"
+    return {
+        "status": "success",
+        "flight": flight,
+        "policies": {
+            "cancellation": "Free cancellation up to 24 hours before departure",
+            "baggage": "1 carry-on included, checked bags extra",
+            "changes": "Changes allowed with $75 fee",
         }
+    }
+
+
+def _build_mandate(
+    flight: dict[str, Any],
+    passenger_name: str,
+    shopper_agent_id: str,
+    user_id: str,
+) -> PaymentMandate:
+    """Build the payment mandate for one passenger on a flight."""
+    flight_id = flight["flight_id"]
 
-    # Create line items for the mandate
+    # Create line items for the mandate. Everything here is merchant
+    # generated, so the trusted constructors skip pydantic validation.
+    fare = Money.of(flight["price"], "USD")
     line_items = [
-        LineItem(
+        LineItem.trusted(
             description=f"Flight {flight_id}: {flight['origin']} → {flight['destination']}",
             quantity=1,
-            unit_price=flight["price"],
+            unit_price=fare,
             currency="USD",
         ),
-        LineItem(
+        LineItem.trusted(
             description="Taxes and fees",
             quantity=1,
-            unit_price=round(flight["price"] * 0.12, 2),  # 12% taxes
+            unit_price=fare.scale("0.12"),  # 12% taxes
             currency="USD",
         ),
     ]
 
     # Create the payment mandate
-    mandate = PaymentMandate(
+    mandate = PaymentMandate.trusted(
         shopper_agent_id=shopper_agent_id,
         merchant_agent_id="flight_merchant_agent",
         user_id=user_id,
@@ -234,87 +536,1210 @@ def create_booking_mandate(
         description=f"Flight booking for {passenger_name}",
         merchant_reference=flight_id,
     )
+    mandate.set_ttl(MANDATE_TTL_SECONDS)
+    return mandate
 
-    # Store the mandate
-    PAYMENT_MANDATES[mandate.mandate_id] = mandate
+
+def _mandate_created(mandate: PaymentMandate) -> dict[str, Any]:
+    """Response for a newly created, stored mandate."""
+    summary = mandate.to_summary()
 
     return {
         "status": "success",
         "message": "Payment mandate created - awaiting user authorization",
-        "mandate": mandate.to_summary(),
+        "mandate": summary,
         "mandate_id": mandate.mandate_id,
         "requires_authorization": True,
-        "authorization_prompt": f"Do you authorize payment of USD {mandate.total_amount:.2f} for flight {flight_id}?",
+        "expires_at": mandate.expires_at.isoformat(),
+        "authorization_prompt": f"Do you authorize payment of {summary['total']} for flight {mandate.merchant_reference}?",
     }
 
 
-def process_authorized_payment(
-    mandate_id: str,
-    authorization_token: str,
+async def create_booking_mandate_async(
+    flight_id: str,
+    passenger_name: str,
+    shopper_agent_id: str,
+    user_id: str,
 ) -> dict[str, Any]:
     """
-    Process a payment after user authorization.
+    Create an AP2 payment mandate for booking a flight.
 
-    This completes the AP2 payment flow after the user has authorized
-    the mandate with their cryptographic token.
+    This initiates the AP2 payment flow by creating a mandate that
+    must be authorized by the user before payment can proceed.
 
     Args:
-        mandate_id: The mandate to process
-        authorization_token: User's authorization token
+        flight_id: The flight to book
+        passenger_name: Name of the passenger
+        shopper_agent_id: ID of the shopper agent making the request
+        user_id: ID of the user who will authorize the payment
 
     Returns:
-        Booking confirmation or error
+        Payment mandate details for authorization
     """
-    mandate = PAYMENT_MANDATES.get(mandate_id)
+    # Holding the seat and saving the mandate commit to the store under
+    # blocking locks; run them in a worker thread, off the event loop
+    return await asyncio.to_thread(_create_booking_mandate, flight_id, passenger_name, shopper_agent_id, user_id)
 
-    if not mandate:
+
+def _create_booking_mandate(
+    flight_id: str,
+    passenger_name: str,
+    shopper_agent_id: str,
+    user_id: str,
+) -> dict[str, Any]:
+    """The blocking part of create_booking_mandate_async, run in a worker thread."""
+    # Return seats from abandoned checkouts before checking availability
+    release_abandoned_seats()
+
+    # Find the flight
+    flight = FLIGHT_CATALOG.get(flight_id)
+
+    if not flight:
         return {
             "status": "error",
-            "message": f"Mandate {mandate_id} not found"
+            "message": f"Flight {flight_id} not found"
         }
 
-    if mandate.status != PaymentStatus.PENDING:
+    if flight["seats_available"] <= 0:
         return {
             "status": "error",
-            "message": f"Mandate is not pending (status: {mandate.status.value})"
+            "message": "No seats available on this flight"
         }
 
-    # Authorize the mandate
-    mandate.authorize(authorization_token)
+    mandate = _build_mandate(flight, passenger_name, shopper_agent_id, user_id)
 
-    # Process the payment (simulated)
-    mandate.status = PaymentStatus.PROCESSING
+    # Hold a seat until the mandate is paid, cancelled or expires, and
+    # store the mandate; a store that keeps seats commits both together
+    try:
+        with MANDATE_STORE.batch():
+            SEAT_INVENTORY.hold(flight_id, mandate.mandate_id)
+            try:
+                MANDATE_STORE.save_mandate(mandate)
+            except Exception:
+                SEAT_INVENTORY.release(mandate.mandate_id)
+                raise
+    except SeatUnavailableError:
+        return {
+            "status": "error",
+            "message": "No seats available on this flight"
+        }
+    MANDATE_EXPIRY.schedule_in(mandate.mandate_id, MANDATE_TTL_SECONDS)
 
-    # In a real implementation, this would call the payment processor
-    # For demo purposes, we'll simulate success
-    mandate.status = PaymentStatus.COMPLETED
+    return _mandate_created(mandate)
 
-    # Create the booking
-    booking_id = f"BK{mandate.mandate_id[:8].upper()}"
-    BOOKINGS[booking_id] = {
-        "booking_id": booking_id,
-        "mandate_id": mandate_id,
-        "flight_id": mandate.merchant_reference,
-        "status": "confirmed",
-        "total_paid": mandate.total_amount,
-    }
+
+def create_booking_mandate(
+    flight_id: str,
+    passenger_name: str,
+    shopper_agent_id: str,
+    user_id: str,
+) -> dict[str, Any]:
+    """Synchronous wrapper for create_booking_mandate_async."""
+    return run_sync(create_booking_mandate_async(flight_id, passenger_name, shopper_agent_id, user_id))
+
+
+def create_booking_mandates(
+    bookings: list[dict[str, str]],
+    shopper_agent_id: str,
+    user_id: str,
+) -> dict[str, Any]:
+    """
+    Create AP2 payment mandates for many passengers in one call.
+
+    Use this for group trips and corporate batches instead of calling
+    create_booking_mandate once per passenger. Every seat is held in a
+    single inventory pass and every mandate is stored in one commit.
+    Items are independent: a flight that is sold out or unknown only
+    fails its own item.
+
+    Args:
+        bookings: List of {"flight_id": ..., "passenger_name": ...} items
+        shopper_agent_id: ID of the shopper agent making the request
+        user_id: ID of the user who will authorize the payments
+
+    Returns:
+        Per-item results, in request order, plus created/failed counts
+    """
+    release_abandoned_seats()
+
+    results: list[dict[str, Any] | None] = [None] * len(bookings)
+    pending: list[tuple[int, PaymentMandate]] = []
+
+    for index, item in enumerate(bookings):
+        flight_id = item.get("flight_id")
+        passenger_name = item.get("passenger_name")
+        if not flight_id or not passenger_name:
+            results[index] = {
+                "status": "error",
+                "message": "Each booking needs a flight_id and a passenger_name"
+            }
+            continue
+
+        flight = FLIGHT_CATALOG.get(flight_id)
+        if not flight:
+            results[index] = {
+                "status": "error",
+                "message": f"Flight {flight_id} not found"
+            }
+            continue
+
+        pending.append((index, _build_mandate(flight, passenger_name, shopper_agent_id, user_id)))
+
+    # One store commit for every mandate in the batch (and, for a store
+    # that keeps seats, every hold)
+    held = []
+    with MANDATE_STORE.batch():
+        # One lock acquisition for every flight in the batch
+        holds = SEAT_INVENTORY.hold_many(
+            [(mandate.merchant_reference, mandate.mandate_id, 1) for _, mandate in pending]
+        )
+
+        for (index, mandate), hold in zip(pending, holds):
+            if isinstance(hold, Exception):
+                results[index] = {
+                    "status": "error",
+                    "message": "No seats available on this flight"
+                }
+            else:
+                held.append((index, mandate))
+
+        try:
+            for _, mandate in held:
+                MANDATE_STORE.save_mandate(mandate)
+        except Exception:
+            for _, mandate in held:
+                SEAT_INVENTORY.release(mandate.mandate_id)
+            raise
+
+    # Total every new mandate in one pass before their summaries are built
+    mandate_totals([mandate for _, mandate in held])
+    for index, mandate in held:
+        MANDATE_EXPIRY.schedule_in(mandate.mandate_id, MANDATE_TTL_SECONDS)
+        results[index] = _mandate_created(mandate)
+
+    created = len(held)
+    failed = len(bookings) - created
 
     return {
-        "status": "success",
-        "message": "Payment processed and booking confirmed!",
-        "booking": {
-            "booking_id": booking_id,
-            "flight_id": mandate.merchant_reference,
-            "confirmation_code": booking_id,
-            "amount_charged": f"USD {mandate.total_amount:.2f}",
-            "payment_status": "completed",
-        },
-        "ap2_receipt": {
-            "mandate_id": mandate_id,
-            "authorization_timestamp": mandate.authorization_timestamp.isoformat() if mandate.authorization_timestamp else None,
-            "merchant": mandate.merchant_agent_id,
-            "shopper": mandate.shopper_agent_id,
-        }
+        "status": "success" if not failed else ("partial" if created else "error"),
+        "message": f"Created {created} of {len(bookings)} payment mandates - awaiting user authorization",
+        "created": created,
+        "failed": failed,
+        "results": results,
+    }
+
+
+def expire_stale_mandates() -> list[str]:
+    """
+    Expire pending mandates whose TTL has passed.
+
+    Expired mandates release their seat and are evicted from the store's
+    working set. Only mandates that are actually due are visited. Due
+    payments whose charge outcome is unknown, including any left
+    processing by a previous run, are reconciled with the processor.
+
+    Returns:
+        IDs of the mandates that were expired
+    """
+    expired = []
+    unresolved = []
+    resubmit = []
+    for mandate_id in MANDATE_EXPIRY.pop_due():
+        with MANDATE_LOCKS.hold(mandate_id):
+            idempotency_key, submitted = UNRESOLVED_PAYMENTS.pop(mandate_id, (mandate_id, False))
+            mandate = MANDATE_STORE.get_mandate(mandate_id)
+            if not mandate:
+                continue
+            if mandate.status == PaymentStatus.PROCESSING and mandate_id not in SETTLEMENTS_IN_FLIGHT:
+                if submitted:
+                    resubmit.append((mandate, idempotency_key))
+                    continue
+                # Claimed like a payment being charged, so retries share the answer
+                SETTLEMENTS_IN_FLIGHT[mandate_id] = concurrent.futures.Future()
+                unresolved.append((mandate, idempotency_key))
+            elif mandate.status == PaymentStatus.PENDING and _expire_mandate(mandate):
+                expired.append(mandate_id)
+
+    # Submitted payments are asked about through the pipeline that charged them
+    for mandate, idempotency_key in resubmit:
+        _submit_charge(mandate, idempotency_key)
+    if unresolved:
+        _reconcile_payments(unresolved)
+    return expired
+
+
+def _reconcile_payments(items: list[tuple[PaymentMandate, str]]) -> None:
+    """
+    Resend charges whose outcome is unknown, in one round trip, and
+    record what the processor reports.
+
+    Each charge goes out under its original idempotency key, so the
+    processor answers a charge it already captured with the original
+    result instead of charging again. An answer lost again leaves the
+    mandate for the next attempt.
+
+    Args:
+        items: (mandate, client idempotency_key) for each PROCESSING
+            mandate, each claimed in SETTLEMENTS_IN_FLIGHT
+    """
+    mandate_ids = [mandate.mandate_id for mandate, _ in items]
+    try:
+        outcomes = _charge([_charge_for(mandate) for mandate, _ in items])
+        with MANDATE_LOCKS.hold_many(mandate_ids):
+            recorded = _record_outcomes(items, outcomes)
+            settlements = [SETTLEMENTS_IN_FLIGHT.pop(mandate_id) for mandate_id in mandate_ids]
+    except BaseException as e:
+        for mandate, idempotency_key in items:
+            settlement = SETTLEMENTS_IN_FLIGHT.pop(mandate.mandate_id, None)
+            if settlement is not None:
+                settlement.set_exception(e)
+            _defer_reconciliation(mandate.mandate_id, idempotency_key)
+        raise
+
+    for settlement, result in zip(settlements, recorded):
+        settlement.set_result(result)
+
+
+def release_abandoned_seats() -> None:
+    """Expire stale mandates and put seats from lapsed holds back on sale."""
+    expire_stale_mandates()
+    SEAT_INVENTORY.release_expired()
+
+
+def _expire_mandate(mandate: PaymentMandate) -> bool:
+    """
+    Expire a pending mandate. Caller holds the mandate lock.
+
+    Returns:
+        False if another worker moved the mandate on first
+    """
+    mandate.expire()
+    if not MANDATE_STORE.transition_mandate(mandate, PaymentStatus.PENDING):
+        return False
+    SEAT_INVENTORY.release(mandate.mandate_id)
+    MANDATE_EXPIRY.cancel(mandate.mandate_id)
+    MANDATE_STORE.evict_mandate(mandate.mandate_id)
+    return True
+
+
+def _commit_seat(mandate: PaymentMandate) -> None:
+    """
+    Commit the seat held for a mandate.
+
+    A mandate may have no hold left: its hold lapsed, or it was loaded
+    from a store that does not keep holds (after a restart, or from
+    another worker). In that case a seat is reserved and committed on
+    the spot.
+    """
+    try:
+        SEAT_INVENTORY.commit(mandate.mandate_id)
+    except KeyError:
+        SEAT_INVENTORY.hold(mandate.merchant_reference, mandate.mandate_id)
+        SEAT_INVENTORY.commit(mandate.mandate_id)
+
+
+def cancel_booking_mandate(mandate_id: str) -> dict[str, Any]:
+    """
+    Cancel a pending payment mandate and release its seat.
+
+    Args:
+        mandate_id: The mandate to cancel
+
+    Returns:
+        Cancellation confirmation or error
+    """
+    with MANDATE_LOCKS.hold(mandate_id):
+        mandate = MANDATE_STORE.get_mandate(mandate_id)
+
+        if not mandate:
+            return {
+                "status": "error",
+                "message": f"Mandate {mandate_id} not found"
+            }
+
+        if mandate.status != PaymentStatus.PENDING:
+            return {
+                "status": "error",
+                "message": f"Mandate is not pending (status: {mandate.status.value})"
+            }
+
+        mandate.cancel()
+        if not MANDATE_STORE.transition_mandate(mandate, PaymentStatus.PENDING):
+            # Another worker claimed it between our read and the save
+            return {
+                "status": "error",
+                "message": "Mandate is no longer pending"
+            }
+        SEAT_INVENTORY.release(mandate_id)
+        MANDATE_EXPIRY.cancel(mandate_id)
+
+    return {
+        "status": "success",
+        "message": "Payment mandate cancelled and seat released",
+        "mandate_id": mandate_id,
+    }
+
+
+async def process_authorized_payment_async(
+    mandate_id: str,
+    authorization_token: str,
+    idempotency_key: str | None = None,
+) -> dict[str, Any]:
+    """
+    Process a payment after user authorization.
+
+    This completes the AP2 payment flow after the user has authorized
+    the mandate with their cryptographic token.
+
+    Safe to retry: concurrent calls for the same mandate share one
+    charge, and once a mandate is paid every retry with the same
+    idempotency key gets the original receipt back instead of a second
+    charge. If the processor's answer is lost the payment stays
+    processing (poll get_payment_status) until it is reconciled.
+
+    Args:
+        mandate_id: The mandate to process
+        authorization_token: User's authorization token
+        idempotency_key: Optional client retry key (defaults to mandate_id)
+
+    Returns:
+        Booking confirmation or error
+    """
+    idempotency_key = idempotency_key or mandate_id
+
+    # Store reads and writes and the mandate lock block, so each locked
+    # section runs in a worker thread rather than on the event loop
+    begun = await asyncio.to_thread(_begin_payment, mandate_id, authorization_token, idempotency_key)
+    if isinstance(begun, dict):
+        return begun
+    mandate, settlement, owner = begun
+
+    if not owner:
+        # Another caller is charging this mandate; share its outcome
+        result = await asyncio.wrap_future(settlement)
+        recorded = await asyncio.to_thread(MANDATE_STORE.get_receipt, mandate_id)
+        return _replay_receipt(mandate_id, idempotency_key, recorded) if recorded else result
+
+    # The lock is not held while the processor works: PROCESSING claims
+    # the mandate, and a blocking lock must never be held across an await
+    try:
+        outcomes = await asyncio.to_thread(_charge, [_charge_for(mandate)])
+        result = await asyncio.to_thread(_finish_payment, mandate, idempotency_key, outcomes)
+    except BaseException as e:
+        SETTLEMENTS_IN_FLIGHT.pop(mandate_id, None)
+        settlement.set_exception(e)
+        raise
+
+    settlement.set_result(result)
+    return result
+
+
+def _begin_payment(
+    mandate_id: str,
+    authorization_token: str,
+    idempotency_key: str,
+) -> dict[str, Any] | tuple[PaymentMandate | None, concurrent.futures.Future, bool]:
+    """
+    Claim a mandate for payment, in a worker thread.
+
+    Returns:
+        A response when the call is answered without a charge (a receipt
+        replay or an error); otherwise (mandate, settlement future, owner),
+        where owner is False if another caller is already charging the
+        mandate and the future is that caller's
+    """
+    # Fast path: retries of a completed payment never take the lock
+    recorded = MANDATE_STORE.get_receipt(mandate_id)
+    if recorded:
+        return _replay_receipt(mandate_id, idempotency_key, recorded)
+
+    with MANDATE_LOCKS.hold(mandate_id):
+        # Another caller may have finished while we waited for the lock
+        recorded = MANDATE_STORE.get_receipt(mandate_id)
+        if recorded:
+            return _replay_receipt(mandate_id, idempotency_key, recorded)
+
+        in_flight = SETTLEMENTS_IN_FLIGHT.get(mandate_id)
+        if in_flight is not None:
+            return None, in_flight, False
+
+        mandate = MANDATE_STORE.get_mandate(mandate_id)
+        error = _check_payable(mandate_id, mandate)
+        if error:
+            return error
+
+        error = _begin_settlement(mandate, authorization_token)
+        if error:
+            return error
+        settlement = SETTLEMENTS_IN_FLIGHT[mandate_id] = concurrent.futures.Future()
+        return mandate, settlement, True
+
+
+def _finish_payment(
+    mandate: PaymentMandate,
+    idempotency_key: str,
+    outcomes: list[ChargeResult],
+) -> dict[str, Any]:
+    """Record a charged mandate's outcome under its lock, in a worker thread."""
+    with MANDATE_LOCKS.hold(mandate.mandate_id):
+        result = _record_outcomes([(mandate, idempotency_key)], outcomes)[0]
+        SETTLEMENTS_IN_FLIGHT.pop(mandate.mandate_id, None)
+    return result
+
+
+def process_authorized_payment(
+    mandate_id: str,
+    authorization_token: str,
+    idempotency_key: str | None = None,
+) -> dict[str, Any]:
+    """Synchronous wrapper for process_authorized_payment_async."""
+    return run_sync(process_authorized_payment_async(mandate_id, authorization_token, idempotency_key))
+
+
+def process_authorized_payments(payments: list[dict[str, str]]) -> dict[str, Any]:
+    """
+    Process many authorized payments, batching the payment processor calls.
+
+    Payments are sent to the processor in groups of SETTLEMENT_BATCH_SIZE,
+    one round trip per group, and each group's bookings and receipts are
+    stored in one commit. Every item gets the same receipt (or error)
+    process_authorized_payment would have returned, and the same
+    idempotency guarantees apply; payments whose processor answer was
+    lost are counted as processing until they are reconciled.
+
+    Args:
+        payments: List of {"mandate_id": ..., "authorization_token": ...,
+            "idempotency_key": ... (optional)} items
+
+    Returns:
+        Per-item results, in request order, plus settlement metrics
+    """
+    started = time.perf_counter()
+    results: list[dict[str, Any] | None] = [None] * len(payments)
+    pending: list[tuple[int, str, str, str]] = []
+    seen: set[str] = set()
+
+    for index, item in enumerate(payments):
+        mandate_id = item.get("mandate_id")
+        authorization_token = item.get("authorization_token")
+        if not mandate_id or not authorization_token:
+            results[index] = {
+                "status": "error",
+                "message": "Each payment needs a mandate_id and an authorization_token"
+            }
+            continue
+
+        if mandate_id in seen:
+            results[index] = {
+                "status": "error",
+                "message": f"Mandate {mandate_id} appears more than once in this batch"
+            }
+            continue
+        seen.add(mandate_id)
+
+        idempotency_key = item.get("idempotency_key") or mandate_id
+        recorded = MANDATE_STORE.get_receipt(mandate_id)
+        if recorded:
+            results[index] = _replay_receipt(mandate_id, idempotency_key, recorded)
+            continue
+
+        pending.append((index, mandate_id, authorization_token, idempotency_key))
+
+    # Check every signature before any mandate lock is taken; the
+    # checks under the locks then hit the verified-token cache
+    _preverify_authorizations([(mandate_id, token) for _, mandate_id, token, _ in pending])
+
+    round_trips = 0
+    for chunk in batched(pending, SETTLEMENT_BATCH_SIZE):
+        # Claim the chunk's mandates under their locks...
+        charging: list[tuple[int, PaymentMandate, str, str]] = []
+        with MANDATE_LOCKS.hold_many(mandate_id for _, mandate_id, _, _ in chunk):
+            payable = []
+            for index, mandate_id, authorization_token, idempotency_key in chunk:
+                recorded = MANDATE_STORE.get_receipt(mandate_id)
+                if recorded:
+                    results[index] = _replay_receipt(mandate_id, idempotency_key, recorded)
+                    continue
+
+                mandate = MANDATE_STORE.get_mandate(mandate_id)
+                error = _check_payable(mandate_id, mandate)
+                if error:
+                    results[index] = error
+                    continue
+
+                payable.append((index, mandate, authorization_token, idempotency_key))
+
+            claims = _claim_mandates([(mandate, token) for _, mandate, token, _ in payable])
+            for item, error in zip(payable, claims):
+                if error:
+                    results[item[0]] = error
+                    continue
+                charging.append(item)
+                SETTLEMENTS_IN_FLIGHT[item[1].mandate_id] = concurrent.futures.Future()
+
+        if not charging:
+            continue
+
+        # ...then charge them with no lock held, as for a single payment:
+        # PROCESSING claims them, and retries of one of them share its
+        # outcome through SETTLEMENTS_IN_FLIGHT
+        mandate_ids = [mandate.mandate_id for _, mandate, _, _ in charging]
+        amounts = mandate_totals([mandate for _, mandate, _, _ in charging])
+        try:
+            outcomes = _charge([
+                _charge_for(mandate, amount) for (_, mandate, _, _), amount in zip(charging, amounts)
+            ])
+            with MANDATE_LOCKS.hold_many(mandate_ids):
+                recorded = _record_outcomes(
+                    [(mandate, idempotency_key) for _, mandate, _, idempotency_key in charging],
+                    outcomes,
+                )
+                settlements = [SETTLEMENTS_IN_FLIGHT.pop(mandate_id) for mandate_id in mandate_ids]
+        except BaseException as e:
+            for mandate_id in mandate_ids:
+                settlement = SETTLEMENTS_IN_FLIGHT.pop(mandate_id, None)
+                if settlement is not None:
+                    settlement.set_exception(e)
+            raise
+
+        for (index, _, _, _), result, settlement in zip(charging, recorded, settlements):
+            results[index] = result
+            settlement.set_result(result)
+        round_trips += 1
+
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    processing = sum(1 for result in results if result["status"] == "processing")
+    failed = len(payments) - succeeded - processing
+
+    return {
+        "status": "success" if succeeded == len(payments) else ("error" if failed == len(payments) else "partial"),
+        "message": f"Settled {succeeded} of {len(payments)} payments"
+                   + (f" ({processing} awaiting the payment processor)" if processing else ""),
+        "settled": succeeded,
+        "processing": processing,
+        "failed": failed,
+        "results": results,
+        "metrics": {
+            "batch_size": SETTLEMENT_BATCH_SIZE,
+            "processor_round_trips": round_trips,
+            "elapsed_seconds": round(elapsed, 6),
+            "payments_per_second": round(len(payments) / elapsed, 1) if elapsed else None,
+        },
+    }
+
+
+def submit_authorized_payment(
+    mandate_id: str,
+    authorization_token: str,
+    idempotency_key: str | None = None,
+) -> dict[str, Any]:
+    """
+    Submit an authorized payment and return without waiting for the processor.
+
+    The seat is secured and the mandate moves to PROCESSING right away;
+    the booking is confirmed in the background once the payment
+    processor answers (or, if its answer is lost, once the payment is
+    reconciled). Poll get_payment_status for the receipt.
+
+    Args:
+        mandate_id: The mandate to process
+        authorization_token: User's authorization token
+        idempotency_key: Optional client retry key (defaults to mandate_id)
+
+    Returns:
+        Processing acknowledgement, the original receipt for a retry, or error
+    """
+    idempotency_key = idempotency_key or mandate_id
+
+    recorded = MANDATE_STORE.get_receipt(mandate_id)
+    if recorded:
+        return _replay_receipt(mandate_id, idempotency_key, recorded)
+
+    with MANDATE_LOCKS.hold(mandate_id):
+        recorded = MANDATE_STORE.get_receipt(mandate_id)
+        if recorded:
+            return _replay_receipt(mandate_id, idempotency_key, recorded)
+
+        mandate = MANDATE_STORE.get_mandate(mandate_id)
+        error = _check_payable(mandate_id, mandate)
+        if error:
+            return error
+
+        # PROCESSING claims the mandate, so the lock is not held while
+        # the processor works
+        error = _begin_settlement(mandate, authorization_token)
+        if error:
+            return error
+
+    _submit_charge(mandate, idempotency_key)
+
+    return {
+        "status": "processing",
+        "message": "Payment submitted - the booking is confirmed once the processor approves it",
+        "mandate_id": mandate_id,
+    }
+
+
+def get_payment_status(mandate_id: str) -> dict[str, Any]:
+    """
+    Check on a payment submitted with submit_authorized_payment.
+
+    Args:
+        mandate_id: The mandate that was submitted
+
+    Returns:
+        The receipt once the booking is confirmed, otherwise the payment status
+    """
+    recorded = MANDATE_STORE.get_receipt(mandate_id)
+    if recorded:
+        return recorded[1]
+
+    mandate = MANDATE_STORE.get_mandate(mandate_id)
+    if not mandate:
+        return {
+            "status": "error",
+            "message": f"Mandate {mandate_id} not found"
+        }
+
+    if mandate.status == PaymentStatus.PROCESSING:
+        return {
+            "status": "processing",
+            "message": "Payment is being processed",
+            "mandate_id": mandate_id,
+        }
+
+    if mandate.status == PaymentStatus.PENDING:
+        return {
+            "status": "pending",
+            "message": "Mandate is awaiting authorization",
+            "mandate_id": mandate_id,
+        }
+
+    return {
+        "status": "error",
+        "message": f"Payment was not completed (status: {mandate.status.value})"
+    }
+
+
+def _submit_charge(mandate: PaymentMandate, idempotency_key: str) -> None:
+    """Send a claimed mandate's charge through the settlement pipeline."""
+    SETTLEMENT_PIPELINE.submit(
+        _charge_for(mandate),
+        callback=functools.partial(_finish_submitted_payment, idempotency_key),
+    )
+
+
+def _finish_submitted_payment(idempotency_key: str, charge: Charge, outcome: ChargeResult) -> None:
+    """
+    Record the processor's answer for a submitted payment. Runs in a
+    pipeline worker thread.
+
+    If recording it fails the answer is lost with it, so the payment is
+    left processing, its seat sold, to be reconciled like any other
+    payment whose outcome is unknown.
+    """
+    try:
+        _record_submitted_payment(idempotency_key, charge, outcome)
+    except Exception:
+        _defer_reconciliation(charge.mandate_id, idempotency_key, submitted=True)
+        raise
+
+
+def _record_submitted_payment(idempotency_key: str, charge: Charge, outcome: ChargeResult) -> None:
+    """Apply and persist the processor's answer for a submitted payment."""
+    with MANDATE_LOCKS.hold(charge.mandate_id):
+        mandate = MANDATE_STORE.get_mandate(charge.mandate_id)
+        if not mandate or mandate.status != PaymentStatus.PROCESSING:
+            return
+
+        if outcome.unknown:
+            _defer_reconciliation(charge.mandate_id, idempotency_key, submitted=True)
+            return
+
+        records = _apply_outcome(mandate, outcome)
+        if records is None:
+            MANDATE_STORE.save_mandate(mandate)
+            return
+
+        booking, receipt = records
+        try:
+            with MANDATE_STORE.batch():
+                _save_settlement(mandate, idempotency_key, booking, receipt)
+        except DuplicateReceiptError:
+            # Another worker process settled it first; its receipt stands
+            pass
+
+
+def get_settlement_metrics() -> dict[str, Any]:
+    """Cumulative payment processor counters, throughput and token verification counts for this process."""
+    return {
+        **SETTLEMENT_METRICS.snapshot(),
+        "in_flight": SETTLEMENT_PIPELINE.in_flight,
+        "authorization": AUTHORIZATION_VERIFIER.stats(),
+    }
+
+
+def get_search_cache_stats() -> dict[str, Any]:
+    """Search cache hit rate, evictions and approximate memory use for this process."""
+    return SEARCH_CACHE.stats()
+
+
+def _check_payable(mandate_id: str, mandate: PaymentMandate | None) -> dict[str, Any] | None:
+    """
+    Return the error for a mandate that cannot be paid, or None.
+
+    Expired mandates are expired on the spot. Caller holds the mandate lock.
+    """
+    if not mandate:
+        return {
+            "status": "error",
+            "message": f"Mandate {mandate_id} not found"
+        }
+
+    if mandate.is_expired():
+        _expire_mandate(mandate)
+        return {
+            "status": "error",
+            "message": f"Mandate {mandate_id} expired before it was authorized. Please create a new booking mandate."
+        }
+
+    if mandate.status == PaymentStatus.PROCESSING:
+        return {
+            "status": "error",
+            "message": f"Payment for mandate {mandate_id} is already being processed"
+        }
+
+    if mandate.status != PaymentStatus.PENDING:
+        return {
+            "status": "error",
+            "message": f"Mandate is not pending (status: {mandate.status.value})"
+        }
+
+    return None
+
+
+def _replay_receipt(
+    mandate_id: str,
+    idempotency_key: str,
+    recorded: tuple[str, dict[str, Any]],
+) -> dict[str, Any]:
+    """Return the stored receipt for a retried payment."""
+    original_key, receipt = recorded
+    if original_key != idempotency_key:
+        return {
+            "status": "error",
+            "message": f"Mandate {mandate_id} was already processed with a different idempotency key"
+        }
+    return {**receipt, "idempotent_replay": True}
+
+
+def _authorization_digest(mandate: PaymentMandate) -> bytes:
+    """The digest of the mandate's payment terms that the user signs."""
+    return mandate_digest(mandate.mandate_id, mandate.user_id, mandate.merchant_agent_id, mandate.total_amount)
+
+
+def _preverify_authorizations(payments: list[tuple[str, str]]) -> None:
+    """
+    Verify the tokens of (mandate_id, authorization_token) pairs in one
+    batch, warming the verified-token cache.
+
+    Called without any mandate lock held. Verdicts are only cached here:
+    _begin_settlement re-checks each token (a cache hit) against the
+    mandate as it stands under the lock.
+    """
+    pending = []
+    for mandate_id, authorization_token in payments:
+        mandate = MANDATE_STORE.get_mandate(mandate_id)
+        if mandate is not None and mandate.status == PaymentStatus.PENDING:
+            pending.append((mandate, authorization_token))
+
+    # Total the mandates in one pass; each digest then reads its cached total
+    mandate_totals([mandate for mandate, _ in pending])
+    checks = [
+        (authorization_token, _authorization_digest(mandate), mandate.user_id)
+        for mandate, authorization_token in pending
+    ]
+    if checks:
+        AUTHORIZATION_VERIFIER.verify_many(checks)
+
+
+def _begin_settlement(mandate: PaymentMandate, authorization_token: str) -> dict[str, Any] | None:
+    """
+    Verify the user's authorization, claim the mandate by saving it as
+    PROCESSING, and sell its seat.
+
+    The claim only succeeds while the stored mandate is still pending,
+    so when workers sharing a store race to pay the same mandate exactly
+    one of them charges it. A rejected token leaves the mandate pending,
+    so the payment can be retried with a valid one.
+
+    Returns:
+        None when the mandate is claimed and ready to charge, else the
+        error response
+    """
+    try:
+        AUTHORIZATION_VERIFIER.verify(authorization_token, _authorization_digest(mandate), mandate.user_id)
+    except InvalidAuthorizationToken as e:
+        return {
+            "status": "error",
+            "message": f"Authorization rejected for mandate {mandate.mandate_id}: {e}"
+        }
+
+    mandate.authorize(authorization_token)
+    mandate.status = PaymentStatus.PROCESSING
+    if not MANDATE_STORE.transition_mandate(mandate, PaymentStatus.PENDING):
+        # Another worker got there first (paying, cancelling or expiring it)
+        return {
+            "status": "error",
+            "message": f"Mandate {mandate.mandate_id} is no longer pending"
+        }
+    MANDATE_EXPIRY.cancel(mandate.mandate_id)
+
+    # Turn the seat hold into a sale
+    try:
+        _commit_seat(mandate)
+    except HoldExpiredError as e:
+        mandate.status = PaymentStatus.FAILED
+        MANDATE_STORE.save_mandate(mandate)
+        return {
+            "status": "error",
+            "message": f"{e}. Please create a new booking mandate."
+        }
+    except SeatUnavailableError:
+        mandate.status = PaymentStatus.FAILED
+        MANDATE_STORE.save_mandate(mandate)
+        return {
+            "status": "error",
+            "message": "No seats available on this flight"
+        }
+    return None
+
+
+def _charge_for(mandate: PaymentMandate, amount: Money | None = None) -> Charge:
+    """
+    The processor charge for a claimed mandate (amount defaults to its total).
+
+    Its idempotency key is the mandate_id rather than the client's retry
+    key: a mandate is captured at most once, and a charge whose answer
+    was lost can be resent, even after a restart, without charging twice.
+    """
+    return Charge(
+        mandate_id=mandate.mandate_id,
+        amount=mandate.total_amount if amount is None else amount,
+        authorization_token=mandate.user_authorization_token,
+        idempotency_key=mandate.mandate_id,
+    )
+
+
+def _charge(charges: list[Charge]) -> list[ChargeResult]:
+    """
+    Send one batch of charges to the payment processor.
+
+    A round trip that fails leaves its charges' outcomes unknown (they
+    may have been captured before the failure), so every claimed
+    mandate gets an answer without being declined on a guess.
+    """
+    started = time.perf_counter()
+    try:
+        outcomes = PAYMENT_PROCESSOR.charge_batch(charges)
+    except Exception as e:
+        outcomes = unanswered(charges, f"Payment processor unavailable: {e}")
+    SETTLEMENT_METRICS.record(outcomes, time.perf_counter() - started)
+    return outcomes
+
+
+def _apply_outcome(
+    mandate: PaymentMandate,
+    outcome: ChargeResult,
+) -> tuple[dict[str, Any], dict[str, Any]] | None:
+    """
+    Move a PROCESSING mandate to its final status.
+
+    Returns:
+        (booking, receipt) if the charge was approved, None if it was
+        declined. Unknown outcomes are handled by the caller.
+    """
+    if not outcome.approved:
+        # The seat was sold when settlement began; put it back
+        mandate.status = PaymentStatus.FAILED
+        SEAT_INVENTORY.restock(mandate.merchant_reference)
+        return None
+
+    mandate.status = PaymentStatus.COMPLETED
+    return _booking_records(mandate, outcome.transaction_id)
+
+
+def _defer_reconciliation(mandate_id: str, idempotency_key: str, submitted: bool = False) -> None:
+    """
+    Leave a PROCESSING mandate whose charge outcome is unknown for
+    expire_stale_mandates to reconcile after SETTLEMENT_TIMEOUT_SECONDS.
+    Its seat stays sold meanwhile.
+    """
+    UNRESOLVED_PAYMENTS[mandate_id] = (idempotency_key, submitted)
+    MANDATE_EXPIRY.schedule_in(mandate_id, SETTLEMENT_TIMEOUT_SECONDS)
+
+
+def _booking_records(mandate: PaymentMandate, transaction_id: str | None) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Build the booking and the receipt for a paid mandate."""
+    mandate_id = mandate.mandate_id
+    booking_id = f"BK{mandate_id[:8].upper()}"
+    receipt = {
+        "status": "success",
+        "message": "Payment processed and booking confirmed!",
+        "booking": {
+            "booking_id": booking_id,
+            "flight_id": mandate.merchant_reference,
+            "confirmation_code": booking_id,
+            "amount_charged": str(mandate.total_amount),
+            "payment_status": "completed",
+        },
+        "ap2_receipt": {
+            "mandate_id": mandate_id,
+            "authorization_timestamp": mandate.authorization_timestamp.isoformat() if mandate.authorization_timestamp else None,
+            "merchant": mandate.merchant_agent_id,
+            "shopper": mandate.shopper_agent_id,
+            "transaction_id": transaction_id,
+        }
+    }
+    booking = {
+        "booking_id": booking_id,
+        "mandate_id": mandate_id,
+        "flight_id": mandate.merchant_reference,
+        "status": "confirmed",
+        "total_paid": float(mandate.total_amount),
+    }
+    return booking, receipt
+
+
+def _save_settlement(
+    mandate: PaymentMandate,
+    idempotency_key: str,
+    booking: dict[str, Any],
+    receipt: dict[str, Any],
+) -> None:
+    """Write a paid mandate's status, booking and receipt. Call inside a store batch."""
+    MANDATE_STORE.save_mandate(mandate)
+    MANDATE_STORE.save_booking(booking)
+    MANDATE_STORE.save_receipt(mandate.mandate_id, idempotency_key, receipt)
+
+
+def _claim_mandates(items: list[tuple[PaymentMandate, str]]) -> list[dict[str, Any] | None]:
+    """
+    Begin settling pending mandates, with every claim in one store commit.
+
+    Args:
+        items: (mandate, authorization_token) for each mandate. Caller
+            holds every mandate's lock.
+
+    Returns:
+        For each item, None if it was claimed and is ready to charge,
+        else its error response
+    """
+    if not items:
+        return []
+    with MANDATE_STORE.batch():
+        return [_begin_settlement(mandate, authorization_token) for mandate, authorization_token in items]
+
+
+def _record_outcomes(
+    items: list[tuple[PaymentMandate, str]],
+    outcomes: list[ChargeResult],
+) -> list[dict[str, Any]]:
+    """
+    Apply the processor's answers to charged mandates and persist them.
+
+    Args:
+        items: (mandate, idempotency_key) for each charged mandate.
+            Caller holds every mandate's lock.
+        outcomes: The processor's result for each item, in order
+
+    Returns:
+        The receipt, error or processing status for each item, in order
+    """
+    results: list[dict[str, Any] | None] = [None] * len(items)
+
+    declined = []
+    completed = []
+    for index, ((mandate, idempotency_key), outcome) in enumerate(zip(items, outcomes)):
+        if outcome.unknown:
+            # Neither approved nor declined: the mandate stays processing
+            # until the processor is asked again
+            _defer_reconciliation(mandate.mandate_id, idempotency_key)
+            results[index] = {
+                "status": "processing",
+                "message": f"Payment not confirmed yet ({outcome.message}) - poll get_payment_status",
+                "mandate_id": mandate.mandate_id,
+            }
+            continue
+
+        records = _apply_outcome(mandate, outcome)
+        if records is None:
+            declined.append(mandate)
+            results[index] = {
+                "status": "error",
+                "message": f"Payment declined: {outcome.message or 'no reason given'}"
+            }
+            continue
+
+        booking, receipt = records
+        completed.append((index, mandate, idempotency_key, booking, receipt))
+        results[index] = receipt
+
+    # Persist every new status, booking and receipt in one commit
+    try:
+        with MANDATE_STORE.batch():
+            for mandate in declined:
+                MANDATE_STORE.save_mandate(mandate)
+            for _, mandate, idempotency_key, booking, receipt in completed:
+                _save_settlement(mandate, idempotency_key, booking, receipt)
+    except DuplicateReceiptError:
+        # Another worker process settled one of these first. Commit them
+        # one at a time so the rest still go through.
+        for mandate in declined:
+            MANDATE_STORE.save_mandate(mandate)
+        for index, mandate, idempotency_key, booking, receipt in completed:
+            try:
+                with MANDATE_STORE.batch():
+                    _save_settlement(mandate, idempotency_key, booking, receipt)
+            except DuplicateReceiptError:
+                results[index] = _replay_receipt(
+                    mandate.mandate_id, idempotency_key, MANDATE_STORE.get_receipt(mandate.mandate_id)
+                )
+
+    return results
+
+
+# ============================================================================
+# Reconciliation & Support Queries
+# ============================================================================
+
+def _parse_status(status: str | None) -> PaymentStatus | None:
+    """Parse a status filter. Raises ValueError for unknown statuses."""
+    if status is None:
+        return None
+    try:
+        return PaymentStatus(status.lower())
+    except ValueError:
+        raise ValueError(
+            f"Unknown status '{status}' (expected one of: {', '.join(s.value for s in PaymentStatus)})"
+        ) from None
+
+
+def _mandate_record(mandate: PaymentMandate) -> dict[str, Any]:
+    """A mandate's summary plus the fields support staff search by."""
+    return {
+        **mandate.to_summary(),
+        "user_id": mandate.user_id,
+        "shopper_agent_id": mandate.shopper_agent_id,
+        "flight_id": mandate.merchant_reference,
+        "created_at": mandate.created_at.isoformat(),
+    }
+
+
+def find_mandates(
+    user_id: str | None = None,
+    shopper_agent_id: str | None = None,
+    status: str | None = None,
+    flight_id: str | None = None,
+    limit: int | None = 50,
+) -> dict[str, Any]:
+    """
+    Look up mandates by user, shopper agent, status and/or flight.
+
+    Served from the store's secondary indexes, never a full scan, e.g.
+    every pending mandate for a user, or every completed one for a
+    flight. Results are newest first.
+
+    Args:
+        user_id: Optional user filter
+        shopper_agent_id: Optional shopper agent filter
+        status: Optional status filter ('pending', 'completed', ...)
+        flight_id: Optional flight filter
+        limit: Maximum number of mandates to return (None for all)
+
+    Returns:
+        The matching mandates and how many match in total
+    """
+    try:
+        criteria = {
+            "user_id": user_id,
+            "shopper_agent_id": shopper_agent_id,
+            "status": _parse_status(status),
+            "merchant_reference": flight_id,
+        }
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    mandates = MANDATE_STORE.find_mandates(**criteria, limit=limit)
+    return {
+        "status": "success",
+        "total": MANDATE_STORE.count_mandates(**criteria),
+        "mandates": [_mandate_record(mandate) for mandate in mandates],
+    }
+
+
+def find_bookings(
+    user_id: str | None = None,
+    flight_id: str | None = None,
+    limit: int | None = 50,
+) -> dict[str, Any]:
+    """
+    Look up confirmed bookings by user and/or flight, newest first.
+
+    Args:
+        user_id: Optional user filter
+        flight_id: Optional flight filter
+        limit: Maximum number of bookings to return (None for all)
+
+    Returns:
+        The bookings, each with the mandate it was paid through
+    """
+    mandates = MANDATE_STORE.find_mandates(
+        user_id=user_id,
+        status=PaymentStatus.COMPLETED,
+        merchant_reference=flight_id,
+        limit=limit,
+    )
+    by_id = {mandate.mandate_id: mandate for mandate in mandates}
+    bookings = MANDATE_STORE.find_bookings(by_id)
+    return {
+        "status": "success",
+        "count": len(bookings),
+        "bookings": [
+            {**booking, "user_id": by_id[booking["mandate_id"]].user_id}
+            for booking in bookings
+        ],
+    }
+
+
+def count_mandates_by_status(
+    user_id: str | None = None,
+    shopper_agent_id: str | None = None,
+    flight_id: str | None = None,
+) -> dict[str, int]:
+    """
+    Mandate counts per status, for reconciliation.
+
+    Only mandates still held by the store are counted; the in-memory
+    store drops expired mandates.
+
+    Args:
+        user_id: Optional user filter
+        shopper_agent_id: Optional shopper agent filter
+        flight_id: Optional flight filter
+
+    Returns:
+        The number of matching mandates in each status
+    """
+    return {
+        status.value: MANDATE_STORE.count_mandates(
+            user_id=user_id,
+            shopper_agent_id=shopper_agent_id,
+            status=status,
+            merchant_reference=flight_id,
+        )
+        for status in PaymentStatus
     }
 
 
@@ -322,11 +1747,19 @@ def process_authorized_payment(
 # Create the Merchant Agent
 # ============================================================================
 
-# Define tools
-search_flights_tool = FunctionTool(func=search_flights)
+# Define tools (the hot paths are async so they never block ADK's event loop)
+search_flights_tool = FunctionTool(func=async_tool(search_flights_async, "search_flights"))
 get_flight_details_tool = FunctionTool(func=get_flight_details)
-create_booking_mandate_tool = FunctionTool(func=create_booking_mandate)
-process_authorized_payment_tool = FunctionTool(func=process_authorized_payment)
+create_booking_mandate_tool = FunctionTool(func=async_tool(create_booking_mandate_async, "create_booking_mandate"))
+create_booking_mandates_tool = FunctionTool(func=create_booking_mandates)
+process_authorized_payment_tool = FunctionTool(func=async_tool(process_authorized_payment_async, "process_authorized_payment"))
+process_authorized_payments_tool = FunctionTool(func=process_authorized_payments)
+submit_authorized_payment_tool = FunctionTool(func=submit_authorized_payment)
+get_payment_status_tool = FunctionTool(func=get_payment_status)
+cancel_booking_mandate_tool = FunctionTool(func=cancel_booking_mandate)
+find_mandates_tool = FunctionTool(func=find_mandates)
+find_bookings_tool = FunctionTool(func=find_bookings)
+count_mandates_by_status_tool = FunctionTool(func=count_mandates_by_status)
 
 # Create the agent
 merchant_agent = Agent(
@@ -339,8 +1772,14 @@ merchant_agent = Agent(
     Your capabilities:
     1. Search for available flights based on origin, destination, date, and preferences
     2. Provide detailed flight information
-    3. Create payment mandates for bookings (AP2 protocol)
-    4. Process payments after user authorization
+    3. Create payment mandates for bookings (AP2 protocol), one at a time or
+       in bulk for group and corporate bookings
+    4. Process payments after user authorization, batching many
+       authorized payments into one settlement when asked, or submitting
+       them for background confirmation and reporting their status later
+    5. Cancel pending mandates so their seats go back on sale
+    6. Look up mandates and confirmed bookings by user, shopper agent,
+       status or flight, and count mandates per status for reconciliation
 
     When a shopper agent wants to book a flight:
     1. First help them search for available options
@@ -355,7 +1794,15 @@ merchant_agent = Agent(
         search_flights_tool,
         get_flight_details_tool,
         create_booking_mandate_tool,
+        create_booking_mandates_tool,
         process_authorized_payment_tool,
+        process_authorized_payments_tool,
+        submit_authorized_payment_tool,
+        get_payment_status_tool,
+        cancel_booking_mandate_tool,
+        find_mandates_tool,
+        find_bookings_tool,
+        count_mandates_by_status_tool,
     ],
 )
 
@@ -0,0 +1,133 @@
+"""
+Flight Catalog
+
+Single source of truth for the merchant's flights, keyed by flight_id.
+Every booking step looks flights up here in O(1), and the search
+indexes in ``FlightInventory`` are kept in step with every change.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator
+
+from .inventory import FlightInventory
+from .query import FilterPlan
+from .results import iter_sorted, paginate
+
+
+# Fields that determine where a flight sits in the search indexes
+INDEXED_FIELDS = frozenset({"origin", "destination", "departure", "class", "price"})
+
+
+class FlightCatalog(Mapping):
+    """
+    Flights keyed by flight_id, with search indexes kept consistent.
+
+    Reads go through the ``Mapping`` interface (``catalog[flight_id]``,
+    ``catalog.get(flight_id)``); writes must go through ``add``,
+    ``update`` and ``remove`` so the indexes never go stale.
+    """
+
+    def __init__(self, flights: Iterable[dict[str, Any]] = ()):
+        self._inventory = FlightInventory()
+        for flight in flights:
+            self.add(flight)
+
+    def __getitem__(self, flight_id: str) -> dict[str, Any]:
+        flight = self._inventory.get(flight_id)
+        if flight is None:
+            raise KeyError(flight_id)
+        return flight
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._inventory)
+
+    def __len__(self) -> int:
+        return len(self._inventory)
+
+    def __contains__(self, flight_id: object) -> bool:
+        return flight_id in self._inventory
+
+    def get(self, flight_id: str, default: Any = None) -> Any:
+        flight = self._inventory.get(flight_id)
+        return default if flight is None else flight
+
+    def add(self, flight: dict[str, Any]) -> None:
+        """Add a new flight to the catalog."""
+        self._inventory.add(flight)
+
+    def update(self, flight_id: str, **changes: Any) -> dict[str, Any]:
+        """
+        Update fields on an existing flight.
+
+        Changes to indexed fields (route, departure, class, price)
+        re-index the flight; anything else is applied in place.
+
+        Returns:
+            The updated flight
+        """
+        flight = self[flight_id]
+        if "flight_id" in changes and changes["flight_id"] != flight_id:
+            raise ValueError("flight_id cannot be changed; remove and re-add the flight")
+
+        if INDEXED_FIELDS.isdisjoint(changes):
+            flight.update(changes)
+            return flight
+
+        self._inventory.remove(flight_id)
+        flight.update(changes)
+        self._inventory.add(flight)
+        return flight
+
+    def remove(self, flight_id: str) -> dict[str, Any]:
+        """Remove a flight from the catalog and return it."""
+        if flight_id not in self._inventory:
+            raise KeyError(flight_id)
+        return self._inventory.remove(flight_id)
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+    ) -> list[dict[str, Any]]:
+        """Find bookable flights using the catalog's indexes."""
+        return self._inventory.search(origin, destination, date, travel_class, max_price)
+
+    def search_plan(self, plan: FilterPlan) -> list[dict[str, Any]]:
+        """Find bookable flights matching a normalized search plan."""
+        return self._inventory.search_plan(plan)
+
+    def search_page(
+        self,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+        sort_by: str | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """
+        Find one page of bookable flights.
+
+        Returns:
+            (page of flights, total number of matches)
+        """
+        matches = self._inventory.search(origin, destination, date, travel_class, max_price)
+        return paginate(matches, sort_by, offset, limit)
+
+    def iter_search(
+        self,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+        sort_by: str | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Stream bookable flights, optionally in sort order."""
+        matches = self._inventory.iter_search(origin, destination, date, travel_class, max_price)
+        return iter_sorted(matches, sort_by) if sort_by else matches
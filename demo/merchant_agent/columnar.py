@@ -0,0 +1,315 @@
+"""
+Columnar Flight Catalog
+
+A NumPy-backed alternative to ``FlightCatalog`` for large schedules.
+Flights are stored column by column (prices, seats and departure times
+as arrays, airports/airline/class as categorical codes), search filters
+run as vectorized boolean masks, and rows are only turned back into
+dicts for the flights that are actually returned.
+
+NumPy is an optional dependency; it is only needed when this catalog
+mode is selected.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator
+
+from .query import FilterPlan
+from .results import DATETIME_FORMAT, sort_key
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+# Columns stored as categorical codes
+CATEGORICAL_FIELDS = ("airline", "origin", "destination", "class")
+
+_INITIAL_CAPACITY = 1024
+
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+def _to_epoch(value: str) -> int:
+    """Parse a 'YYYY-MM-DD HH:MM' timestamp into epoch seconds."""
+    return int(datetime.strptime(value, DATETIME_FORMAT).replace(tzinfo=timezone.utc).timestamp())
+
+
+def _from_epoch(value: int) -> str:
+    return datetime.fromtimestamp(int(value), tz=timezone.utc).strftime(DATETIME_FORMAT)
+
+
+def _day_start(ordinal: int) -> int:
+    """Epoch seconds at midnight UTC of a day ordinal."""
+    return (ordinal - _EPOCH_ORDINAL) * 86400
+
+
+class _Vocabulary:
+    """Maps categorical string values to small integer codes."""
+
+    def __init__(self, normalize=None):
+        self._codes: dict[str, int] = {}
+        self.values: list[str] = []
+        self._normalize = normalize
+
+    def encode(self, value: str) -> int:
+        key = self._normalize(value) if self._normalize else value
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> int:
+        """Return the code for value, or -1 if it has never been seen."""
+        key = self._normalize(value) if self._normalize else value
+        return self._codes.get(key, -1)
+
+
+class ColumnarFlightCatalog:
+    """
+    Flights stored as NumPy columns, keyed by flight_id.
+
+    Exposes the same read/write surface as ``FlightCatalog`` (``get``,
+    ``add``, ``update``, ``remove``, ``search``) so the merchant tools
+    do not care which catalog mode is active.
+    """
+
+    def __init__(self, flights: Iterable[dict[str, Any]] = ()):
+        if np is None:
+            raise RuntimeError("The columnar catalog requires numpy (pip install numpy)")
+
+        self._size = 0
+        self._ids: list[str | None] = []
+        self._rows: dict[str, int] = {}
+
+        self._vocab = {
+            "airline": _Vocabulary(),
+            "origin": _Vocabulary(str.upper),
+            "destination": _Vocabulary(str.upper),
+            "class": _Vocabulary(str.lower),
+        }
+
+        self._allocate(_INITIAL_CAPACITY)
+        for flight in flights:
+            self.add(flight)
+
+    def _allocate(self, capacity: int) -> None:
+        """Grow every column to capacity, keeping existing rows."""
+        columns = {
+            "price": np.zeros(capacity, dtype=np.float64),
+            "seats": np.zeros(capacity, dtype=np.int32),
+            "departure": np.zeros(capacity, dtype=np.int64),
+            "arrival": np.zeros(capacity, dtype=np.int64),
+            "live": np.zeros(capacity, dtype=bool),
+            **{field: np.full(capacity, -1, dtype=np.int32) for field in CATEGORICAL_FIELDS},
+        }
+        for name, column in columns.items():
+            if hasattr(self, "_columns"):
+                column[: self._size] = self._columns[name][: self._size]
+        self._columns = columns
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, flight_id: object) -> bool:
+        return flight_id in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __getitem__(self, flight_id: str) -> dict[str, Any]:
+        return self._materialize(self._rows[flight_id])
+
+    def get(self, flight_id: str, default: Any = None) -> Any:
+        row = self._rows.get(flight_id)
+        return default if row is None else self._materialize(row)
+
+    def _write_row(self, row: int, flight: dict[str, Any]) -> None:
+        cols = self._columns
+        cols["price"][row] = flight["price"]
+        cols["seats"][row] = flight["seats_available"]
+        cols["departure"][row] = _to_epoch(flight["departure"])
+        cols["arrival"][row] = _to_epoch(flight["arrival"])
+        cols["live"][row] = True
+        for field in CATEGORICAL_FIELDS:
+            cols[field][row] = self._vocab[field].encode(flight[field])
+
+    def add(self, flight: dict[str, Any]) -> None:
+        """Append a new flight to the catalog."""
+        flight_id = flight["flight_id"]
+        if flight_id in self._rows:
+            raise ValueError(f"Flight {flight_id} is already indexed")
+
+        if self._size == len(self._columns["live"]):
+            self._allocate(self._size * 2)
+
+        row = self._size
+        self._write_row(row, flight)
+        self._ids.append(flight_id)
+        self._rows[flight_id] = row
+        self._size += 1
+
+    def update(self, flight_id: str, **changes: Any) -> dict[str, Any]:
+        """Update fields on an existing flight in place."""
+        if "flight_id" in changes and changes["flight_id"] != flight_id:
+            raise ValueError("flight_id cannot be changed; remove and re-add the flight")
+        row = self._rows[flight_id]
+        flight = self._materialize(row)
+        flight.update(changes)
+        self._write_row(row, flight)
+        return flight
+
+    def remove(self, flight_id: str) -> dict[str, Any]:
+        """Remove a flight and return it. The row is left as a tombstone."""
+        row = self._rows.pop(flight_id)
+        flight = self._materialize(row)
+        self._columns["live"][row] = False
+        self._ids[row] = None
+        return flight
+
+    def _materialize(self, row: int) -> dict[str, Any]:
+        """Rebuild the dict form of a single row."""
+        cols = self._columns
+        return {
+            "flight_id": self._ids[row],
+            "airline": self._vocab["airline"].values[cols["airline"][row]],
+            "origin": self._vocab["origin"].values[cols["origin"][row]],
+            "destination": self._vocab["destination"].values[cols["destination"][row]],
+            "departure": _from_epoch(cols["departure"][row]),
+            "arrival": _from_epoch(cols["arrival"][row]),
+            "price": float(cols["price"][row]),
+            "class": self._vocab["class"].values[cols["class"][row]],
+            "seats_available": int(cols["seats"][row]),
+        }
+
+    def match(
+        self,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+    ) -> "np.ndarray":
+        """
+        Evaluate a search as boolean masks.
+
+        Returns:
+            Row numbers of matching flights, in insertion order
+        """
+        return self.match_plan(FilterPlan.from_query(origin, destination, date, travel_class, max_price))
+
+    def match_plan(self, plan: FilterPlan) -> "np.ndarray":
+        """Evaluate a normalized search plan as boolean masks. See ``match``."""
+        n = self._size
+        cols = self._columns
+
+        origin_code = self._vocab["origin"].lookup(plan.origin)
+        destination_code = self._vocab["destination"].lookup(plan.destination)
+        if origin_code < 0 or destination_code < 0:
+            return np.empty(0, dtype=np.intp)
+
+        mask = cols["live"][:n] & (cols["seats"][:n] > 0)
+        mask &= cols["origin"][:n] == origin_code
+        mask &= cols["destination"][:n] == destination_code
+
+        if plan.travel_class:
+            class_code = self._vocab["class"].lookup(plan.travel_class)
+            if class_code < 0:
+                return np.empty(0, dtype=np.intp)
+            mask &= cols["class"][:n] == class_code
+
+        if plan.max_price:
+            mask &= cols["price"][:n] <= plan.max_price
+
+        if plan.date:
+            if plan.days is not None:
+                departure = cols["departure"][:n]
+                mask &= (departure >= _day_start(plan.days[0])) & (departure < _day_start(plan.days[1]))
+            else:
+                # Irregular prefix: fall back to string matching on the survivors
+                rows = np.flatnonzero(mask)
+                keep = [_from_epoch(cols["departure"][row]).startswith(plan.date) for row in rows]
+                return rows[np.asarray(keep, dtype=bool)] if len(rows) else rows
+
+        return np.flatnonzero(mask)
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+    ) -> list[dict[str, Any]]:
+        """Find bookable flights, materializing only the matching rows."""
+        rows = self.match(origin, destination, date, travel_class, max_price)
+        return [self._materialize(row) for row in rows]
+
+    def search_plan(self, plan: FilterPlan) -> list[dict[str, Any]]:
+        """Find bookable flights matching a normalized search plan."""
+        return [self._materialize(row) for row in self.match_plan(plan)]
+
+    def _sort_column(self, sort_by: str) -> "np.ndarray":
+        sort_key(sort_by)  # raises ValueError for unknown fields
+        cols = self._columns
+        if sort_by == "duration":
+            return cols["arrival"] - cols["departure"]
+        return cols[sort_by]
+
+    def search_page(
+        self,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+        sort_by: str | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """
+        Find one page of bookable flights.
+
+        Top-k ordering partitions the sort column to find the last key
+        that can reach the page, and only the rows on the requested page
+        are materialized. Ties are broken by row, so pages never overlap
+        or skip rows that share a key.
+
+        Returns:
+            (page of flights, total number of matches)
+        """
+        rows = self.match(origin, destination, date, travel_class, max_price)
+        total = len(rows)
+        end = total if limit is None else min(offset + limit, total)
+
+        if sort_by and offset < end:
+            keys = self._sort_column(sort_by)[rows]
+            if end < total:
+                # Keep every row tied with the last key on the page: an
+                # argpartition cut would pick an arbitrary subset of them,
+                # a different one for each page size
+                cutoff = np.partition(keys, end - 1)[end - 1]
+                best = np.flatnonzero(keys <= cutoff)
+                rows, keys = rows[best], keys[best]
+            # rows are in row order, so the stable sort orders ties by row
+            rows = rows[np.argsort(keys, kind="stable")]
+
+        return [self._materialize(row) for row in rows[offset:end]], total
+
+    def iter_search(
+        self,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+        sort_by: str | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Stream bookable flights, materializing each row as it is consumed."""
+        rows = self.match(origin, destination, date, travel_class, max_price)
+        if sort_by:
+            rows = rows[np.argsort(self._sort_column(sort_by)[rows], kind="stable")]
+        for row in rows:
+            yield self._materialize(row)
@@ -0,0 +1,193 @@
+"""
+Flight Inventory Engine
+
+Secondary indexes over the merchant's flight schedules so that
+``search_flights`` does not have to scan every flight on every call.
+
+Indexes maintained:
+    - (origin, destination, departure date) -> flight ids
+    - (origin, destination) -> flights sorted by price
+    - (origin, destination, class) -> flights sorted by price
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
+from .query import FilterPlan, day_ordinal, intern_code
+
+
+# Sentinel used to bisect past every entry with the same price
+_MAX_SEQ = float("inf")
+
+
+def _route_key(origin: str, destination: str) -> tuple[str, str]:
+    return intern_code(origin), intern_code(destination)
+
+
+def _discard(index: dict, key: tuple, flight_id: str) -> None:
+    ids = index[key]
+    ids.remove(flight_id)
+    if not ids:
+        del index[key]
+
+
+def _discard_sorted(index: dict, key: tuple, entry: tuple) -> None:
+    entries = index[key]
+    del entries[bisect_left(entries, entry)]
+    if not entries:
+        del index[key]
+
+
+class FlightInventory:
+    """
+    Indexed view of a merchant's flights.
+
+    Airport codes and travel classes are normalized once, when a flight
+    is indexed, instead of on every lookup.
+    """
+
+    def __init__(self, flights: Iterable[dict[str, Any]] = ()):
+        self._flights: dict[str, dict[str, Any]] = {}
+        self._seq = 0
+
+        # flight_id -> (route_date_key, route_key, route_class_key, price_entry),
+        # remembered so a flight can be unindexed without recomputing its keys
+        self._keys: dict[str, tuple] = {}
+
+        # flight_id -> departure day ordinal, for date filters
+        self._days: dict[str, int] = {}
+
+        # Composite (origin, destination, date) index
+        self._by_route_date: dict[tuple[str, str, str], list[str]] = defaultdict(list)
+
+        # Price-sorted (price, seq, flight_id) entries per route and per route+class
+        self._by_route_price: dict[tuple[str, str], list[tuple[float, int, str]]] = defaultdict(list)
+        self._by_route_class_price: dict[tuple[str, str, str], list[tuple[float, int, str]]] = defaultdict(list)
+
+        for flight in flights:
+            self.add(flight)
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __contains__(self, flight_id: object) -> bool:
+        return flight_id in self._flights
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._flights)
+
+    def add(self, flight: dict[str, Any]) -> None:
+        """Index a flight. The flight dict is stored by reference."""
+        flight_id = flight["flight_id"]
+        if flight_id in self._flights:
+            raise ValueError(f"Flight {flight_id} is already indexed")
+
+        self._flights[flight_id] = flight
+        self._seq += 1
+
+        origin, destination = _route_key(flight["origin"], flight["destination"])
+        route_date_key = (origin, destination, flight["departure"][:10])
+        route_class_key = (origin, destination, flight["class"].lower())
+        entry = (flight["price"], self._seq, flight_id)
+
+        self._by_route_date[route_date_key].append(flight_id)
+        insort(self._by_route_price[(origin, destination)], entry)
+        insort(self._by_route_class_price[route_class_key], entry)
+        self._keys[flight_id] = (route_date_key, (origin, destination), route_class_key, entry)
+        self._days[flight_id] = day_ordinal(flight["departure"])
+
+    def remove(self, flight_id: str) -> dict[str, Any]:
+        """Drop a flight from every index and return it."""
+        flight = self._flights.pop(flight_id)
+        route_date_key, route_key, route_class_key, entry = self._keys.pop(flight_id)
+        del self._days[flight_id]
+
+        _discard(self._by_route_date, route_date_key, flight_id)
+        _discard_sorted(self._by_route_price, route_key, entry)
+        _discard_sorted(self._by_route_class_price, route_class_key, entry)
+
+        return flight
+
+    def get(self, flight_id: str) -> dict[str, Any] | None:
+        """Look up a flight by id."""
+        return self._flights.get(flight_id)
+
+    def _candidates(self, plan: FilterPlan) -> tuple[Iterable[str], frozenset[str]]:
+        """
+        Pick the narrowest index that applies to the plan.
+
+        Returns:
+            (candidate flight ids, filters the index already guarantees)
+        """
+        origin, destination = plan.route
+
+        # A single day hits the composite index directly
+        if plan.single_day:
+            return self._by_route_date.get((origin, destination, plan.date), ()), frozenset({"date"})
+
+        if plan.travel_class:
+            entries = self._by_route_class_price.get((origin, destination, plan.travel_class), [])
+            guaranteed = {"class"}
+        else:
+            entries = self._by_route_price.get((origin, destination), [])
+            guaranteed = set()
+
+        # Entries are price-sorted, so max_price is a single bisect
+        end = len(entries)
+        if plan.max_price:
+            end = bisect_right(entries, (plan.max_price, _MAX_SEQ))
+            guaranteed.add("max_price")
+        return [entry[2] for entry in islice(entries, end)], frozenset(guaranteed)
+
+    def iter_plan(self, plan: FilterPlan) -> Iterator[dict[str, Any]]:
+        """Yield bookable flights matching a plan, lazily."""
+        flight_ids, guaranteed = self._candidates(plan)
+        matches = plan.compile(guaranteed)
+        flights, days = self._flights, self._days
+        for flight_id in flight_ids:
+            flight = flights[flight_id]
+            if matches(flight, days[flight_id]):
+                yield flight
+
+    def iter_search(
+        self,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield bookable flights on a route, lazily.
+
+        Args:
+            origin: Origin airport code (case-insensitive)
+            destination: Destination airport code (case-insensitive)
+            date: Optional departure date or date prefix (e.g. '2025-03')
+            travel_class: Optional class filter
+            max_price: Optional maximum price
+
+        Yields:
+            Matching flights that still have seats available
+        """
+        return self.iter_plan(FilterPlan.from_query(origin, destination, date, travel_class, max_price))
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+    ) -> list[dict[str, Any]]:
+        """Find bookable flights on a route. See ``iter_search``."""
+        return self.search_plan(FilterPlan.from_query(origin, destination, date, travel_class, max_price))
+
+    def search_plan(self, plan: FilterPlan) -> list[dict[str, Any]]:
+        """Find bookable flights matching a plan."""
+        flight_ids, guaranteed = self._candidates(plan)
+        matches = plan.compile(guaranteed)
+        flights, days = self._flights, self._days
+        return [flights[flight_id] for flight_id in flight_ids if matches(flights[flight_id], days[flight_id])]
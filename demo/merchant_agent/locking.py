@@ -0,0 +1,49 @@
+"""
+Keyed Locks
+
+Fine-grained locking for per-flight and per-mandate critical sections,
+so unrelated requests never contend on a single global lock.
+"""
+
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Hashable, Iterable, Iterator
+
+
+class KeyedLocks:
+    """
+    A fixed pool of locks striped by key hash.
+
+    Two keys may share a stripe, which only costs a little extra
+    contention; memory stays bounded no matter how many keys are seen.
+    """
+
+    def __init__(self, stripes: int = 256):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _index(self, key: Hashable) -> int:
+        return hash(key) % len(self._locks)
+
+    def lock_for(self, key: Hashable) -> threading.Lock:
+        """Return the lock guarding key."""
+        return self._locks[self._index(key)]
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        """Hold the lock for a single key."""
+        with self.lock_for(key):
+            yield
+
+    @contextmanager
+    def hold_many(self, keys: Iterable[Hashable]) -> Iterator[None]:
+        """
+        Hold the locks for several keys at once.
+
+        Stripes are acquired in index order, so concurrent callers with
+        overlapping keys cannot deadlock.
+        """
+        indexes = sorted({self._index(key) for key in keys})
+        with ExitStack() as stack:
+            for index in indexes:
+                stack.enter_context(self._locks[index])
+            yield
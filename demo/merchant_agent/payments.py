@@ -0,0 +1,255 @@
+"""
+Payment Processing
+
+The merchant's side of the payment processor, behind an interface so
+a real gateway can be swapped in for the local stub.
+
+Processors charge per round trip, so the interface takes a batch of
+charges at a time; settling one mandate is just a batch of one.
+
+Every charge carries an idempotency key, and a processor answers a
+key it has seen before with its original result instead of charging
+again. A charge whose answer was lost can therefore be resent to find
+out what happened to it.
+
+Two flavours of the interface exist: PaymentProcessor blocks the
+calling thread, AsyncPaymentProcessor is awaited on an event loop
+(see pipeline.py).
+"""
+
+import asyncio
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Sequence
+
+from shared.money import Money
+
+
+@dataclass
+class Charge:
+    """A request to capture an authorized mandate's total."""
+    mandate_id: str
+    amount: Money
+    authorization_token: str
+    idempotency_key: str
+
+
+@dataclass
+class ChargeResult:
+    """
+    The processor's answer for one charge.
+
+    unknown is set when no answer came back (a timeout or a failed round
+    trip): the charge may or may not have been captured, and is neither
+    approved nor declined until it is resent under the same idempotency
+    key.
+    """
+    mandate_id: str
+    approved: bool
+    transaction_id: str | None = None
+    message: str = ""
+    unknown: bool = False
+
+
+class ProcessorError(Exception):
+    """Raised when the payment processor fails a whole round trip (outage, timeout)."""
+
+
+def declined(charges: Iterable[Charge], message: str) -> list[ChargeResult]:
+    """Decline every charge, e.g. when it was never sent to the processor."""
+    return [ChargeResult(charge.mandate_id, approved=False, message=message) for charge in charges]
+
+
+def unanswered(charges: Iterable[Charge], message: str) -> list[ChargeResult]:
+    """Mark every charge's outcome unknown, e.g. when its round trip failed."""
+    return [ChargeResult(charge.mandate_id, approved=False, message=message, unknown=True) for charge in charges]
+
+
+class PaymentProcessor(ABC):
+    """Interface to a payment processor."""
+
+    @abstractmethod
+    def charge_batch(self, charges: Sequence[Charge]) -> list[ChargeResult]:
+        """
+        Capture several charges in one round trip.
+
+        Returns:
+            One result per charge, in the same order
+        """
+
+    def charge(self, charge: Charge) -> ChargeResult:
+        """Capture a single charge."""
+        return self.charge_batch([charge])[0]
+
+
+class StubPaymentProcessor(PaymentProcessor):
+    """
+    Local stand-in for a payment processor.
+
+    Approves every charge unless its mandate is listed in ``decline``,
+    answers a repeated idempotency key with the original result, and
+    can sleep for ``round_trip_seconds`` per call to model network
+    cost when benchmarking.
+    """
+
+    def __init__(self, round_trip_seconds: float = 0.0, decline: Iterable[str] = ()):
+        self.round_trip_seconds = round_trip_seconds
+        self.decline = set(decline)
+        self.round_trips = 0
+        # Answers already given, by idempotency key
+        self._answers: dict[str, ChargeResult] = {}
+
+    def charge_batch(self, charges: Sequence[Charge]) -> list[ChargeResult]:
+        self.round_trips += 1
+        if self.round_trip_seconds:
+            time.sleep(self.round_trip_seconds)
+
+        results = []
+        for charge in charges:
+            answer = self._answers.get(charge.idempotency_key)
+            if answer is None:
+                if charge.mandate_id in self.decline:
+                    answer = ChargeResult(charge.mandate_id, approved=False, message="Card declined")
+                else:
+                    answer = ChargeResult(
+                        charge.mandate_id,
+                        approved=True,
+                        transaction_id=f"TX{uuid.uuid4().hex[:12].upper()}",
+                    )
+                self._answers[charge.idempotency_key] = answer
+            results.append(answer)
+        return results
+
+
+class AsyncPaymentProcessor(ABC):
+    """Interface to a payment processor, for use on an asyncio event loop."""
+
+    @abstractmethod
+    async def charge_batch(self, charges: Sequence[Charge]) -> list[ChargeResult]:
+        """
+        Capture several charges in one round trip.
+
+        Returns:
+            One result per charge, in the same order
+
+        Raises:
+            ProcessorError: If the round trip failed as a whole
+        """
+
+    async def charge(self, charge: Charge) -> ChargeResult:
+        """Capture a single charge."""
+        return (await self.charge_batch([charge]))[0]
+
+
+class SimulatedPaymentProcessor(AsyncPaymentProcessor):
+    """
+    Local asyncio processor simulator.
+
+    Each round trip waits ``latency`` seconds (plus or minus up to
+    ``jitter``), fails outright with probability ``error_rate``,
+    declines each charge with probability ``decline_rate`` and, with
+    probability ``timeout_rate``, captures its charges but loses the
+    answer. A repeated idempotency key gets its original result. Pass a
+    seed for repeatable runs.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        decline_rate: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.decline_rate = decline_rate
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.round_trips = 0
+        self._rng = random.Random(seed)
+        # Answers already given, by idempotency key
+        self._answers: dict[str, ChargeResult] = {}
+
+    async def charge_batch(self, charges: Sequence[Charge]) -> list[ChargeResult]:
+        self.round_trips += 1
+        delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(0.0, delay))
+
+        if self._rng.random() < self.error_rate:
+            raise ProcessorError("Simulated processor outage")
+
+        results = []
+        for charge in charges:
+            answer = self._answers.get(charge.idempotency_key)
+            if answer is None:
+                if self._rng.random() < self.decline_rate:
+                    answer = ChargeResult(charge.mandate_id, approved=False, message="Card declined")
+                else:
+                    answer = ChargeResult(
+                        charge.mandate_id,
+                        approved=True,
+                        transaction_id=f"TX{uuid.uuid4().hex[:12].upper()}",
+                    )
+                self._answers[charge.idempotency_key] = answer
+            results.append(answer)
+
+        if self.timeout_rate and self._rng.random() < self.timeout_rate:
+            raise ProcessorError("Simulated processor timeout")
+        return results
+
+
+def batched(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    """Split items into consecutive chunks of at most size items."""
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SettlementMetrics:
+    """Running counters for settlements sent to the payment processor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.round_trips = 0
+            self.charges = 0
+            self.approved = 0
+            self.declined = 0
+            self.unknown = 0
+            self.processor_seconds = 0.0
+
+    def record(self, results: Sequence[ChargeResult], seconds: float) -> None:
+        """Record one processor round trip."""
+        approved = sum(1 for result in results if result.approved)
+        unknown = sum(1 for result in results if result.unknown)
+        with self._lock:
+            self.round_trips += 1
+            self.charges += len(results)
+            self.approved += approved
+            self.declined += len(results) - approved - unknown
+            self.unknown += unknown
+            self.processor_seconds += seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        """Current counters plus derived throughput figures."""
+        with self._lock:
+            return {
+                "round_trips": self.round_trips,
+                "charges": self.charges,
+                "approved": self.approved,
+                "declined": self.declined,
+                "unknown": self.unknown,
+                "processor_seconds": round(self.processor_seconds, 6),
+                "avg_batch_size": round(self.charges / self.round_trips, 2) if self.round_trips else 0.0,
+                "charges_per_second": round(self.charges / self.processor_seconds, 1) if self.processor_seconds else None,
+            }
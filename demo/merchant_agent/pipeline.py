@@ -0,0 +1,226 @@
+"""
+Settlement Pipeline
+
+Asynchronous settlement against an AsyncPaymentProcessor.
+
+Charges submitted from any thread are queued on a private event loop,
+grouped into processor batches and resolved when the processor
+answers. A payment waiting on the processor costs one future, not a
+blocked thread, so thousands can be in flight at once.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Callable
+
+from .payments import (
+    AsyncPaymentProcessor,
+    Charge,
+    ChargeResult,
+    ProcessorError,
+    SettlementMetrics,
+    declined,
+    unanswered,
+)
+
+
+class SettlementPipeline:
+    """
+    Micro-batching front end for an asynchronous payment processor.
+
+    Queued charges are sent as soon as ``batch_size`` are waiting or the
+    oldest has waited ``linger`` seconds, with at most
+    ``max_concurrent_batches`` round trips outstanding. Round trips that
+    fail with ProcessorError are retried with exponential backoff;
+    charges carry idempotency keys, so a retry never double charges.
+
+    Every submitted charge gets an answer. A round trip that keeps
+    failing, or fails in any other way, may still have captured its
+    charges, so their outcomes are reported unknown (resend them under
+    the same idempotency keys to learn what happened); stop() declines
+    charges that were never sent.
+
+    The event loop runs on a daemon thread started on first use.
+    """
+
+    def __init__(
+        self,
+        processor: AsyncPaymentProcessor,
+        batch_size: int = 50,
+        linger: float = 0.005,
+        max_concurrent_batches: int = 32,
+        retries: int = 2,
+        retry_backoff: float = 0.05,
+        metrics: SettlementMetrics | None = None,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch size must be at least 1")
+        self.processor = processor
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_concurrent_batches = max_concurrent_batches
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.metrics = metrics
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._queue: asyncio.Queue | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._waiting: dict[asyncio.Future, Charge] = {}
+        self._start_lock = threading.Lock()
+        self._in_flight = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """Charges submitted but not yet answered."""
+        return self._in_flight
+
+    def start(self) -> None:
+        """Start the pipeline's event loop thread (idempotent)."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(ready,), name="settlement-pipeline", daemon=True
+            )
+            self._thread.start()
+            ready.wait()
+
+    def stop(self) -> None:
+        """
+        Stop the event loop.
+
+        Round trips already sent are waited for; charges still queued
+        are declined. Either way their callbacks run before this returns.
+        """
+        with self._start_lock:
+            if self._thread is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._drain(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    async def _drain(self) -> None:
+        """Stop batching, finish the round trips in flight and decline the rest."""
+        self._dispatcher.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for future, charge in list(self._waiting.items()):
+            if not future.done():
+                future.set_result(declined([charge], "Settlement stopped before the charge was sent")[0])
+        settling = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await asyncio.gather(*settling, return_exceptions=True)
+
+    def _run(self, ready: threading.Event) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._dispatcher = self._loop.create_task(self._dispatch())
+        self._loop.call_soon(ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            for task in asyncio.all_tasks(self._loop):
+                task.cancel()
+            self._loop.run_until_complete(asyncio.sleep(0))
+            self._loop.close()
+
+    def submit(
+        self,
+        charge: Charge,
+        callback: Callable[[Charge, ChargeResult], None] | None = None,
+    ) -> concurrent.futures.Future:
+        """
+        Queue a charge from any thread.
+
+        Args:
+            charge: The charge to capture
+            callback: Called with (charge, result) once the processor has
+                answered, in a worker thread (it may block)
+
+        Returns:
+            A future resolving to the ChargeResult. Await it from another
+            event loop with ``asyncio.wrap_future``.
+        """
+        self.start()
+        with self._count_lock:
+            self._in_flight += 1
+        return asyncio.run_coroutine_threadsafe(self._settle(charge, callback), self._loop)
+
+    async def _settle(
+        self,
+        charge: Charge,
+        callback: Callable[[Charge, ChargeResult], None] | None,
+    ) -> ChargeResult:
+        future = self._loop.create_future()
+        self._waiting[future] = charge
+        try:
+            self._queue.put_nowait((charge, future))
+            result = await future
+            del self._waiting[future]
+            if callback:
+                # Off the loop: callbacks take locks and write to stores
+                await asyncio.to_thread(callback, charge, result)
+            return result
+        finally:
+            self._waiting.pop(future, None)
+            with self._count_lock:
+                self._in_flight -= 1
+
+    async def _dispatch(self) -> None:
+        """Drain the queue into batches and send each as its own task."""
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.linger
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await slots.acquire()
+            task = self._loop.create_task(self._send(batch, slots))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list, slots: asyncio.Semaphore) -> None:
+        charges = [charge for charge, _ in batch]
+        try:
+            results = await self._charge_with_retries(charges)
+        except Exception as e:
+            results = unanswered(charges, f"Settlement failed: {e}")
+        finally:
+            slots.release()
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _charge_with_retries(self, charges: list[Charge]) -> list[ChargeResult]:
+        started = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            try:
+                results = await self.processor.charge_batch(charges)
+            except ProcessorError as e:
+                if attempt < self.retries:
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                results = unanswered(charges, f"Payment processor unavailable: {e}")
+            except Exception as e:
+                # Not an outage: retrying would fail the same way
+                results = unanswered(charges, f"Payment processor error: {e}")
+            if self.metrics:
+                self.metrics.record(results, time.perf_counter() - started)
+            return results
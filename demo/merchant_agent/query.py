@@ -0,0 +1,197 @@
+"""
+Search Query Plans
+
+A flight search is normalized once into an immutable ``FilterPlan``:
+airport codes upper-cased and interned, the travel class lower-cased,
+and the date parsed into a range of day ordinals. Rows are then tested
+against a chain of row tests with no per-row case folding or
+date slicing, and the plan itself is hashable, so it doubles as the
+search cache key.
+"""
+
+import sys
+from dataclasses import dataclass
+from datetime import date as Date
+from functools import lru_cache
+from typing import Any, Callable
+
+
+# Compiled row test: (flight, departure day ordinal) -> keep?
+RowPredicate = Callable[[dict[str, Any], int], bool]
+
+# Rough share of a route's flights that pass each filter, used to run
+# the most selective test first. A date filter is estimated from the
+# number of days it spans.
+_CLASS_PASS_RATE = 0.35
+_MAX_PRICE_PASS_RATE = 0.5
+_SEATS_PASS_RATE = 0.95
+_DAYS_PER_YEAR = 365
+
+_ANY_SEATS = frozenset({"seats"})
+
+
+def intern_code(code: str) -> str:
+    """Normalize an airport code and intern it, so equal codes are one object."""
+    return sys.intern(code.strip().upper())
+
+
+def day_ordinal(departure: str) -> int:
+    """Day ordinal of a 'YYYY-MM-DD HH:MM' timestamp."""
+    return Date.fromisoformat(departure[:10]).toordinal()
+
+
+def _day_range(prefix: str) -> tuple[int, int] | None:
+    """
+    Convert a date prefix ('YYYY', 'YYYY-MM' or 'YYYY-MM-DD') into a
+    half-open [first, end) range of day ordinals, or None for any other
+    prefix.
+    """
+    try:
+        if len(prefix) == 4:
+            year = int(prefix)
+            return Date(year, 1, 1).toordinal(), Date(year + 1, 1, 1).toordinal()
+        if len(prefix) == 7 and prefix[4] == "-":
+            year, month = int(prefix[:4]), int(prefix[5:])
+            end = Date(year + 1, 1, 1) if month == 12 else Date(year, month + 1, 1)
+            return Date(year, month, 1).toordinal(), end.toordinal()
+        if len(prefix) == 10:
+            first = Date.fromisoformat(prefix).toordinal()
+            return first, first + 1
+    except ValueError:
+        return None
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class FilterPlan:
+    """
+    A normalized flight search.
+
+    Build plans with ``FilterPlan.from_query``; two searches that the
+    catalog would answer the same way produce equal plans.
+    """
+    origin: str
+    destination: str
+    date: str | None = None
+    # [first, end) day ordinals for date; None when date is not a
+    # regular YYYY / YYYY-MM / YYYY-MM-DD prefix
+    days: tuple[int, int] | None = None
+    travel_class: str | None = None
+    max_price: float | None = None
+
+    @classmethod
+    def from_query(
+        cls,
+        origin: str,
+        destination: str,
+        date: str | None = None,
+        travel_class: str | None = None,
+        max_price: float | None = None,
+    ) -> "FilterPlan":
+        """Normalize search_flights arguments. Empty filters (and a max_price of 0) mean none."""
+        date = date.strip() or None if date else None
+        return cls(
+            origin=intern_code(origin),
+            destination=intern_code(destination),
+            date=date,
+            days=_day_range(date) if date else None,
+            travel_class=travel_class.strip().lower() or None if travel_class else None,
+            max_price=float(max_price) if max_price else None,
+        )
+
+    @property
+    def route(self) -> tuple[str, str]:
+        return self.origin, self.destination
+
+    @property
+    def single_day(self) -> bool:
+        """Whether the date filter is exactly one day."""
+        return self.days is not None and self.days[1] - self.days[0] == 1
+
+    def could_match(self, flight: dict[str, Any]) -> bool:
+        """Whether flight fits the plan, seats aside (e.g. to invalidate cached results)."""
+        return (
+            flight["origin"].upper() == self.origin
+            and flight["destination"].upper() == self.destination
+            and self.compile(_ANY_SEATS)(flight, day_ordinal(flight["departure"]))
+        )
+
+    def terms(self, guaranteed: frozenset[str] = frozenset()) -> list[RowPredicate]:
+        """
+        The plan's row tests, most selective first.
+
+        Each test reads the row as ``flight`` and its departure day
+        ordinal as ``day``, with the query values bound in its closure.
+
+        Args:
+            guaranteed: Filters ("date", "class", "max_price", "seats")
+                the caller already enforces, which are left out
+        """
+        ranked: list[tuple[float, RowPredicate]] = []
+
+        if self.date is not None and "date" not in guaranteed:
+            if self.days is None:
+                # Irregular prefix (e.g. '2025-03-1'): fall back to string matching
+                ranked.append((1 / _DAYS_PER_YEAR, _departs_with(self.date)))
+            else:
+                first, end = self.days
+                ranked.append((min(1.0, (end - first) / _DAYS_PER_YEAR), _departs_between(first, end)))
+
+        if self.travel_class is not None and "class" not in guaranteed:
+            ranked.append((_CLASS_PASS_RATE, _in_class(self.travel_class)))
+
+        if self.max_price is not None and "max_price" not in guaranteed:
+            ranked.append((_MAX_PRICE_PASS_RATE, _priced_at_most(self.max_price)))
+
+        if "seats" not in guaranteed:
+            ranked.append((_SEATS_PASS_RATE, _has_seats))
+
+        ranked.sort(key=lambda term: term[0])
+        return [test for _, test in ranked]
+
+    def compile(self, guaranteed: frozenset[str] = frozenset()) -> RowPredicate:
+        """
+        Combine the plan's tests into one row predicate (cached per plan).
+
+        The tests are evaluated in order with ``all``, so the chain
+        stops at the first test that fails.
+        """
+        return _compile(self, guaranteed)
+
+
+def _departs_with(prefix: str) -> RowPredicate:
+    return lambda flight, day: flight["departure"].startswith(prefix)
+
+
+def _departs_between(first: int, end: int) -> RowPredicate:
+    return lambda flight, day: first <= day < end
+
+
+def _in_class(travel_class: str) -> RowPredicate:
+    return lambda flight, day: flight["class"] == travel_class
+
+
+def _priced_at_most(max_price: float) -> RowPredicate:
+    return lambda flight, day: flight["price"] <= max_price
+
+
+def _has_seats(flight: dict[str, Any], day: int) -> bool:
+    return flight["seats_available"] > 0
+
+
+def _any_row(flight: dict[str, Any], day: int) -> bool:
+    return True
+
+
+@lru_cache(maxsize=1024)
+def _compile(plan: FilterPlan, guaranteed: frozenset[str]) -> RowPredicate:
+    tests = tuple(plan.terms(guaranteed))
+    if not tests:
+        return _any_row
+    if len(tests) == 1:
+        return tests[0]
+
+    def matches(flight: dict[str, Any], day: int) -> bool:
+        return all(test(flight, day) for test in tests)
+
+    return matches
@@ -0,0 +1,109 @@
+"""
+Search Result Ordering and Pagination
+
+Helpers shared by the flight catalogs to order, page and stream
+search results without sorting the full result set.
+"""
+
+import base64
+import heapq
+from datetime import datetime
+from itertools import count
+from typing import Any, Callable, Iterable, Iterator
+
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+SORT_FIELDS = ("price", "departure", "duration")
+
+
+def duration_minutes(flight: dict[str, Any]) -> int:
+    """Scheduled flight duration in minutes."""
+    departure = datetime.strptime(flight["departure"], DATETIME_FORMAT)
+    arrival = datetime.strptime(flight["arrival"], DATETIME_FORMAT)
+    return int((arrival - departure).total_seconds() // 60)
+
+
+_SORT_KEYS: dict[str, Callable[[dict[str, Any]], Any]] = {
+    "price": lambda flight: flight["price"],
+    # 'YYYY-MM-DD HH:MM' strings sort chronologically as-is
+    "departure": lambda flight: flight["departure"],
+    "duration": duration_minutes,
+}
+
+
+def sort_key(sort_by: str) -> Callable[[dict[str, Any]], Any]:
+    """Return the key function for a sort field."""
+    try:
+        return _SORT_KEYS[sort_by]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported sort_by '{sort_by}' (expected one of: {', '.join(SORT_FIELDS)})"
+        ) from None
+
+
+def top_k(flights: Iterable[dict[str, Any]], k: int, sort_by: str) -> list[dict[str, Any]]:
+    """Return the k best flights in order, using a bounded heap."""
+    return heapq.nsmallest(k, flights, key=sort_key(sort_by))
+
+
+def iter_sorted(flights: Iterable[dict[str, Any]], sort_by: str) -> Iterator[dict[str, Any]]:
+    """
+    Yield flights in sort order, lazily.
+
+    The heap is built in O(n) and each flight costs O(log n) only when
+    the consumer actually asks for it.
+    """
+    key = sort_key(sort_by)
+    tiebreak = count()
+    heap = [(key(flight), next(tiebreak), flight) for flight in flights]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def encode_cursor(offset: int) -> str:
+    """Encode a result offset as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a pagination cursor back into a result offset."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, _, offset = base64.urlsafe_b64decode(padded).decode().partition(":")
+        if prefix != "o":
+            raise ValueError
+        value = int(offset)
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'") from None
+    if value < 0:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+    return value
+
+
+def paginate(
+    flights: Iterable[dict[str, Any]],
+    sort_by: str | None,
+    offset: int,
+    limit: int | None,
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    Select one page of results.
+
+    Only the first offset + limit flights are ever ordered; the rest of
+    the result set is just counted.
+
+    Returns:
+        (page, total number of matching flights)
+    """
+    flights = flights if isinstance(flights, list) else list(flights)
+    total = len(flights)
+
+    if limit is None:
+        ordered = sorted(flights, key=sort_key(sort_by)) if sort_by else flights
+        return ordered[offset:], total
+
+    if sort_by:
+        return top_k(flights, offset + limit, sort_by)[offset:], total
+    return flights[offset:offset + limit], total
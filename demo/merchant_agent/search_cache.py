@@ -0,0 +1,192 @@
+"""
+Search Result Cache
+
+Shoppers ask the same route/date questions over and over, so the full
+result set of each distinct search is kept for a short while and
+reused, with only sorting and paging redone per request.
+
+Entries are evicted least-recently-used once the cache is full, expire
+after a TTL, and are dropped as soon as a seat change on a flight could
+alter their result (a flight selling out, or coming back on sale).
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Any, Callable
+
+from .query import FilterPlan
+
+
+# Per-entry cost of the LRU list node and the route index slot
+_INDEX_OVERHEAD_BYTES = 120
+
+
+@dataclass(slots=True)
+class _Entry:
+    flights: list[dict[str, Any]]
+    expires_at: float
+    size: int = 0
+
+
+class SearchCache:
+    """
+    LRU + TTL cache of search results.
+
+    A search that races a seat change is not cached: each route carries
+    a generation number that every invalidation bumps, and results are
+    only stored if their route's generation did not move while they
+    were being computed.
+
+    Args:
+        max_entries: Distinct searches to keep; 0 disables the cache
+        ttl: Seconds an entry may be served for
+        clock: Time source (monotonic seconds)
+        owns_records: Whether cached flights are private copies (as the
+            columnar catalog returns) rather than the catalog's own
+            records, so their memory is counted too
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        owns_records: bool = False,
+    ):
+        self.max_entries = max_entries
+        self.owns_records = owns_records
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[FilterPlan, _Entry] = OrderedDict()
+        self._by_route: dict[tuple[str, str], set[FilterPlan]] = {}
+        self._generations: dict[tuple[str, str], int] = {}
+        self._epoch = 0  # bumped by clear()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_search(
+        self,
+        key: FilterPlan,
+        search: Callable[[], list[dict[str, Any]]],
+    ) -> list[dict[str, Any]]:
+        """
+        Return the cached results for key, running search on a miss.
+
+        The returned list is shared with other callers and must not be
+        modified.
+        """
+        route = key.route
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.flights
+            self.misses += 1
+            generation = (self._epoch, self._generations.get(route, 0))
+
+        flights = search()
+        if self.max_entries <= 0:
+            return flights
+
+        with self._lock:
+            if (self._epoch, self._generations.get(route, 0)) == generation:
+                self._store(key, flights)
+        return flights
+
+    def _store(self, key: FilterPlan, flights: list[dict[str, Any]]) -> None:
+        """Add an entry. Caller must hold the lock."""
+        if key in self._entries:
+            self._drop(key)
+        entry = _Entry(flights, self._clock() + self.ttl)
+        entry.size = self._entry_size(key, entry)
+        self._entries[key] = entry
+        self._by_route.setdefault(key.route, set()).add(key)
+        self._bytes += entry.size
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key: FilterPlan) -> None:
+        """Remove an entry. Caller must hold the lock."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        keys = self._by_route[key.route]
+        keys.discard(key)
+        if not keys:
+            del self._by_route[key.route]
+
+    def _entry_size(self, key: FilterPlan, entry: _Entry) -> int:
+        """Approximate bytes an entry adds to the cache."""
+        size = (
+            sys.getsizeof(entry)
+            + sys.getsizeof(key)
+            + sum(sys.getsizeof(getattr(key, field.name)) for field in fields(key))
+            + sys.getsizeof(entry.flights)
+            + _INDEX_OVERHEAD_BYTES
+        )
+        if self.owns_records:
+            size += sum(
+                sys.getsizeof(flight) + sum(sys.getsizeof(value) for value in flight.values())
+                for flight in entry.flights
+            )
+        return size
+
+    def invalidate_flight(self, flight: dict[str, Any]) -> int:
+        """
+        Drop every entry whose results could include flight.
+
+        Call whenever the flight's seat count changes.
+
+        Returns:
+            The number of entries dropped
+        """
+        route = (flight["origin"].upper(), flight["destination"].upper())
+        with self._lock:
+            self._generations[route] = self._generations.get(route, 0) + 1
+            stale = [key for key in self._by_route.get(route, ()) if key.could_match(flight)]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._by_route.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Hit rate, eviction counters and approximate memory use."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "approx_bytes": self._bytes,
+            }
+
@@ -0,0 +1,361 @@
+"""
+Seat Reservations
+
+Time-limited seat holds so the merchant never oversells a flight.
+
+Lifecycle:
+    1. create_booking_mandate places a hold (seats leave inventory)
+    2. process_authorized_payment commits the hold (seats are sold)
+    3. A cancelled mandate, or a hold that outlives its TTL, is
+       released and its seats go back on sale
+
+Each flight's seat count is updated under that flight's own lock, so
+bookings on different flights never wait for each other.
+
+When several worker processes sell from one store, the store keeps the
+authoritative seat counts and holds (a seat ledger, see
+MandateStore.shares_seats) and every change goes through it atomically;
+each process's catalog then follows the ledger's latest answers.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+from shared.expiry import ExpiryQueue
+
+from .locking import KeyedLocks
+
+
+# Default time a shopper has to authorize a mandate before its seats are released
+DEFAULT_HOLD_TTL_SECONDS = 15 * 60
+
+
+class SeatUnavailableError(Exception):
+    """Raised when a flight does not have enough seats left to hold."""
+
+
+class HoldExpiredError(Exception):
+    """Raised when committing a hold that has already expired."""
+
+
+@dataclass
+class SeatHold:
+    """Seats held on a flight for a pending mandate."""
+    mandate_id: str
+    flight_id: str
+    seats: int
+    expires_at: float
+
+
+class SeatInventory:
+    """
+    Seat holds layered over a flight catalog.
+
+    The catalog's ``seats_available`` stays the source of truth and
+    always reflects held seats, so searches never offer seats that are
+    already promised to another shopper.
+
+    With a ledger, the ledger is the source of truth instead: holds,
+    commits, releases and restocks are applied there first, outside the
+    flight locks (so they may run inside a store batch), and the catalog
+    is updated with the count it reports. A mandate's hold can then be
+    committed or released by any process, not only the one that placed
+    it.
+
+    Args:
+        catalog: Flights, updated in place
+        hold_ttl: Seconds a hold lasts by default
+        clock: Monotonic clock for hold expiry
+        on_change: Called with the flight after every change to its
+            seat count
+        ledger: Seat counts and holds shared with other processes (a
+            MandateStore whose shares_seats is set)
+    """
+
+    def __init__(
+        self,
+        catalog: Any,
+        hold_ttl: float = DEFAULT_HOLD_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        on_change: Callable[[dict[str, Any]], None] | None = None,
+        ledger: Any = None,
+    ):
+        self._catalog = catalog
+        self.hold_ttl = hold_ttl
+        self._clock = clock
+        self._on_change = on_change
+        self._ledger = ledger
+
+        self._flight_locks = KeyedLocks()
+        self._holds: dict[str, SeatHold] = {}
+        self._expiry = ExpiryQueue(clock)
+
+    def available(self, flight_id: str) -> int:
+        """Seats that can still be held on a flight."""
+        return self._catalog[flight_id]["seats_available"]
+
+    def get_hold(self, mandate_id: str) -> SeatHold | None:
+        """Return the active hold for a mandate, if any."""
+        return self._holds.get(mandate_id)
+
+    def _set(self, flight_id: str, available: int) -> None:
+        """Set a flight's seat count. Caller must hold the flight lock."""
+        flight = self._catalog.update(flight_id, seats_available=available)
+        if self._on_change is not None:
+            self._on_change(flight)
+
+    def _adjust(self, flight_id: str, delta: int) -> None:
+        """Change a flight's seat count. Caller must hold the flight lock."""
+        self._set(flight_id, self._catalog[flight_id]["seats_available"] + delta)
+
+    def _track(self, flight_id: str, mandate_id: str, seats: int, ttl: float | None) -> SeatHold:
+        """Record a placed hold and schedule its expiry."""
+        hold = SeatHold(
+            mandate_id=mandate_id,
+            flight_id=flight_id,
+            seats=seats,
+            expires_at=self._clock() + (self.hold_ttl if ttl is None else ttl),
+        )
+        self._holds[mandate_id] = hold
+        self._expiry.schedule(mandate_id, hold.expires_at)
+        return hold
+
+    def hold(
+        self,
+        flight_id: str,
+        mandate_id: str,
+        seats: int = 1,
+        ttl: float | None = None,
+    ) -> SeatHold:
+        """
+        Take seats out of inventory for a mandate.
+
+        Raises:
+            KeyError: If the flight does not exist
+            ValueError: If the mandate already holds seats
+            SeatUnavailableError: If not enough seats are left
+        """
+        if seats < 1:
+            raise ValueError("seats must be at least 1")
+
+        if self._ledger is not None:
+            return self._hold_shared(flight_id, mandate_id, seats, ttl)
+        with self._flight_locks.hold(flight_id):
+            return self._hold_locked(flight_id, mandate_id, seats, ttl)
+
+    def hold_many(
+        self,
+        requests: Sequence[tuple[str, str, int]],
+        ttl: float | None = None,
+    ) -> list[SeatHold | Exception]:
+        """
+        Place holds for many (flight_id, mandate_id, seats) requests at once.
+
+        The locks for every flight involved are taken in one acquisition
+        and released together. Requests are independent: one failing
+        does not undo the others.
+
+        Returns:
+            For each request, its SeatHold or the exception ``hold`` would
+            have raised (KeyError, ValueError or SeatUnavailableError)
+        """
+        results: list[SeatHold | Exception] = []
+        if self._ledger is not None:
+            # Each hold is one atomic update of the ledger
+            for flight_id, mandate_id, seats in requests:
+                try:
+                    results.append(self.hold(flight_id, mandate_id, seats, ttl))
+                except (KeyError, ValueError, SeatUnavailableError) as e:
+                    results.append(e)
+            return results
+
+        with self._flight_locks.hold_many(flight_id for flight_id, _, _ in requests):
+            for flight_id, mandate_id, seats in requests:
+                try:
+                    if seats < 1:
+                        raise ValueError("seats must be at least 1")
+                    results.append(self._hold_locked(flight_id, mandate_id, seats, ttl))
+                except (KeyError, ValueError, SeatUnavailableError) as e:
+                    results.append(e)
+        return results
+
+    def _hold_locked(
+        self,
+        flight_id: str,
+        mandate_id: str,
+        seats: int,
+        ttl: float | None,
+    ) -> SeatHold:
+        """Place a hold. Caller must hold the flight lock."""
+        if mandate_id in self._holds:
+            raise ValueError(f"Mandate {mandate_id} already holds seats")
+
+        available = self.available(flight_id)
+        if available < seats:
+            raise SeatUnavailableError(
+                f"Only {available} seat(s) left on flight {flight_id}"
+            )
+
+        self._adjust(flight_id, -seats)
+        return self._track(flight_id, mandate_id, seats, ttl)
+
+    def _hold_shared(
+        self,
+        flight_id: str,
+        mandate_id: str,
+        seats: int,
+        ttl: float | None,
+    ) -> SeatHold:
+        """Place a hold in the ledger, then mirror it here."""
+        if mandate_id in self._holds:
+            raise ValueError(f"Mandate {mandate_id} already holds seats")
+
+        held, available = self._ledger.hold_seats(mandate_id, flight_id, seats, self.available(flight_id))
+        with self._flight_locks.hold(flight_id):
+            self._set(flight_id, available)
+            if not held:
+                raise SeatUnavailableError(
+                    f"Only {available} seat(s) left on flight {flight_id}"
+                )
+            return self._track(flight_id, mandate_id, seats, ttl)
+
+    def commit(self, mandate_id: str) -> SeatHold:
+        """
+        Turn a hold into a sale. The seats stay out of inventory.
+
+        Raises:
+            KeyError: If the mandate has no active hold
+            HoldExpiredError: If the hold expired (its seats are released)
+        """
+        if self._ledger is not None:
+            return self._commit_shared(mandate_id)
+
+        hold = self._holds[mandate_id]
+        with self._flight_locks.hold(hold.flight_id):
+            # Re-check under the lock: a concurrent commit/release may have won
+            if self._holds.get(mandate_id) is not hold:
+                raise KeyError(mandate_id)
+
+            del self._holds[mandate_id]
+            self._expiry.cancel(mandate_id)
+            if hold.expires_at <= self._clock():
+                self._adjust(hold.flight_id, hold.seats)
+                raise HoldExpiredError(
+                    f"Seat hold for mandate {mandate_id} expired before payment"
+                )
+        return hold
+
+    def _commit_shared(self, mandate_id: str) -> SeatHold:
+        """Commit a hold in the ledger, wherever it was placed."""
+        hold = self._holds.pop(mandate_id, None)
+        if hold is not None:
+            self._expiry.cancel(mandate_id)
+            if hold.expires_at <= self._clock():
+                self._release_shared(mandate_id)
+                raise HoldExpiredError(
+                    f"Seat hold for mandate {mandate_id} expired before payment"
+                )
+
+        committed = self._ledger.commit_seats(mandate_id)
+        if committed is None:
+            # Released (or committed) by another process
+            raise KeyError(mandate_id)
+        if hold is None:
+            flight_id, seats = committed
+            hold = SeatHold(mandate_id=mandate_id, flight_id=flight_id, seats=seats, expires_at=self._clock())
+        return hold
+
+    def release(self, mandate_id: str) -> SeatHold | None:
+        """
+        Put a mandate's held seats back on sale.
+
+        Returns:
+            The released hold, or None if the mandate held nothing
+        """
+        if self._ledger is not None:
+            return self._release_shared(mandate_id)
+
+        hold = self._holds.get(mandate_id)
+        if hold is None:
+            return None
+
+        with self._flight_locks.hold(hold.flight_id):
+            if self._holds.get(mandate_id) is not hold:
+                return None
+            del self._holds[mandate_id]
+            self._expiry.cancel(mandate_id)
+            self._adjust(hold.flight_id, hold.seats)
+        return hold
+
+    def _release_shared(self, mandate_id: str) -> SeatHold | None:
+        """Release a hold in the ledger, wherever it was placed."""
+        hold = self._holds.pop(mandate_id, None)
+        if hold is not None:
+            self._expiry.cancel(mandate_id)
+
+        released = self._ledger.release_seats(mandate_id)
+        if released is None:
+            # Already committed or released, here or by another process
+            return None
+        flight_id, seats, available = released
+        if flight_id in self._catalog:
+            with self._flight_locks.hold(flight_id):
+                self._set(flight_id, available)
+        if hold is None:
+            hold = SeatHold(mandate_id=mandate_id, flight_id=flight_id, seats=seats, expires_at=self._clock())
+        return hold
+
+    def restore(
+        self,
+        seats: Mapping[str, int],
+        holds: Iterable[tuple[str, str, int, float]] = (),
+    ) -> None:
+        """
+        Reload seat counts and holds persisted before a restart.
+
+        The saved counts already exclude held seats, so holds are put
+        back without taking their seats out of inventory again. Call
+        before serving requests; flights no longer in the catalog are
+        skipped.
+
+        Args:
+            seats: Seats available, by flight_id
+            holds: (mandate_id, flight_id, seats, remaining ttl) per hold
+        """
+        for flight_id, available in seats.items():
+            if flight_id in self._catalog:
+                with self._flight_locks.hold(flight_id):
+                    self._catalog.update(flight_id, seats_available=available)
+
+        for mandate_id, flight_id, count, ttl in holds:
+            if flight_id not in self._catalog or mandate_id in self._holds:
+                continue
+            hold = SeatHold(mandate_id=mandate_id, flight_id=flight_id, seats=count, expires_at=self._clock() + ttl)
+            self._holds[mandate_id] = hold
+            self._expiry.schedule(mandate_id, hold.expires_at)
+
+    def restock(self, flight_id: str, seats: int = 1) -> None:
+        """Put sold seats back on sale, e.g. after the payment was declined."""
+        if self._ledger is not None:
+            available = self._ledger.restock_seats(flight_id, seats, self.available(flight_id))
+            with self._flight_locks.hold(flight_id):
+                self._set(flight_id, available)
+            return
+
+        with self._flight_locks.hold(flight_id):
+            self._adjust(flight_id, seats)
+
+    def release_expired(self) -> list[SeatHold]:
+        """
+        Release every hold whose TTL has passed.
+
+        Only holds that are actually due are touched, so this is cheap
+        to call on every request.
+        """
+        released = []
+        for mandate_id in self._expiry.pop_due():
+            hold = self.release(mandate_id)
+            if hold is not None:
+                released.append(hold)
+        return released
@@ -0,0 +1,1382 @@
+"""
+Mandate and Booking Store
+
+Pluggable persistence for the merchant's payment mandates and bookings.
+
+Backends:
+    - InMemoryMandateStore: process-local dicts (the original behaviour)
+    - JournaledMandateStore: in memory, with every change appended to an
+      event journal that is replayed on startup
+    - SQLiteMandateStore: durable, shareable across worker processes,
+      using WAL mode so readers never block the writer
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Iterator
+
+from shared.ap2_types import LineItem, PaymentMandate, PaymentStatus
+from shared.records import LineItemRecord, MandateRecord
+
+from .journal import Event, EventKind, EventLog, fsync_directory, read_events
+
+
+# Mandate fields with secondary indexes, usable as find_mandates criteria
+MANDATE_INDEX_FIELDS = ("user_id", "shopper_agent_id", "status", "merchant_reference")
+
+# Statuses a mandate never leaves
+SETTLED_STATUSES = frozenset({PaymentStatus.COMPLETED, PaymentStatus.FAILED, PaymentStatus.CANCELLED})
+
+
+class DuplicateReceiptError(Exception):
+    """Raised when a receipt has already been recorded for a mandate."""
+
+
+class MandateStore(ABC):
+    """Storage interface for payment mandates and bookings."""
+
+    @abstractmethod
+    def get_mandate(self, mandate_id: str) -> PaymentMandate | None:
+        """Load a mandate by id."""
+
+    @abstractmethod
+    def save_mandate(self, mandate: PaymentMandate) -> None:
+        """Insert or update a mandate."""
+
+    @abstractmethod
+    def transition_mandate(self, mandate: PaymentMandate, from_status: PaymentStatus) -> bool:
+        """
+        Save a mandate only if its saved status is still from_status.
+
+        An atomic compare-and-set on the status: when several workers
+        race to move a mandate on (e.g. PENDING -> PROCESSING), exactly
+        one of them wins.
+
+        Returns:
+            Whether the mandate was saved
+        """
+
+    @abstractmethod
+    def evict_mandate(self, mandate_id: str) -> None:
+        """Drop a mandate that will never be paid (expired) from the store's working set."""
+
+    @abstractmethod
+    def find_mandates(
+        self,
+        user_id: str | None = None,
+        shopper_agent_id: str | None = None,
+        status: PaymentStatus | None = None,
+        merchant_reference: str | None = None,
+        limit: int | None = None,
+    ) -> list[PaymentMandate]:
+        """
+        Find mandates through the secondary indexes.
+
+        Criteria that are given must all match. Mandates are returned
+        newest first.
+        """
+
+    @abstractmethod
+    def count_mandates(
+        self,
+        user_id: str | None = None,
+        shopper_agent_id: str | None = None,
+        status: PaymentStatus | None = None,
+        merchant_reference: str | None = None,
+    ) -> int:
+        """Count the mandates find_mandates would return, without loading them."""
+
+    @abstractmethod
+    def get_booking(self, booking_id: str) -> dict[str, Any] | None:
+        """Load a booking by id."""
+
+    @abstractmethod
+    def find_bookings(self, mandate_ids: Iterable[str]) -> list[dict[str, Any]]:
+        """Load the bookings made for the given mandates, in the same order."""
+
+    @abstractmethod
+    def save_booking(self, booking: dict[str, Any]) -> None:
+        """Insert or update a booking (keyed by its booking_id)."""
+
+    @abstractmethod
+    def get_receipt(self, mandate_id: str) -> tuple[str, dict[str, Any]] | None:
+        """
+        Load the payment receipt recorded for a mandate.
+
+        Returns:
+            (idempotency_key, receipt), or None if the mandate was never paid
+        """
+
+    @abstractmethod
+    def save_receipt(self, mandate_id: str, idempotency_key: str, receipt: dict[str, Any]) -> None:
+        """
+        Record the payment receipt for a mandate. Receipts are write-once.
+
+        Raises:
+            DuplicateReceiptError: If the mandate already has a receipt
+        """
+
+    @abstractmethod
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Group writes into a single commit.
+
+        Writes made inside the block become visible together when it
+        exits, and are discarded if it raises. Batches nest: an inner
+        batch is part of the outermost one.
+        """
+
+    # Whether the store keeps the authoritative seat counts and holds for
+    # every process using it (a seat ledger: the *_seats methods below).
+    # Stores that only persist this process's counts use save_seats.
+    shares_seats = False
+
+    def save_seats(self, flight_id: str, seats_available: int) -> None:
+        """Record a flight's seat count, for stores that persist seat inventory."""
+
+    def load_seats(self) -> dict[str, int]:
+        """Persisted seat counts, by flight_id (empty if not persisted)."""
+        return {}
+
+    def hold_seats(self, mandate_id: str, flight_id: str, seats: int, available: int) -> tuple[bool, int]:
+        """
+        Take seats out of a flight's count for a mandate, atomically. Seat ledgers only.
+
+        Args:
+            available: The caller's count, taken as the flight's count
+                if the ledger has none yet
+
+        Returns:
+            (whether the seats were held, seats now available)
+
+        Raises:
+            ValueError: If the mandate already holds seats
+        """
+        raise NotImplementedError
+
+    def commit_seats(self, mandate_id: str) -> tuple[str, int] | None:
+        """
+        Turn a mandate's hold into a sale. Seat ledgers only.
+
+        Returns:
+            (flight_id, seats) of the hold, or None if it holds nothing
+        """
+        raise NotImplementedError
+
+    def release_seats(self, mandate_id: str) -> tuple[str, int, int] | None:
+        """
+        Put a mandate's held seats back on sale. Seat ledgers only.
+
+        Returns:
+            (flight_id, seats, seats now available), or None if it held nothing
+        """
+        raise NotImplementedError
+
+    def restock_seats(self, flight_id: str, seats: int, available: int) -> int:
+        """
+        Put sold seats back on sale. Seat ledgers only.
+
+        Returns:
+            Seats now available
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+def _index_value(field: str, value: Any) -> Any:
+    return value.value if field == "status" and isinstance(value, PaymentStatus) else value
+
+
+def _criteria(**criteria: Any) -> dict[str, Any]:
+    """The given (non-None) find_mandates criteria, with statuses as plain strings."""
+    return {
+        field: _index_value(field, value)
+        for field, value in criteria.items()
+        if value is not None
+    }
+
+
+class MandateIndex:
+    """
+    Secondary indexes over in-memory mandates: indexed field value -> mandate ids.
+
+    Mandates are mutated in place before they are saved, so the values
+    each mandate was last indexed under are remembered; re-indexing a
+    saved mandate only touches the fields that actually changed.
+    """
+
+    def __init__(self):
+        self._ids: dict[str, defaultdict[Any, set[str]]] = {
+            field: defaultdict(set) for field in MANDATE_INDEX_FIELDS
+        }
+        self._indexed: dict[str, tuple] = {}
+
+    def update(self, mandate: PaymentMandate | MandateRecord) -> None:
+        """Index a new mandate, or move a saved one to its current values."""
+        mandate_id = mandate.mandate_id
+        values = tuple(_index_value(field, getattr(mandate, field)) for field in MANDATE_INDEX_FIELDS)
+        old = self._indexed.get(mandate_id)
+        if old == values:
+            return
+
+        for i, field in enumerate(MANDATE_INDEX_FIELDS):
+            if old is not None and old[i] == values[i]:
+                continue
+            index = self._ids[field]
+            if old is not None:
+                self._discard(index, old[i], mandate_id)
+            index[values[i]].add(mandate_id)
+        self._indexed[mandate_id] = values
+
+    def indexed(self, mandate_id: str, field: str) -> Any:
+        """The value a mandate was last indexed under for field, or None if it is not indexed."""
+        values = self._indexed.get(mandate_id)
+        return values[MANDATE_INDEX_FIELDS.index(field)] if values is not None else None
+
+    def remove(self, mandate_id: str) -> None:
+        old = self._indexed.pop(mandate_id, None)
+        if old is not None:
+            for field, value in zip(MANDATE_INDEX_FIELDS, old):
+                self._discard(self._ids[field], value, mandate_id)
+
+    @staticmethod
+    def _discard(index: defaultdict, value: Any, mandate_id: str) -> None:
+        ids = index[value]
+        ids.discard(mandate_id)
+        if not ids:
+            del index[value]
+
+    def find(self, criteria: dict[str, Any]) -> set[str]:
+        """Ids of the mandates matching every criterion (all mandates if there are none)."""
+        if not criteria:
+            return set(self._indexed)
+        # Intersect starting from the smallest candidate set
+        candidates = sorted(
+            (self._ids[field].get(value, set()) for field, value in criteria.items()),
+            key=len,
+        )
+        return candidates[0].intersection(*candidates[1:])
+
+
+class InMemoryMandateStore(MandateStore):
+    """
+    Mandates and bookings kept in process memory.
+
+    A batch holds the store lock for its duration and keeps an undo
+    log, so a batch that raises puts back every mandate, booking and
+    receipt it saved or evicted. Mandates are stored by reference,
+    though: changes a caller made to a mandate object in place are
+    theirs to undo.
+
+    Args:
+        compact_settled: Keep settled mandates (completed, failed or
+            cancelled) as compact MandateRecords instead of pydantic
+            models. get_mandate then returns a fresh copy of a settled
+            mandate rather than the stored object.
+    """
+
+    def __init__(self, compact_settled: bool = False):
+        self.compact_settled = compact_settled
+        self.mandates: dict[str, PaymentMandate | MandateRecord] = {}
+        self.bookings: dict[str, dict[str, Any]] = {}
+        self.receipts: dict[str, tuple[str, dict[str, Any]]] = {}
+        self._index = MandateIndex()
+        self._booking_ids: dict[str, str] = {}  # mandate_id -> booking_id
+        self._lock = threading.RLock()
+        # Reverts the open batch's writes, newest last; None outside a batch
+        self._undo: list[Callable[[], None]] | None = None
+
+    @staticmethod
+    def _model(mandate: PaymentMandate | MandateRecord) -> PaymentMandate:
+        return mandate.to_model() if isinstance(mandate, MandateRecord) else mandate
+
+    def get_mandate(self, mandate_id: str) -> PaymentMandate | None:
+        mandate = self.mandates.get(mandate_id)
+        return self._model(mandate) if mandate is not None else None
+
+    def _undoable(self, undo: Callable[[], None]) -> None:
+        """Remember how to revert a write if it is part of a batch. Caller must hold the lock."""
+        if self._undo is not None:
+            self._undo.append(undo)
+
+    def _put_mandate(self, mandate_id: str, mandate: PaymentMandate | MandateRecord | None) -> None:
+        """Store a mandate, or drop it for None. Caller must hold the lock."""
+        if mandate is None:
+            self.mandates.pop(mandate_id, None)
+            self._index.remove(mandate_id)
+        else:
+            self.mandates[mandate_id] = mandate
+            self._index.update(mandate)
+
+    def save_mandate(self, mandate: PaymentMandate) -> None:
+        if self.compact_settled and mandate.status in SETTLED_STATUSES:
+            mandate = MandateRecord.from_model(mandate)
+        mandate_id = mandate.mandate_id
+        with self._lock:
+            previous = self.mandates.get(mandate_id)
+            self._undoable(lambda: self._put_mandate(mandate_id, previous))
+            self._put_mandate(mandate_id, mandate)
+
+    def _saved_as(self, mandate_id: str, status: PaymentStatus) -> bool:
+        """
+        Whether a mandate was last saved with status. Caller must hold the lock.
+
+        Asks the index, as the stored object may have been changed in
+        place since it was saved.
+        """
+        return self._index.indexed(mandate_id, "status") == status.value
+
+    def transition_mandate(self, mandate: PaymentMandate, from_status: PaymentStatus) -> bool:
+        with self._lock:
+            if not self._saved_as(mandate.mandate_id, from_status):
+                return False
+            self.save_mandate(mandate)
+            return True
+
+    def evict_mandate(self, mandate_id: str) -> None:
+        with self._lock:
+            previous = self.mandates.get(mandate_id)
+            self._undoable(lambda: self._put_mandate(mandate_id, previous))
+            self._put_mandate(mandate_id, None)
+
+    def find_mandates(
+        self,
+        user_id: str | None = None,
+        shopper_agent_id: str | None = None,
+        status: PaymentStatus | None = None,
+        merchant_reference: str | None = None,
+        limit: int | None = None,
+    ) -> list[PaymentMandate]:
+        criteria = _criteria(
+            user_id=user_id,
+            shopper_agent_id=shopper_agent_id,
+            status=status,
+            merchant_reference=merchant_reference,
+        )
+        with self._lock:
+            mandates = [self.mandates[mandate_id] for mandate_id in self._index.find(criteria)]
+        mandates.sort(key=lambda mandate: mandate.created_at, reverse=True)
+        return [self._model(mandate) for mandate in mandates[:limit]]
+
+    def count_mandates(
+        self,
+        user_id: str | None = None,
+        shopper_agent_id: str | None = None,
+        status: PaymentStatus | None = None,
+        merchant_reference: str | None = None,
+    ) -> int:
+        criteria = _criteria(
+            user_id=user_id,
+            shopper_agent_id=shopper_agent_id,
+            status=status,
+            merchant_reference=merchant_reference,
+        )
+        with self._lock:
+            return len(self._index.find(criteria))
+
+    def get_booking(self, booking_id: str) -> dict[str, Any] | None:
+        return self.bookings.get(booking_id)
+
+    def _put_booking(
+        self,
+        booking_id: str,
+        mandate_id: str,
+        booking: dict[str, Any] | None,
+        mandate_booking_id: str | None,
+    ) -> None:
+        """Set (or, for None, drop) a booking and the mandate's booking id. Caller must hold the lock."""
+        if booking is None:
+            self.bookings.pop(booking_id, None)
+        else:
+            self.bookings[booking_id] = booking
+        if mandate_booking_id is None:
+            self._booking_ids.pop(mandate_id, None)
+        else:
+            self._booking_ids[mandate_id] = mandate_booking_id
+
+    def save_booking(self, booking: dict[str, Any]) -> None:
+        booking_id, mandate_id = booking["booking_id"], booking["mandate_id"]
+        with self._lock:
+            previous = self.bookings.get(booking_id), self._booking_ids.get(mandate_id)
+            self._undoable(lambda: self._put_booking(booking_id, mandate_id, *previous))
+            self._put_booking(booking_id, mandate_id, booking, booking_id)
+
+    def find_bookings(self, mandate_ids: Iterable[str]) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                self.bookings[self._booking_ids[mandate_id]]
+                for mandate_id in mandate_ids
+                if mandate_id in self._booking_ids
+            ]
+
+    def get_receipt(self, mandate_id: str) -> tuple[str, dict[str, Any]] | None:
+        return self.receipts.get(mandate_id)
+
+    def save_receipt(self, mandate_id: str, idempotency_key: str, receipt: dict[str, Any]) -> None:
+        with self._lock:
+            if mandate_id in self.receipts:
+                raise DuplicateReceiptError(mandate_id)
+            self._undoable(lambda: self.receipts.pop(mandate_id, None))
+            self.receipts[mandate_id] = (idempotency_key, receipt)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self._lock:
+            if self._undo is not None:
+                # Nested batches are part of the outer one
+                yield
+                return
+
+            self._undo = []
+            try:
+                yield
+            except BaseException:
+                for undo in reversed(self._undo):
+                    undo()
+                raise
+            finally:
+                self._undo = None
+
+
+# Journal encoding of a mandate's lifecycle state: status, flags,
+# expires_at and authorization_timestamp (microseconds since the epoch,
+# naive UTC as PaymentMandate uses) and the authorization token's length,
+# followed by the token
+_STATE = struct.Struct("<BBqqH")
+_HAS_EXPIRY, _HAS_AUTHORIZATION_TIME, _HAS_TOKEN = 1, 2, 4
+_STATUSES = list(PaymentStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+_EPOCH = datetime(1970, 1, 1)
+
+# What a state decodes to: (status, expires_at, authorization_timestamp, token)
+_State = tuple[PaymentStatus, datetime | None, datetime | None, str | None]
+
+
+def _micros(moment: datetime | None) -> int:
+    return (moment - _EPOCH) // timedelta(microseconds=1) if moment is not None else 0
+
+
+def _moment(micros: int, present: int) -> datetime | None:
+    return _EPOCH + timedelta(microseconds=micros) if present else None
+
+
+def _encode_state(mandate: PaymentMandate) -> bytes:
+    """Journal body of a transition: the fields a mandate's lifecycle changes."""
+    flags = (
+        (_HAS_EXPIRY if mandate.expires_at is not None else 0)
+        | (_HAS_AUTHORIZATION_TIME if mandate.authorization_timestamp is not None else 0)
+        | (_HAS_TOKEN if mandate.user_authorization_token is not None else 0)
+    )
+    token = (mandate.user_authorization_token or "").encode()
+    return _STATE.pack(
+        _STATUS_CODES[mandate.status],
+        flags,
+        _micros(mandate.expires_at),
+        _micros(mandate.authorization_timestamp),
+        len(token),
+    ) + token
+
+
+def _decode_state(body: bytes) -> tuple[_State, int]:
+    """Decode a state; returns it and the offset just past it."""
+    code, flags, expires_at, authorized_at, token_length = _STATE.unpack_from(body)
+    end = _STATE.size + token_length
+    token = body[_STATE.size:end].decode() if flags & _HAS_TOKEN else None
+    return (
+        (_STATUSES[code], _moment(expires_at, flags & _HAS_EXPIRY),
+         _moment(authorized_at, flags & _HAS_AUTHORIZATION_TIME), token),
+        end,
+    )
+
+
+def _encode_mandate(mandate: PaymentMandate | MandateRecord) -> bytes:
+    """
+    Journal body of a new (or snapshotted) mandate: its state, then the
+    fields that never change once it exists, as JSON.
+    """
+    fixed = [
+        mandate.shopper_agent_id,
+        mandate.merchant_agent_id,
+        mandate.user_id,
+        mandate.currency,
+        mandate.created_at.isoformat(),
+        mandate.merchant_reference,
+        mandate.description,
+        [
+            [item.description, item.quantity, _unit_price_minor(item), item.currency]
+            for item in mandate.line_items
+        ],
+    ]
+    return _encode_state(mandate) + json.dumps(fixed, ensure_ascii=False).encode()
+
+
+def _unit_price_minor(item: LineItem | LineItemRecord) -> int:
+    return item.unit_price_minor if isinstance(item, LineItemRecord) else item.unit_price.minor
+
+
+def _decode_mandate(mandate_id: str, body: bytes, state: _State | None) -> MandateRecord:
+    """Rebuild a journaled mandate, with state (if given) from its latest transition."""
+    created_state, end = _decode_state(body)
+    status, expires_at, authorized_at, token = state or created_state
+    shopper_agent_id, merchant_agent_id, user_id, currency, created_at, merchant_reference, description, items = (
+        json.loads(body[end:])
+    )
+    return MandateRecord(
+        mandate_id=mandate_id,
+        shopper_agent_id=sys.intern(shopper_agent_id),
+        merchant_agent_id=sys.intern(merchant_agent_id),
+        user_id=sys.intern(user_id),
+        line_items=tuple(
+            LineItemRecord(description, quantity, minor, sys.intern(item_currency))
+            for description, quantity, minor, item_currency in items
+        ),
+        currency=sys.intern(currency),
+        status=status,
+        user_authorization_token=token,
+        authorization_timestamp=authorized_at,
+        expires_at=expires_at,
+        created_at=datetime.fromisoformat(created_at),
+        merchant_reference=sys.intern(merchant_reference) if merchant_reference is not None else None,
+        description=description,
+    )
+
+
+_SEATS = struct.Struct("<I")
+
+# Events per commit while writing a snapshot, bounding its write buffer
+_SNAPSHOT_BATCH = 10_000
+
+# Mandates that never change again, which snapshots move to the cold segment
+_COLD_STATUSES = SETTLED_STATUSES | {PaymentStatus.EXPIRED}
+
+
+class _Replay:
+    """The latest journaled state of each record, folded from events in order."""
+
+    def __init__(self):
+        self.created: dict[bytes, bytes] = {}
+        self.transitions: dict[bytes, bytes] = {}
+        self.bookings: dict[bytes, bytes] = {}
+        self.receipts: dict[bytes, bytes] = {}
+        self.seats: dict[bytes, bytes] = {}
+        self.evicted: set[bytes] = set()  # mandates evicted and not saved again
+        self.generation = 0  # from a snapshot's SNAPSHOT event
+
+    def fold(self, events: Iterable[Event]) -> None:
+        created, transitions, bookings, receipts, seats, evicted = (
+            self.created, self.transitions, self.bookings, self.receipts, self.seats, self.evicted,
+        )
+        mandate, transition, evict, booking, receipt, seat, snapshot = EventKind
+        for _, kind, key, body in events:
+            if kind == transition:
+                transitions[key] = body
+            elif kind == mandate:
+                created[key] = body
+                transitions.pop(key, None)
+                evicted.discard(key)
+            elif kind == seat:
+                seats[key] = body
+            elif kind == booking:
+                bookings[key] = body
+            elif kind == receipt:
+                receipts.setdefault(key, body)
+            elif kind == evict:
+                created.pop(key, None)
+                transitions.pop(key, None)
+                evicted.add(key)
+            elif kind == snapshot:
+                self.generation = int(key)
+
+
+class JournaledMandateStore(InMemoryMandateStore):
+    """
+    In-memory mandates and bookings backed by an append-only event journal.
+
+    Every write is journaled before it is applied, and returns once the
+    journal is durable (writes from concurrent requests share an fsync).
+    Writes inside batch() are held back and journaled together, in one
+    commit, when it exits; if it raises none of them are. Seat counts
+    are journaled too, and are durable once save_seats returns (inside
+    a batch, once the batch commits).
+
+    A mandate is journaled in full when first saved; later saves record
+    only what mandates change over their lifecycle (status, expiry and
+    authorization), so every transition stays on the audit trail. Other
+    fields must not change once a mandate has been saved.
+
+    Snapshots keep startup fast however long the history gets. Taking
+    one moves the journal aside as an archived segment (``<path>.<n>``)
+    and starts a new one, all under the store lock; the store's current
+    contents are then written to ``<path>.snapshot`` by a background
+    thread while requests carry on, and the segments it covers are
+    deleted. Startup loads the snapshot and replays only the journal
+    written since.
+
+    Most of a long-running store's history is settled: completed,
+    failed, cancelled and expired mandates, with their bookings and
+    receipts, which never change again. A snapshot writes those to a
+    separate cold segment (``<path>.cold``) that startup does not read,
+    so restart time follows the live mandates rather than the history.
+    The cold segment is merged in, once and under the store lock, by the
+    first call that may need it: a lookup of a mandate, receipt or
+    booking the store does not hold, a search that is not limited to a
+    live status, or a booking search. Answering an in-flight payment,
+    or searching for pending or processing mandates (as a restart
+    does), never loads it.
+
+    Mandates are mutated in place, so the snapshot may record a mandate
+    in a state newer than the cut; replay is unaffected, as every
+    transition sets a mandate's full lifecycle state and the journal
+    tail brings each one back to its latest.
+
+    Restored mandates are held as compact MandateRecords until they are
+    next saved, so get_mandate returns a copy of them (as it does for
+    settled mandates with compact_settled).
+
+    Args:
+        path: Journal file
+        compact_settled: As for InMemoryMandateStore
+        fsync: Whether writes wait for fsync (see EventLog)
+        snapshot_bytes: Journal size at which a snapshot is taken in the
+            background; 0 means only when snapshot() is called
+    """
+
+    def __init__(
+        self,
+        path: str,
+        compact_settled: bool = False,
+        fsync: bool = True,
+        snapshot_bytes: int = 0,
+    ):
+        super().__init__(compact_settled=compact_settled)
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self.cold_path = f"{path}.cold"
+        self.snapshot_bytes = snapshot_bytes
+        self.seats: dict[str, int] = {}
+        self._log = EventLog(path, fsync=fsync)
+        # The open batch's events, journaled when it exits; None outside a batch
+        self._pending: list[tuple[EventKind, str, bytes]] | None = None
+        self._batch_thread: int | None = None  # the thread with the batch open
+        self._batch_seats: int | None = None  # the batch's last seat count sequence
+        # Serializes save_seats with the snapshot cut; never held while
+        # taking another lock, as it is taken under seat inventory locks
+        self._seats_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()  # guards _snapshotting
+        self._snapshotting: threading.Thread | None = None
+        self._snapshot_write_lock = threading.Lock()  # one snapshot at a time
+        self._generation = 0  # archived segments are numbered from 1
+        # Whether the cold segment has been merged in (or there is none);
+        # until then, what the journal did to its mandates since it was
+        # written: mandates evicted, and transitions, by mandate_id
+        self._cold_loaded = True
+        self._cold_evicted: set[str] = set()
+        self._cold_transitions: dict[str, bytes] = {}
+        self.snapshots = 0
+        self._restore()
+
+    def _segments(self) -> list[tuple[int, str]]:
+        """Archived journal segments as (generation, path), oldest first."""
+        directory, name = os.path.split(os.path.abspath(self.path))
+        prefix = name + "."
+        segments = []
+        for entry in os.listdir(directory):
+            suffix = entry[len(prefix):]
+            if entry.startswith(prefix) and suffix.isdigit():
+                segments.append((int(suffix), os.path.join(directory, entry)))
+        return sorted(segments)
+
+    def _restore(self) -> None:
+        """Rebuild the store from the snapshot and the journal, keeping only each record's latest state."""
+        replay = _Replay()
+        if os.path.exists(self.snapshot_path):
+            replay.fold(read_events(self.snapshot_path))
+        segments = self._segments()
+        for generation, segment in segments:
+            if generation <= replay.generation:
+                # Left behind by a snapshot that finished but was cut short
+                # before cleaning up
+                os.remove(segment)
+            else:
+                replay.fold(read_events(segment))
+        replay.fold(self._log.replay())
+        self._generation = max([replay.generation, *(generation for generation, _ in segments)])
+
+        for key, body in replay.created.items():
+            transition = replay.transitions.get(key)
+            # Kept as a record until it is next saved: get_mandate hands
+            # out a model, and callers save the mandates they change
+            record = _decode_mandate(key.decode(), body, _decode_state(transition)[0] if transition else None)
+            self.mandates[record.mandate_id] = record
+            self._index.update(record)
+        for body in replay.bookings.values():
+            super().save_booking(json.loads(body))
+        for key, body in replay.receipts.items():
+            idempotency_key, receipt = json.loads(body)
+            self.receipts[key.decode()] = (idempotency_key, receipt)
+        self.seats = {key.decode(): _SEATS.unpack(body)[0] for key, body in replay.seats.items()}
+
+        if os.path.exists(self.cold_path):
+            self._cold_loaded = False
+            self._cold_evicted = {key.decode() for key in replay.evicted}
+            self._cold_transitions = {
+                key.decode(): body for key, body in replay.transitions.items() if key not in replay.created
+            }
+
+    def _load_cold(self) -> None:
+        """Merge the cold segment into the store, unless that is done already."""
+        if self._cold_loaded:
+            return
+        with self._lock:
+            if self._cold_loaded:
+                return
+            replay = _Replay()
+            replay.fold(read_events(self.cold_path))
+            # Anything the store holds was saved since the segment was
+            # written, so it is newer; none of this is undone by a batch
+            for key, body in replay.created.items():
+                mandate_id = key.decode()
+                if mandate_id in self.mandates or mandate_id in self._cold_evicted:
+                    continue
+                transition = self._cold_transitions.get(mandate_id)
+                record = _decode_mandate(mandate_id, body, _decode_state(transition)[0] if transition else None)
+                self.mandates[mandate_id] = record
+                self._index.update(record)
+            for body in replay.bookings.values():
+                booking = json.loads(body)
+                if booking["booking_id"] not in self.bookings:
+                    self._put_booking(booking["booking_id"], booking["mandate_id"], booking, booking["booking_id"])
+            for key, body in replay.receipts.items():
+                idempotency_key, receipt = json.loads(body)
+                self.receipts.setdefault(key.decode(), (idempotency_key, receipt))
+            self._cold_loaded = True
+            self._cold_evicted.clear()
+            self._cold_transitions.clear()
+
+    def _holds(self, mandate_id: str) -> bool:
+        """Whether the mandate is in memory, so the cold segment has nothing on it."""
+        return self._cold_loaded or mandate_id in self.mandates
+
+    def get_mandate(self, mandate_id: str) -> PaymentMandate | None:
+        if not self._holds(mandate_id):
+            self._load_cold()
+        return super().get_mandate(mandate_id)
+
+    def find_mandates(
+        self,
+        user_id: str | None = None,
+        shopper_agent_id: str | None = None,
+        status: PaymentStatus | None = None,
+        merchant_reference: str | None = None,
+        limit: int | None = None,
+    ) -> list[PaymentMandate]:
+        if status is None or status in _COLD_STATUSES:
+            self._load_cold()
+        return super().find_mandates(user_id, shopper_agent_id, status, merchant_reference, limit)
+
+    def count_mandates(
+        self,
+        user_id: str | None = None,
+        shopper_agent_id: str | None = None,
+        status: PaymentStatus | None = None,
+        merchant_reference: str | None = None,
+    ) -> int:
+        if status is None or status in _COLD_STATUSES:
+            self._load_cold()
+        return super().count_mandates(user_id, shopper_agent_id, status, merchant_reference)
+
+    def get_booking(self, booking_id: str) -> dict[str, Any] | None:
+        if booking_id not in self.bookings:
+            self._load_cold()
+        return super().get_booking(booking_id)
+
+    def find_bookings(self, mandate_ids: Iterable[str]) -> list[dict[str, Any]]:
+        self._load_cold()
+        return super().find_bookings(mandate_ids)
+
+    def get_receipt(self, mandate_id: str) -> tuple[str, dict[str, Any]] | None:
+        # A mandate the store holds has its receipt, if any, held too
+        if mandate_id not in self.receipts and not self._holds(mandate_id):
+            self._load_cold()
+        return super().get_receipt(mandate_id)
+
+    def _append(self, kind: EventKind, key: str, body: bytes = b"") -> int | None:
+        """
+        Journal an event, or hold it back for the open batch. Caller must hold the lock.
+
+        Returns:
+            The sequence number to commit, or None inside a batch
+        """
+        if self._pending is not None:
+            self._pending.append((kind, key, body))
+            return None
+        return self._log.append(kind, key, body)
+
+    def _commit(self, sequence: int | None) -> None:
+        # A batch commits everything it wrote when it exits
+        if sequence is not None:
+            self._log.commit(sequence)
+            self._maybe_snapshot()
+
+    def _save_mandate(self, mandate: PaymentMandate) -> int | None:
+        """Journal and apply a mandate save, returning what to commit. Caller must hold the lock."""
+        if mandate.mandate_id in self.mandates:
+            sequence = self._append(EventKind.TRANSITION, mandate.mandate_id, _encode_state(mandate))
+        else:
+            sequence = self._append(EventKind.MANDATE, mandate.mandate_id, _encode_mandate(mandate))
+        super().save_mandate(mandate)
+        return sequence
+
+    def save_mandate(self, mandate: PaymentMandate) -> None:
+        with self._lock:
+            sequence = self._save_mandate(mandate)
+        self._commit(sequence)
+
+    def transition_mandate(self, mandate: PaymentMandate, from_status: PaymentStatus) -> bool:
+        if not self._holds(mandate.mandate_id):
+            self._load_cold()
+        # Committed outside the lock, like save_mandate
+        with self._lock:
+            if not self._saved_as(mandate.mandate_id, from_status):
+                return False
+            sequence = self._save_mandate(mandate)
+        self._commit(sequence)
+        return True
+
+    def evict_mandate(self, mandate_id: str) -> None:
+        with self._lock:
+            sequence = self._append(EventKind.EVICT, mandate_id)
+            if not self._holds(mandate_id):
+                # Keep it out of the cold segment when that is loaded
+                self._undoable(lambda: self._cold_evicted.discard(mandate_id))
+                self._cold_evicted.add(mandate_id)
+            super().evict_mandate(mandate_id)
+        self._commit(sequence)
+
+    def save_booking(self, booking: dict[str, Any]) -> None:
+        with self._lock:
+            sequence = self._append(EventKind.BOOKING, booking["booking_id"], json.dumps(booking).encode())
+            super().save_booking(booking)
+        self._commit(sequence)
+
+    def save_receipt(self, mandate_id: str, idempotency_key: str, receipt: dict[str, Any]) -> None:
+        if not self._holds(mandate_id):
+            # The mandate may already have a receipt in the cold segment
+            self._load_cold()
+        with self._lock:
+            super().save_receipt(mandate_id, idempotency_key, receipt)
+            sequence = self._append(EventKind.RECEIPT, mandate_id, json.dumps([idempotency_key, receipt]).encode())
+        self._commit(sequence)
+
+    def save_seats(self, flight_id: str, seats_available: int) -> None:
+        # Journaled directly, not held back with a batch's events: this is
+        # called under the flight's lock, and the count must be on the log
+        # in the order the flight's changes were made
+        with self._seats_lock:
+            sequence = self._log.append(EventKind.SEATS, flight_id, _SEATS.pack(seats_available))
+            self.seats[flight_id] = seats_available
+        if self._batch_thread == threading.get_ident():
+            # The batch commits it with its own writes
+            self._batch_seats = sequence
+        else:
+            # Outside a batch (e.g. releasing lapsed holds or restocking)
+            # nothing else is about to commit it
+            self._commit(sequence)
+
+    def load_seats(self) -> dict[str, int]:
+        with self._seats_lock:
+            return dict(self.seats)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self._lock:
+            if self._pending is not None:
+                # Nested batches are part of the outer one
+                yield
+                return
+
+            self._pending = []
+            self._batch_thread = threading.get_ident()
+            sequence = None
+            try:
+                # Undoes the in-memory writes if the block, or journaling
+                # them, raises
+                with super().batch():
+                    yield
+                    for kind, key, body in self._pending:
+                        sequence = self._log.append(kind, key, body)
+            finally:
+                self._pending = None
+                self._batch_thread = None
+                # Seat counts changed in the batch are already on the log
+                # (a failed batch puts its seats back, so they net out)
+                seats, self._batch_seats = self._batch_seats, None
+        # Everything the batch wrote goes out in one commit
+        self._commit(sequence if sequence is not None else seats)
+
+    def _maybe_snapshot(self) -> None:
+        """Start a background snapshot once the journal reaches snapshot_bytes."""
+        if not self.snapshot_bytes or self._log.size() < self.snapshot_bytes:
+            return
+        with self._snapshot_lock:
+            if self._snapshotting is not None and self._snapshotting.is_alive():
+                return
+            self._snapshotting = threading.Thread(target=self.snapshot, name="journal-snapshot", daemon=True)
+            self._snapshotting.start()
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Write a snapshot of the store and drop the journal it replaces.
+
+        Only the cut blocks writers (a journal rotation and a shallow copy
+        of the store's tables); the snapshot itself is written without
+        holding the store lock. Settled mandates, bookings and receipts
+        go to the cold segment, along with what the previous cold
+        segment held if it was never loaded.
+
+        Returns:
+            Snapshot statistics
+        """
+        with self._snapshot_write_lock:
+            if self._cold_transitions:
+                # Replayed changes to cold mandates are only applied by loading them
+                self._load_cold()
+            started = time.perf_counter()
+            with self._lock, self._seats_lock:
+                generation = self._generation + 1
+                self._log.rotate(f"{self.path}.{generation}")
+                self._generation = generation
+                hot, cold = [], []
+                for mandate_id, mandate in self.mandates.items():
+                    status = self._index.indexed(mandate_id, "status")
+                    (cold if PaymentStatus(status) in _COLD_STATUSES else hot).append(mandate)
+                live = {mandate.mandate_id for mandate in hot}
+                bookings = list(self.bookings.values())
+                receipts = list(self.receipts.items())
+                seats = list(self.seats.items())
+                # Still to carry over from the unloaded cold segment: anything
+                # not since saved or evicted
+                carried = None
+                if not self._cold_loaded:
+                    carried = (set(self.mandates) | self._cold_evicted, set(self.bookings), set(self.receipts))
+            cut_ms = (time.perf_counter() - started) * 1000
+
+            hot_bookings = [booking for booking in bookings if booking["mandate_id"] in live]
+            hot_receipts = [(mandate_id, recorded) for mandate_id, recorded in receipts if mandate_id in live]
+            cold_events = itertools.chain(
+                self._carried_cold(*carried) if carried else (),
+                ((EventKind.MANDATE, mandate.mandate_id, _encode_mandate(mandate)) for mandate in cold),
+                ((EventKind.BOOKING, booking["booking_id"], json.dumps(booking).encode())
+                 for booking in bookings if booking["mandate_id"] not in live),
+                ((EventKind.RECEIPT, mandate_id, json.dumps(list(recorded)).encode())
+                 for mandate_id, recorded in receipts if mandate_id not in live),
+            )
+            hot_events = itertools.chain(
+                [(EventKind.SNAPSHOT, str(generation), b"")],
+                ((EventKind.MANDATE, mandate.mandate_id, _encode_mandate(mandate)) for mandate in hot),
+                ((EventKind.BOOKING, booking["booking_id"], json.dumps(booking).encode()) for booking in hot_bookings),
+                ((EventKind.RECEIPT, mandate_id, json.dumps(list(recorded)).encode()) for mandate_id, recorded in hot_receipts),
+                ((EventKind.SEATS, flight_id, _SEATS.pack(seats_available)) for flight_id, seats_available in seats),
+            )
+            # Cold first: until the new snapshot replaces the old one, the
+            # old snapshot and the archived segments still rebuild
+            # everything, and cold records they also hold are skipped
+            cold_count = self._write_snapshot_file(self.cold_path, cold_events)
+            self._write_snapshot_file(self.snapshot_path, hot_events)
+            for segment_generation, segment in self._segments():
+                if segment_generation <= generation:
+                    os.remove(segment)
+            self.snapshots += 1
+            return {
+                "generation": generation,
+                "mandates": len(hot),
+                "bookings": len(hot_bookings),
+                "bytes": os.path.getsize(self.snapshot_path),
+                "cold_records": cold_count,
+                "cold_bytes": os.path.getsize(self.cold_path),
+                "cut_ms": round(cut_ms, 3),
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+
+    def _carried_cold(
+        self,
+        mandate_ids: set[str],
+        booking_ids: set[str],
+        receipt_ids: set[str],
+    ) -> Iterator[tuple[EventKind, str, bytes]]:
+        """The unloaded cold segment's records, less those the store now holds or evicted."""
+        for _, kind, key, body in read_events(self.cold_path):
+            record_id = key.decode()
+            if kind == EventKind.MANDATE and record_id not in mandate_ids:
+                yield EventKind.MANDATE, record_id, body
+            elif kind == EventKind.BOOKING and record_id not in booking_ids:
+                yield EventKind.BOOKING, record_id, body
+            elif kind == EventKind.RECEIPT and record_id not in receipt_ids:
+                yield EventKind.RECEIPT, record_id, body
+
+    def _write_snapshot_file(self, path: str, events: Iterable[tuple[EventKind, str, bytes]]) -> int:
+        """Write events to a new file that atomically replaces path; returns how many."""
+        temporary = f"{path}.tmp"
+        # Created empty (a leftover from an interrupted snapshot is
+        # discarded), so a snapshot with nothing to write is a file too
+        open(temporary, "wb").close()
+        writer = EventLog(temporary, fsync=self._log.fsync)
+        count = 0
+        try:
+            for count, (kind, key, body) in enumerate(events, 1):
+                writer.append(kind, key, body)
+                if count % _SNAPSHOT_BATCH == 0:
+                    writer.commit()
+        finally:
+            writer.close()
+        os.replace(temporary, path)
+        fsync_directory(path)
+        return count
+
+    def journal_size(self) -> int:
+        """Bytes committed to the journal since the last snapshot."""
+        return self._log.size()
+
+    def close(self) -> None:
+        with self._snapshot_lock:
+            snapshotting = self._snapshotting
+        if snapshotting is not None:
+            snapshotting.join()
+        self._log.close()
+
+
+class SQLiteMandateStore(MandateStore):
+    """
+    Mandates and bookings persisted in SQLite.
+
+    Mandates are stored as JSON alongside indexed columns for the
+    fields we filter on (user_id, shopper_agent_id, status,
+    merchant_reference, created_at).
+
+    The store is also the seat ledger for every worker process sharing
+    the database: seat counts and holds live in the seats and
+    seat_holds tables, and seats are only taken by a conditional
+    decrement, so two workers can never sell the last seat twice. Seat
+    changes made inside a batch commit with the batch's mandates.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS mandates (
+            mandate_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            data TEXT NOT NULL,
+            shopper_agent_id TEXT NOT NULL DEFAULT '',
+            merchant_reference TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_mandates_user_id ON mandates (user_id);
+        CREATE INDEX IF NOT EXISTS idx_mandates_status ON mandates (status);
+        CREATE INDEX IF NOT EXISTS idx_mandates_created_at ON mandates (created_at);
+
+        CREATE TABLE IF NOT EXISTS bookings (
+            booking_id TEXT PRIMARY KEY,
+            mandate_id TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_bookings_mandate_id ON bookings (mandate_id);
+
+        CREATE TABLE IF NOT EXISTS receipts (
+            mandate_id TEXT PRIMARY KEY,
+            idempotency_key TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS seats (
+            flight_id TEXT PRIMARY KEY,
+            seats_available INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS seat_holds (
+            mandate_id TEXT PRIMARY KEY,
+            flight_id TEXT NOT NULL,
+            seats INTEGER NOT NULL
+        );
+    """
+
+    # Columns added after the first schema: (name, definition)
+    MIGRATIONS = (
+        ("shopper_agent_id", "TEXT NOT NULL DEFAULT ''"),
+        ("merchant_reference", "TEXT"),
+    )
+
+    # Created once MIGRATIONS have run, as they index migrated columns
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_mandates_user_status ON mandates (user_id, status);
+        CREATE INDEX IF NOT EXISTS idx_mandates_shopper_agent_id ON mandates (shopper_agent_id);
+        CREATE INDEX IF NOT EXISTS idx_mandates_reference_status ON mandates (merchant_reference, status);
+    """
+
+    shares_seats = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL only fsyncs at checkpoints; commits stay durable
+        # across application crashes
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+        self._conn.executescript(self.INDEXES)
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+
+    def _migrate(self) -> None:
+        """Add columns missing from databases created by older versions, backfilled from the JSON."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(mandates)")}
+        for name, definition in self.MIGRATIONS:
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE mandates ADD COLUMN {name} {definition}")
+                self._conn.execute(f"UPDATE mandates SET {name} = json_extract(data, '$.{name}')")
+
+    def _write(self, sql: str, params: tuple) -> None:
+        with self._writing():
+            self._conn.execute(sql, params)
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """Hold the lock for a write: in the open batch's transaction, or in a new one."""
+        with self._lock:
+            if self._batch_depth:
+                yield
+            else:
+                with self._transaction():
+                    yield
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self._lock:
+            if self._batch_depth:
+                # Nested batches join the outer transaction
+                self._batch_depth += 1
+                try:
+                    yield
+                finally:
+                    self._batch_depth -= 1
+                return
+
+            with self._transaction():
+                self._batch_depth = 1
+                try:
+                    yield
+                finally:
+                    self._batch_depth = 0
+
+    def get_mandate(self, mandate_id: str) -> PaymentMandate | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM mandates WHERE mandate_id = ?", (mandate_id,)
+            ).fetchone()
+        return PaymentMandate.model_validate_json(row[0]) if row else None
+
+    def save_mandate(self, mandate: PaymentMandate) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO mandates "
+            "(mandate_id, user_id, shopper_agent_id, status, merchant_reference, created_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                mandate.mandate_id,
+                mandate.user_id,
+                mandate.shopper_agent_id,
+                mandate.status.value,
+                mandate.merchant_reference,
+                mandate.created_at.isoformat(),
+                mandate.model_dump_json(),
+            ),
+        )
+
+    def transition_mandate(self, mandate: PaymentMandate, from_status: PaymentStatus) -> bool:
+        with self._writing():
+            return self._conn.execute(
+                "UPDATE mandates SET status = ?, data = ? WHERE mandate_id = ? AND status = ?",
+                (mandate.status.value, mandate.model_dump_json(), mandate.mandate_id, from_status.value),
+            ).rowcount == 1
+
+    def evict_mandate(self, mandate_id: str) -> None:
+        # Nothing is held in memory; the row keeps its final status on
+        # disk so expired checkouts remain visible for reconciliation
+        pass
+
+    @staticmethod
+    def _where(criteria: dict[str, Any]) -> tuple[str, tuple]:
+        if not criteria:
+            return "", ()
+        return " WHERE " + " AND ".join(f"{field} = ?" for field in criteria), tuple(criteria.values())
+
+    def find_mandates(
+        self,
+        user_id: str | None = None,
+        shopper_agent_id: str | None = None,
+        status: PaymentStatus | None = None,
+        merchant_reference: str | None = None,
+        limit: int | None = None,
+    ) -> list[PaymentMandate]:
+        where, params = self._where(_criteria(
+            user_id=user_id,
+            shopper_agent_id=shopper_agent_id,
+            status=status,
+            merchant_reference=merchant_reference,
+        ))
+        sql = f"SELECT data FROM mandates{where} ORDER BY created_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [PaymentMandate.model_validate_json(row[0]) for row in rows]
+
+    def count_mandates(
+        self,
+        user_id: str | None = None,
+        shopper_agent_id: str | None = None,
+        status: PaymentStatus | None = None,
+        merchant_reference: str | None = None,
+    ) -> int:
+        where, params = self._where(_criteria(
+            user_id=user_id,
+            shopper_agent_id=shopper_agent_id,
+            status=status,
+            merchant_reference=merchant_reference,
+        ))
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM mandates{where}", params).fetchone()[0]
+
+    def get_booking(self, booking_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM bookings WHERE booking_id = ?", (booking_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_booking(self, booking: dict[str, Any]) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO bookings (booking_id, mandate_id, data) VALUES (?, ?, ?)",
+            (booking["booking_id"], booking["mandate_id"], json.dumps(booking)),
+        )
+
+    def find_bookings(self, mandate_ids: Iterable[str]) -> list[dict[str, Any]]:
+        mandate_ids = list(mandate_ids)
+        found: dict[str, dict[str, Any]] = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(mandate_ids), 500):
+                chunk = mandate_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT mandate_id, data FROM bookings WHERE mandate_id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+                found.update((mandate_id, json.loads(data)) for mandate_id, data in rows)
+        return [found[mandate_id] for mandate_id in mandate_ids if mandate_id in found]
+
+    def get_receipt(self, mandate_id: str) -> tuple[str, dict[str, Any]] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT idempotency_key, data FROM receipts WHERE mandate_id = ?", (mandate_id,)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def save_receipt(self, mandate_id: str, idempotency_key: str, receipt: dict[str, Any]) -> None:
+        # Plain INSERT: the primary key rejects a second receipt even when
+        # two worker processes race on the same mandate
+        try:
+            self._write(
+                "INSERT INTO receipts (mandate_id, idempotency_key, data) VALUES (?, ?, ?)",
+                (mandate_id, idempotency_key, json.dumps(receipt)),
+            )
+        except sqlite3.IntegrityError:
+            raise DuplicateReceiptError(mandate_id) from None
+
+    def load_seats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT flight_id, seats_available FROM seats"))
+
+    def _seats_available(self, flight_id: str) -> int:
+        return self._conn.execute(
+            "SELECT seats_available FROM seats WHERE flight_id = ?", (flight_id,)
+        ).fetchone()[0]
+
+    def hold_seats(self, mandate_id: str, flight_id: str, seats: int, available: int) -> tuple[bool, int]:
+        with self._writing():
+            if self._conn.execute("SELECT 1 FROM seat_holds WHERE mandate_id = ?", (mandate_id,)).fetchone():
+                raise ValueError(f"Mandate {mandate_id} already holds seats")
+            self._conn.execute(
+                "INSERT OR IGNORE INTO seats (flight_id, seats_available) VALUES (?, ?)", (flight_id, available)
+            )
+            held = self._conn.execute(
+                "UPDATE seats SET seats_available = seats_available - ? "
+                "WHERE flight_id = ? AND seats_available >= ?",
+                (seats, flight_id, seats),
+            ).rowcount == 1
+            if held:
+                self._conn.execute(
+                    "INSERT INTO seat_holds (mandate_id, flight_id, seats) VALUES (?, ?, ?)",
+                    (mandate_id, flight_id, seats),
+                )
+            return held, self._seats_available(flight_id)
+
+    def _take_hold(self, mandate_id: str) -> tuple[str, int] | None:
+        """Delete a mandate's hold, returning (flight_id, seats). Caller must be writing."""
+        row = self._conn.execute(
+            "SELECT flight_id, seats FROM seat_holds WHERE mandate_id = ?", (mandate_id,)
+        ).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM seat_holds WHERE mandate_id = ?", (mandate_id,))
+        return row
+
+    def commit_seats(self, mandate_id: str) -> tuple[str, int] | None:
+        with self._writing():
+            return self._take_hold(mandate_id)
+
+    def release_seats(self, mandate_id: str) -> tuple[str, int, int] | None:
+        with self._writing():
+            hold = self._take_hold(mandate_id)
+            if hold is None:
+                return None
+            flight_id, seats = hold
+            self._conn.execute(
+                "UPDATE seats SET seats_available = seats_available + ? WHERE flight_id = ?", (seats, flight_id)
+            )
+            return flight_id, seats, self._seats_available(flight_id)
+
+    def restock_seats(self, flight_id: str, seats: int, available: int) -> int:
+        with self._writing():
+            self._conn.execute(
+                "INSERT OR IGNORE INTO seats (flight_id, seats_available) VALUES (?, ?)", (flight_id, available)
+            )
+            self._conn.execute(
+                "UPDATE seats SET seats_available = seats_available + ? WHERE flight_id = ?", (seats, flight_id)
+            )
+            return self._seats_available(flight_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
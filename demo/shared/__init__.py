@@ -7,9 +7,20 @@ from .ap2_types import (
     PaymentMethod,
     LineItem,
     PaymentMandate,
+    mandate_totals,
     AP2_EXTENSION_URI,
     create_ap2_extension,
 )
+from .aio import async_tool, run_sync
+from .authorization import (
+    AuthorizationSigner,
+    InvalidAuthorizationToken,
+    TokenVerifier,
+    mandate_digest,
+)
+from .expiry import ExpiryQueue
+from .money import Money, batch_totals, sum_money
+from .records import LineItemRecord, MandateRecord
 
 __all__ = [
     "AP2Role",
@@ -18,6 +29,19 @@ __all__ = [
     "PaymentMethod",
     "LineItem",
     "PaymentMandate",
+    "mandate_totals",
     "AP2_EXTENSION_URI",
     "create_ap2_extension",
+    "async_tool",
+    "run_sync",
+    "AuthorizationSigner",
+    "InvalidAuthorizationToken",
+    "TokenVerifier",
+    "mandate_digest",
+    "ExpiryQueue",
+    "Money",
+    "batch_totals",
+    "sum_money",
+    "LineItemRecord",
+    "MandateRecord",
 ]
@@ -0,0 +1,94 @@
+"""
+Async Helpers
+
+Glue between the async tool implementations and synchronous callers.
+
+Agent tools are written as coroutines so ADK can await them without
+blocking its event loop; scripts, benchmarks and other synchronous
+code call them through thin wrappers built on run_sync.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, TypeVar
+
+T = TypeVar("T")
+
+_local = threading.local()
+
+
+class _ThreadLoop:
+    """
+    Owns one thread's private event loop.
+
+    Held only by the thread-local, so it is freed (closing the loop)
+    as soon as its thread exits rather than later by the cycle
+    collector, which may tear down the loop's sockets first.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+
+    def __del__(self):
+        if not self.loop.is_closed():
+            self.loop.close()
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Each thread reuses one private event loop, so calling a sync wrapper
+    in a tight loop does not pay for creating a loop every time.
+
+    Called from a thread that is already running an event loop (sync
+    code invoked from async code), the coroutine runs on a helper
+    thread's private loop instead, and this call blocks until it is
+    done. Await the coroutine directly where possible: the caller's
+    loop is blocked meanwhile.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _run_on_thread_loop(coro)
+    return _helpers().submit(_run_on_thread_loop, coro).result()
+
+
+def _run_on_thread_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """Run coro on the calling thread's private event loop."""
+    owner = getattr(_local, "owner", None)
+    if owner is None or owner.loop.is_closed():
+        owner = _local.owner = _ThreadLoop()
+    return owner.loop.run_until_complete(coro)
+
+
+_helpers_lock = threading.Lock()
+_helper_pool: concurrent.futures.ThreadPoolExecutor | None = None
+
+
+def _helpers() -> concurrent.futures.ThreadPoolExecutor:
+    """Threads that run coroutines for run_sync calls made inside an event loop."""
+    global _helper_pool
+    with _helpers_lock:
+        if _helper_pool is None:
+            _helper_pool = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="run-sync")
+        return _helper_pool
+
+
+def async_tool(func: Callable[..., Awaitable[T]], name: str) -> Callable[..., Awaitable[T]]:
+    """
+    Expose a coroutine function to ADK under the given tool name.
+
+    ADK advertises a FunctionTool by its function's ``__name__``; this
+    lets ``search_flights_async`` be offered to the model as
+    ``search_flights``, keeping tool names stable. Signature and
+    docstring are those of func.
+    """
+    @functools.wraps(func)
+    async def tool(*args: Any, **kwargs: Any) -> T:
+        return await func(*args, **kwargs)
+
+    tool.__name__ = tool.__qualname__ = name
+    return tool
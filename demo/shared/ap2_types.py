@@ -5,12 +5,21 @@ This module defines the core types and utilities for the AP2 protocol,
 including roles, extension parameters, and payment mandate structures.
 """
 
-from typing import Literal
-from pydantic import BaseModel, Field
+import functools
+from typing import Any, Literal, Sequence
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_validator
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 import uuid
 
+from .money import Money, batch_totals_minor, sum_money
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
 
 # AP2 Role Types
 AP2Role = Literal["merchant", "shopper", "credentials-provider", "payment-processor"]
@@ -29,6 +38,7 @@ class PaymentStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
+    EXPIRED = "expired"
 
 
 class PaymentMethod(BaseModel):
@@ -39,15 +49,118 @@ class PaymentMethod(BaseModel):
 
 
 class LineItem(BaseModel):
-    """A line item in a payment mandate."""
+    """
+    A line item in a payment mandate.
+
+    Immutable, so a mandate's cached total can only go stale by
+    reassigning its line_items.
+    """
+    model_config = ConfigDict(frozen=True)
+
     description: str
     quantity: int = 1
-    unit_price: float
+    unit_price: Money
     currency: str = "USD"
 
+    @model_validator(mode="before")
+    @classmethod
+    def _price_in_item_currency(cls, data: Any) -> Any:
+        # Plain numbers are amounts in the line item's own currency;
+        # anything else (missing, None, ...) is left for field validation
+        price = data.get("unit_price") if isinstance(data, dict) else None
+        if isinstance(price, (str, int, float, Decimal)) and not isinstance(price, bool):
+            data = {**data, "unit_price": Money.of(price, data.get("currency", "USD"))}
+        return data
+
+    @model_validator(mode="after")
+    def _check_currency(self) -> "LineItem":
+        if self.unit_price.currency != self.currency:
+            raise ValueError(
+                f"unit_price is in {self.unit_price.currency} but the line item is in {self.currency}"
+            )
+        return self
+
+    @property
+    def total(self) -> Money:
+        return self.unit_price * self.quantity
+
     @property
-    def total(self) -> float:
-        return self.quantity * self.unit_price
+    def total_minor(self) -> int:
+        """Line total in integer minor units (e.g. cents)."""
+        return self.unit_price.minor * self.quantity
+
+    @classmethod
+    def trusted(
+        cls,
+        description: str,
+        unit_price: Money | float,
+        quantity: int = 1,
+        currency: str = "USD",
+    ) -> "LineItem":
+        """
+        Build a line item from merchant-generated data without validation.
+
+        Line items are immutable, so equal trusted items are built once
+        and shared: every mandate for a flight reuses the same fare and
+        tax items.
+
+        Only use this for values the merchant computed itself; anything
+        that came from another agent must go through the normal constructor.
+        """
+        if cls is not LineItem:
+            return _construct_line_item(cls, description, unit_price, quantity, currency)
+        return _trusted_line_item(description, unit_price, quantity, currency)
+
+
+def _construct_line_item(
+    cls: type[LineItem],
+    description: str,
+    unit_price: Money | float,
+    quantity: int,
+    currency: str,
+) -> LineItem:
+    return cls.model_construct(
+        description=description,
+        quantity=quantity,
+        unit_price=Money.of(unit_price, currency),
+        currency=currency,
+    )
+
+
+@functools.lru_cache(maxsize=4096, typed=True)
+def _trusted_line_item(description: str, unit_price: Money | float, quantity: int, currency: str) -> LineItem:
+    return _construct_line_item(LineItem, description, unit_price, quantity, currency)
+
+
+@functools.lru_cache(maxsize=4096)
+def _summary_line(item: LineItem) -> str:
+    """How to_summary() lists a line item (cached: trusted items are shared)."""
+    return f"{item.description} x{item.quantity} = {item.total}"
+
+
+@functools.cache
+def _default_factories(cls: type[BaseModel]) -> tuple[tuple[str, Any], ...]:
+    """(field name, default factory) for each of a model's fields that has one."""
+    return tuple(
+        (name, field.default_factory)
+        for name, field in cls.model_fields.items()
+        if field.default_factory is not None
+    )
+
+
+@functools.cache
+def _prototype(cls: type[BaseModel]) -> BaseModel:
+    """
+    An instance holding only a model's plain (immutable) defaults.
+
+    Copying it is much cheaper than model_construct, which resolves
+    and copies every default on every call.
+    """
+    return cls.model_construct(set())
+
+
+# PaymentMandate fields that feed the cached parts of to_summary()
+_SUMMARY_FIELDS = frozenset({"mandate_id", "merchant_agent_id", "line_items", "currency"})
 
 
 class PaymentMandate(BaseModel):
@@ -64,23 +177,78 @@ class PaymentMandate(BaseModel):
     merchant_agent_id: str
     user_id: str
 
-    # Payment details
-    line_items: list[LineItem]
+    # Payment details (a tuple, so the cached total cannot go stale)
+    line_items: tuple[LineItem, ...]
     currency: str = "USD"
 
     # Authorization
     status: PaymentStatus = PaymentStatus.PENDING
     user_authorization_token: str | None = None
     authorization_timestamp: datetime | None = None
+    expires_at: datetime | None = None
 
     # Metadata
     created_at: datetime = Field(default_factory=datetime.utcnow)
     merchant_reference: str | None = None
     description: str | None = None
 
+    # Parts of to_summary() that only change when these fields do
+    _summary_cache: dict[str, Any] | None = PrivateAttr(default=None)
+
+    # Cached total in minor units, dropped when line_items is reassigned
+    _total_minor: int | None = PrivateAttr(default=None)
+
+    @classmethod
+    def trusted(cls, **data: Any) -> "PaymentMandate":
+        """
+        Build a mandate from merchant-generated data without validation.
+
+        Defaults (mandate_id, created_at, status) are filled in as usual,
+        and every field passed or generated counts as set. Line items
+        should be built with LineItem.trusted.
+        """
+        if "line_items" in data:
+            data["line_items"] = tuple(data["line_items"])
+        for name, factory in _default_factories(cls):
+            if name not in data:
+                data[name] = factory()
+        return _prototype(cls).model_copy(update=data)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "line_items":
+            value = tuple(value)
+            self._total_minor = None
+        super().__setattr__(name, value)
+        if name in _SUMMARY_FIELDS:
+            self._summary_cache = None
+
+    def __eq__(self, other: object) -> bool:
+        # Compare field values only; cached summaries are not part of a mandate's identity
+        if not isinstance(other, PaymentMandate):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    @property
+    def total_minor(self) -> int:
+        """
+        Mandate total in integer minor units (e.g. cents), cached.
+
+        line_items is a tuple of immutable LineItems, so the only way to
+        change it is to reassign it, which drops the cache.
+        """
+        if self._total_minor is None:
+            self._total_minor = sum_money(
+                (item.total for item in self.line_items), self.currency
+            ).minor
+        return self._total_minor
+
     @property
-    def total_amount(self) -> float:
-        return sum(item.total for item in self.line_items)
+    def total_amount(self) -> Money:
+        return Money(self.total_minor, self.currency)
+
+    def add_line_item(self, item: LineItem) -> None:
+        """Append a line item, keeping the cached total consistent."""
+        self.line_items = (*self.line_items, item)
 
     def authorize(self, token: str) -> None:
         """Authorize the mandate with a user token."""
@@ -88,18 +256,61 @@ class PaymentMandate(BaseModel):
         self.authorization_timestamp = datetime.utcnow()
         self.status = PaymentStatus.AUTHORIZED
 
+    def set_ttl(self, seconds: float) -> None:
+        """Expire the mandate if it is not authorized within seconds of creation."""
+        self.expires_at = self.created_at + timedelta(seconds=seconds)
+
+    def is_expired(self, now: datetime | None = None) -> bool:
+        """Whether a pending mandate has outlived its TTL."""
+        if self.status != PaymentStatus.PENDING or self.expires_at is None:
+            return False
+        return (now or datetime.utcnow()) >= self.expires_at
+
+    def expire(self) -> None:
+        """Mark an unauthorized mandate as expired."""
+        self.status = PaymentStatus.EXPIRED
+
+    def cancel(self) -> None:
+        """Cancel the mandate before it is paid."""
+        self.status = PaymentStatus.CANCELLED
+
     def to_summary(self) -> dict:
         """Return a summary suitable for display to users."""
-        return {
-            "mandate_id": self.mandate_id,
-            "merchant": self.merchant_agent_id,
-            "total": f"{self.currency} {self.total_amount:.2f}",
-            "items": [
-                f"{item.description} x{item.quantity} = {item.currency} {item.total:.2f}"
-                for item in self.line_items
-            ],
-            "status": self.status.value
-        }
+        cached = self._summary_cache
+        if cached is None:
+            cached = self._summary_cache = {
+                "mandate_id": self.mandate_id,
+                "merchant": self.merchant_agent_id,
+                "total": str(self.total_amount),
+                "items": [_summary_line(item) for item in self.line_items],
+            }
+        return {**cached, "items": list(cached["items"]), "status": self.status.value}
+
+
+def mandate_totals(mandates: Sequence[PaymentMandate]) -> list[Money]:
+    """
+    Totals of many mandates at once (e.g. a settlement batch), caching each.
+
+    Mandates whose total is not cached yet are added up together: with
+    NumPy installed their line item totals go through one int64
+    batch_totals_minor pass, with no Money built per line item.
+    """
+    uncached = [mandate for mandate in mandates if mandate._total_minor is None]
+    if uncached and np is not None:
+        minors = []
+        sizes = []
+        for mandate in uncached:
+            currency = mandate.currency
+            for item in mandate.line_items:
+                if item.currency != currency:
+                    raise ValueError(f"Currency mismatch: {currency} vs {item.currency}")
+                minors.append(item.total_minor)
+            sizes.append(len(mandate.line_items))
+
+        totals = batch_totals_minor(np.asarray(minors, dtype=np.int64), np.asarray(sizes, dtype=np.int64))
+        for mandate, total in zip(uncached, totals.tolist()):
+            mandate._total_minor = total
+    return [mandate.total_amount for mandate in mandates]
 
 
 # AP2 Extension URI
@@ -0,0 +1,337 @@
+"""
+Payment Authorization Tokens
+
+A user authorizes a mandate by signing it with their device key
+(Ed25519). The signature covers a canonical digest of the mandate's
+payment terms (mandate id, user, merchant, currency and total in minor
+units), so a token is only good for the exact payment the user saw: it
+cannot be replayed against another mandate, user or amount.
+
+Token format (ASCII, dot separated):
+
+    ap2v1.<key id>.<issued at>.<signature>
+
+where the key id names the signing key (so a user can rotate keys),
+issued at is whole seconds since the epoch, and the signature is the
+base64url Ed25519 signature of the token's header (everything up to
+and including the last dot) followed by the mandate digest. Since
+issued at is signed, a verifier can bound how old a token it accepts
+(see TokenVerifier's max_age).
+
+A signature check is a large share of the cost of settling a payment,
+so ``TokenVerifier`` keeps a bounded cache of verdicts and verifies
+batches with each distinct token checked once.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Mapping
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+from .money import Money
+
+
+TOKEN_VERSION = "ap2v1"
+
+# Domain separation for mandate digests and demo device keys
+_DIGEST_DOMAIN = "ap2-payment-mandate-v1"
+_DEMO_KEY_DOMAIN = b"ap2-demo-device-key-v1:"
+
+_SIGNATURE_LENGTH = 64
+
+# Seconds a token's issued at may lie ahead of the verifier's clock
+_CLOCK_SKEW = 60
+
+# (token, digest, user_id) to verify
+TokenCheck = tuple[str, bytes, str]
+
+
+class InvalidAuthorizationToken(ValueError):
+    """Raised when an authorization token is malformed, unknown or does not match the mandate."""
+
+
+def mandate_digest(mandate_id: str, user_id: str, merchant_agent_id: str, amount: Money) -> bytes:
+    """
+    SHA-256 of a mandate's payment terms, in a canonical encoding.
+
+    Shopper and merchant compute it independently; the amount is
+    encoded as integer minor units, so "USD 952.00" and 952.0 agree.
+    """
+    terms = [_DIGEST_DOMAIN, mandate_id, user_id, merchant_agent_id, amount.currency, amount.minor]
+    return hashlib.sha256(json.dumps(terms, separators=(",", ":")).encode()).digest()
+
+
+def public_key_id(public_key: Ed25519PublicKey) -> str:
+    """Short, stable name for a public key (hex of its SHA-256, truncated)."""
+    return hashlib.sha256(public_key.public_bytes(Encoding.Raw, PublicFormat.Raw)).hexdigest()[:16]
+
+
+def demo_device_seed(user_id: str) -> bytes:
+    """
+    Device key seed for a demo user, derived from the user id alone.
+
+    Lets the shopper and merchant processes agree on keys with no
+    enrolment step. Anyone can derive these keys, so they are for demos
+    only; configure real keys for anything else.
+    """
+    return hashlib.sha256(_DEMO_KEY_DOMAIN + user_id.encode()).digest()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class AuthorizationSigner:
+    """
+    A user's device key, signing mandate digests into authorization tokens.
+
+    Args:
+        private_key: The device's Ed25519 key
+    """
+
+    def __init__(self, private_key: Ed25519PrivateKey):
+        self._private_key = private_key
+        self.public_key = private_key.public_key()
+        self.key_id = public_key_id(self.public_key)
+
+    @classmethod
+    def from_seed(cls, seed: bytes) -> "AuthorizationSigner":
+        """Load the key from its 32-byte private seed."""
+        return cls(Ed25519PrivateKey.from_private_bytes(seed))
+
+    @classmethod
+    def for_demo_user(cls, user_id: str) -> "AuthorizationSigner":
+        """The well-known demo key for user_id (see demo_device_seed)."""
+        return cls.from_seed(demo_device_seed(user_id))
+
+    @property
+    def public_key_hex(self) -> str:
+        """The public key, hex encoded, for a merchant's trusted key list."""
+        return self.public_key.public_bytes(Encoding.Raw, PublicFormat.Raw).hex()
+
+    def sign(self, digest: bytes, issued_at: int | None = None) -> str:
+        """Return the authorization token for a mandate digest."""
+        issued_at = int(time.time()) if issued_at is None else issued_at
+        header = f"{TOKEN_VERSION}.{self.key_id}.{issued_at}."
+        signature = self._private_key.sign(header.encode() + digest)
+        return header + _b64encode(signature)
+
+
+def parse_trusted_keys(spec: str) -> dict[str, list[str]]:
+    """
+    Parse a trusted key list: comma-separated ``user_id:public_key_hex``
+    pairs, where a user may appear more than once (e.g. while rotating
+    keys).
+    """
+    trusted: dict[str, list[str]] = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        user_id, sep, key_hex = entry.rpartition(":")
+        if not sep or not user_id:
+            raise ValueError(f"Trusted key entries must be user_id:public_key_hex, got {entry!r}")
+        trusted.setdefault(user_id.strip(), []).append(key_hex.strip())
+    return trusted
+
+
+class TokenVerifier:
+    """
+    Verifies authorization tokens against users' trusted public keys.
+
+    Verdicts, failures included, are cached least-recently-used per
+    (token, digest, user), so a retried or re-checked payment costs a
+    dictionary lookup instead of a signature check. Loaded public keys
+    are kept too. A token's age is checked on every call, before the
+    cache, so a cached verdict never outlives max_age.
+
+    Args:
+        trusted: Hex public keys per user_id
+        demo_keys: Accept the demo key (see demo_device_seed) of any
+            user with no trusted key, derived on first use
+        cache_size: Verdicts to keep; 0 disables the cache
+        max_age: Seconds after it was issued that a token is accepted;
+            None accepts tokens of any age
+        clock: Time source (seconds since the epoch)
+    """
+
+    def __init__(
+        self,
+        trusted: Mapping[str, Iterable[str]] | None = None,
+        demo_keys: bool = False,
+        cache_size: int = 65536,
+        max_age: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.demo_keys = demo_keys
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys: dict[str, dict[str, Ed25519PublicKey]] = {}
+        self._cache: OrderedDict[TokenCheck, str | None] = OrderedDict()
+        self.verified = 0
+        self.rejected = 0
+        self.hits = 0
+        self.misses = 0
+        for user_id, keys in (trusted or {}).items():
+            for key_hex in keys:
+                self.trust(user_id, key_hex)
+
+    def trust(self, user_id: str, public_key_hex: str) -> str:
+        """
+        Accept tokens signed by this key for user_id.
+
+        Returns:
+            The key's id
+        """
+        try:
+            public_key = Ed25519PublicKey.from_public_bytes(bytes.fromhex(public_key_hex))
+        except ValueError:
+            raise ValueError(f"Invalid Ed25519 public key for {user_id}: {public_key_hex!r}") from None
+        key_id = public_key_id(public_key)
+        with self._lock:
+            self._keys.setdefault(user_id, {})[key_id] = public_key
+            # Tokens rejected for an unknown key may be good now
+            self._cache.clear()
+        return key_id
+
+    def _user_keys(self, user_id: str) -> dict[str, Ed25519PublicKey]:
+        """The user's keys, deriving the demo key on first use. Caller must hold the lock."""
+        keys = self._keys.get(user_id)
+        if keys is None and self.demo_keys:
+            signer = AuthorizationSigner.for_demo_user(user_id)
+            keys = self._keys[user_id] = {signer.key_id: signer.public_key}
+        return keys or {}
+
+    def verify(self, token: str, digest: bytes, user_id: str) -> None:
+        """
+        Check that token is user_id's signature over digest.
+
+        Raises:
+            InvalidAuthorizationToken: If it is not
+        """
+        error = self.verify_many([(token, digest, user_id)])[0]
+        if error is not None:
+            raise InvalidAuthorizationToken(error)
+
+    def verify_many(self, checks: Iterable[TokenCheck]) -> list[str | None]:
+        """
+        Verify a batch of tokens.
+
+        Cached verdicts are answered without touching the signatures,
+        and a check repeated within the batch is verified once; the
+        remaining signatures are verified outside the lock, so
+        concurrent batches do not wait on each other.
+
+        Returns:
+            None for each valid token, else why it was rejected, in order
+        """
+        checks = list(checks)
+        verdicts: dict[TokenCheck, str | None] = {}
+        pending: list[tuple[TokenCheck, Ed25519PublicKey, bytes, bytes]] = []
+        # Rejected for their age, which is not cached (a token issued
+        # ahead of our clock becomes good later)
+        untimely: set[TokenCheck] = set()
+        now = self._clock()
+
+        with self._lock:
+            for check in checks:
+                if check in verdicts:
+                    continue
+                verdict = self._untimely(check[0], now)
+                if verdict is not None:
+                    verdicts[check] = verdict
+                    untimely.add(check)
+                    continue
+                verdict = self._cache.get(check, self)
+                if verdict is not self:
+                    self._cache.move_to_end(check)
+                    self.hits += 1
+                    verdicts[check] = verdict
+                    continue
+                self.misses += 1
+                token, digest, user_id = check
+                parsed = self._parse(token, user_id)
+                if isinstance(parsed, str):
+                    verdicts[check] = parsed
+                    continue
+                public_key, header, signature = parsed
+                verdicts[check] = None
+                pending.append((check, public_key, header + digest, signature))
+
+        for check, public_key, message, signature in pending:
+            try:
+                public_key.verify(signature, message)
+            except InvalidSignature:
+                verdicts[check] = "signature does not match the mandate"
+
+        with self._lock:
+            if self.cache_size > 0:
+                for check, verdict in verdicts.items():
+                    if check not in self._cache and check not in untimely:
+                        self._cache[check] = verdict
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            results = [verdicts[check] for check in checks]
+            rejected = sum(1 for verdict in results if verdict is not None)
+            self.verified += len(results) - rejected
+            self.rejected += rejected
+        return results
+
+    def _untimely(self, token: str, now: float) -> str | None:
+        """Why the token is too old (or too new) to accept, if it is; malformed tokens are left to _parse."""
+        if self.max_age is None:
+            return None
+        parts = token.split(".")
+        if len(parts) != 4 or parts[0] != TOKEN_VERSION or not parts[2].isdigit():
+            return None
+        issued_at = int(parts[2])
+        if now - issued_at > self.max_age:
+            return "authorization token has expired"
+        if issued_at - now > _CLOCK_SKEW:
+            return "authorization token is issued in the future"
+        return None
+
+    def _parse(self, token: str, user_id: str) -> tuple[Ed25519PublicKey, bytes, bytes] | str:
+        """Split a token into (signing key, signed header, signature), or the reason it is unusable. Caller must hold the lock."""
+        parts = token.split(".")
+        if len(parts) != 4 or parts[0] != TOKEN_VERSION or not parts[2].isdigit():
+            return "malformed authorization token"
+        try:
+            signature = _b64decode(parts[3])
+        except (binascii.Error, ValueError):
+            return "malformed authorization token"
+        if len(signature) != _SIGNATURE_LENGTH:
+            return "malformed authorization token"
+        public_key = self._user_keys(user_id).get(parts[1])
+        if public_key is None:
+            return f"token is not signed by a key trusted for user {user_id}"
+        return public_key, token[:len(token) - len(parts[3])].encode(), signature
+
+    def stats(self) -> dict[str, Any]:
+        """Verification counts and cache hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "verified": self.verified,
+                "rejected": self.rejected,
+                "cache_entries": len(self._cache),
+                "cache_size": self.cache_size,
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "trusted_users": len(self._keys),
+            }
@@ -0,0 +1,74 @@
+"""
+Expiry Queue
+
+Deadline tracking for anything with a TTL (mandates, seat holds).
+Expired keys are found by popping a min-heap, so the cost of a sweep
+depends on how many keys are due, not on how many are being tracked.
+"""
+
+import heapq
+import threading
+import time
+from typing import Callable, Hashable
+
+
+class ExpiryQueue:
+    """
+    A min-heap of (deadline, key) with lazy cancellation.
+
+    Rescheduling or cancelling a key leaves its old heap entry behind;
+    stale entries are skipped when popped and the heap is compacted
+    once they outnumber the live ones.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._heap: list[tuple[float, Hashable]] = []
+        self._deadlines: dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def now(self) -> float:
+        """Current time on the queue's clock."""
+        return self._clock()
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Track key until deadline (on the queue's clock), replacing any earlier deadline."""
+        with self._lock:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+
+    def schedule_in(self, key: Hashable, ttl: float) -> float:
+        """Track key for ttl seconds from now. Returns the deadline."""
+        deadline = self._clock() + ttl
+        self.schedule(key, deadline)
+        return deadline
+
+    def cancel(self, key: Hashable) -> None:
+        """Stop tracking key."""
+        with self._lock:
+            if self._deadlines.pop(key, None) is not None:
+                self._maybe_compact()
+
+    def pop_due(self) -> list[Hashable]:
+        """Remove and return every key whose deadline has passed."""
+        now = self._clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, key = heapq.heappop(self._heap)
+                # Skip entries left behind by cancel/reschedule
+                if self._deadlines.get(key) == deadline:
+                    del self._deadlines[key]
+                    due.append(key)
+        return due
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._deadlines):
+            self._heap = [(deadline, key) for key, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
@@ -0,0 +1,277 @@
+"""
+Money
+
+Exact monetary amounts stored as integer minor units (e.g. cents) plus
+an ISO 4217 currency code. Arithmetic never goes through floats, so
+totals stay exact no matter how many amounts are added together.
+"""
+
+import re
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Iterable, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+# Minor-unit exponent per currency; anything not listed uses 2 (cents)
+CURRENCY_EXPONENTS = {
+    "BHD": 3,
+    "JPY": 0,
+    "KRW": 0,
+    "KWD": 3,
+    "VND": 0,
+}
+
+DEFAULT_CURRENCY = "USD"
+
+# A displayed amount: "USD 952.00", "952.00 USD", "$952.00" or "952"
+_DISPLAYED = re.compile(r"\s*([A-Z]{3})?\s*\$?\s*(-?[0-9][0-9,]*(?:\.[0-9]+)?)\s*([A-Z]{3})?\s*")
+
+
+def currency_exponent(currency: str) -> int:
+    """Number of decimal places used by a currency."""
+    return CURRENCY_EXPONENTS.get(currency, 2)
+
+
+class Money:
+    """
+    An immutable amount of money in integer minor units.
+
+    Formats like a number (``f"{price:.2f}"``), prints as
+    ``"USD 952.00"``, and serializes to JSON as a plain number so the
+    wire format of models using it is unchanged.
+    """
+
+    __slots__ = ("minor", "currency")
+
+    minor: int
+    currency: str
+
+    def __init__(self, minor: int, currency: str = DEFAULT_CURRENCY):
+        object.__setattr__(self, "minor", int(minor))
+        object.__setattr__(self, "currency", currency)
+
+    @classmethod
+    def of(cls, amount: "Money | int | float | str | Decimal", currency: str = DEFAULT_CURRENCY) -> "Money":
+        """
+        Build Money from a major-unit amount (e.g. 850.0 -> 85000 cents).
+
+        Floats are converted through their shortest decimal repr, so
+        0.1 means exactly ten cents; fractions of a minor unit round half up.
+        """
+        if isinstance(amount, Money):
+            if amount.currency != currency:
+                raise ValueError(f"Expected {currency}, got {amount.currency}")
+            return amount
+        if isinstance(amount, bool):
+            raise TypeError("Money amount cannot be a bool")
+        if isinstance(amount, int):
+            return cls(amount * 10 ** currency_exponent(currency), currency)
+        try:
+            value = Decimal(str(amount)) if isinstance(amount, float) else Decimal(amount)
+        except ArithmeticError:
+            raise ValueError(f"Invalid money amount: {amount!r}") from None
+        if not value.is_finite():
+            raise ValueError(f"Invalid money amount: {amount!r}")
+        minor = value.scaleb(currency_exponent(currency)).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        return cls(int(minor), currency)
+
+    @classmethod
+    def parse(cls, text: str, currency: str = DEFAULT_CURRENCY) -> "Money":
+        """
+        Parse a displayed amount such as ``"USD 952.00"`` (the ``str()``
+        form), ``"$952.00"`` or ``"952"``; currency applies when the text
+        names none.
+        """
+        match = _DISPLAYED.fullmatch(text)
+        if match is None or (match[1] and match[3]):
+            raise ValueError(f"Invalid money amount: {text!r}")
+        return cls.of(match[2].replace(",", ""), match[1] or match[3] or currency)
+
+    @classmethod
+    def zero(cls, currency: str = DEFAULT_CURRENCY) -> "Money":
+        return cls(0, currency)
+
+    @property
+    def amount(self) -> Decimal:
+        """Exact major-unit amount."""
+        return Decimal(self.minor).scaleb(-currency_exponent(self.currency))
+
+    # --- Immutability -----------------------------------------------------
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Money is immutable")
+
+    def __reduce__(self):
+        return (Money, (self.minor, self.currency))
+
+    # --- Arithmetic -------------------------------------------------------
+
+    def _check(self, other: "Money") -> None:
+        if other.currency != self.currency:
+            raise ValueError(f"Currency mismatch: {self.currency} vs {other.currency}")
+
+    def __add__(self, other: object) -> "Money":
+        if isinstance(other, Money):
+            self._check(other)
+            return Money(self.minor + other.minor, self.currency)
+        return NotImplemented
+
+    def __radd__(self, other: object) -> "Money":
+        # Lets sum() start from its default 0
+        if other == 0:
+            return self
+        return self.__add__(other)
+
+    def __sub__(self, other: object) -> "Money":
+        if isinstance(other, Money):
+            self._check(other)
+            return Money(self.minor - other.minor, self.currency)
+        return NotImplemented
+
+    def __mul__(self, quantity: object) -> "Money":
+        if isinstance(quantity, int) and not isinstance(quantity, bool):
+            return Money(self.minor * quantity, self.currency)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> "Money":
+        return Money(-self.minor, self.currency)
+
+    def scale(self, rate: float | str | Decimal) -> "Money":
+        """Multiply by a rate (e.g. a tax rate), rounding half up to a minor unit."""
+        scaled = (Decimal(self.minor) * Decimal(str(rate))).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        return Money(int(scaled), self.currency)
+
+    # --- Comparison -------------------------------------------------------
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Money):
+            return self.minor == other.minor and self.currency == other.currency
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.minor, self.currency))
+
+    def __lt__(self, other: object) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._check(other)
+        return self.minor < other.minor
+
+    def __le__(self, other: object) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._check(other)
+        return self.minor <= other.minor
+
+    def __gt__(self, other: object) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._check(other)
+        return self.minor > other.minor
+
+    def __ge__(self, other: object) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._check(other)
+        return self.minor >= other.minor
+
+    def __bool__(self) -> bool:
+        return self.minor != 0
+
+    # --- Conversion -------------------------------------------------------
+
+    def __float__(self) -> float:
+        return self.minor / 10 ** currency_exponent(self.currency)
+
+    def __format__(self, spec: str) -> str:
+        if not spec:
+            return str(self)
+        return format(self.amount, spec)
+
+    def __str__(self) -> str:
+        exponent = currency_exponent(self.currency)
+        return f"{self.currency} {self.amount:.{exponent}f}"
+
+    def __repr__(self) -> str:
+        return f"Money({self.minor}, {self.currency!r})"
+
+    # --- Pydantic integration ---------------------------------------------
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> Any:
+        from pydantic_core import core_schema
+
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                float, when_used="json"
+            ),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema: Any, handler: Any) -> dict:
+        return {"type": "number"}
+
+    @classmethod
+    def _validate(cls, value: Any) -> "Money":
+        if isinstance(value, Money):
+            return value
+        if isinstance(value, bool) or not isinstance(value, (int, float, str, Decimal)):
+            raise ValueError(f"Expected a money amount, got {type(value).__name__}")
+        return cls.of(value)
+
+
+def sum_money(values: Iterable[Money], currency: str = DEFAULT_CURRENCY) -> Money:
+    """Add up amounts in one currency."""
+    total = 0
+    for value in values:
+        if value.currency != currency:
+            raise ValueError(f"Currency mismatch: {currency} vs {value.currency}")
+        total += value.minor
+    return Money(total, currency)
+
+
+def batch_totals(groups: Sequence[Sequence[Money]], currency: str = DEFAULT_CURRENCY) -> list[Money]:
+    """
+    Total many groups of amounts at once (e.g. every mandate in a settlement batch).
+
+    With NumPy installed the additions run as one vectorized int64
+    cumulative sum; otherwise each group is summed in Python.
+    """
+    if np is None:
+        return [sum_money(group, currency) for group in groups]
+
+    minors = []
+    sizes = []
+    for group in groups:
+        for value in group:
+            if value.currency != currency:
+                raise ValueError(f"Currency mismatch: {currency} vs {value.currency}")
+            minors.append(value.minor)
+        sizes.append(len(group))
+
+    totals = batch_totals_minor(np.asarray(minors, dtype=np.int64), np.asarray(sizes, dtype=np.int64))
+    return [Money(total, currency) for total in totals.tolist()]
+
+
+def batch_totals_minor(minor_units: "np.ndarray", group_sizes: "np.ndarray") -> "np.ndarray":
+    """
+    Vectorized group totals over flat int64 minor-unit arrays.
+
+    minor_units holds every amount back to back and group_sizes says how
+    many consecutive amounts belong to each group. Exact: no floats involved.
+    """
+    if np is None:
+        raise RuntimeError("batch_totals_minor requires numpy (pip install numpy)")
+
+    # totals[g] = prefix[end_g] - prefix[start_g]
+    prefix = np.zeros(len(minor_units) + 1, dtype=np.int64)
+    np.cumsum(minor_units, out=prefix[1:])
+    ends = np.cumsum(group_sizes)
+    return prefix[ends] - prefix[ends - group_sizes]
@@ -0,0 +1,124 @@
+"""
+Compact Mandate Records
+
+Slotted, immutable stand-ins for settled PaymentMandate and LineItem
+objects, for keeping large volumes of history in memory.
+
+A pydantic instance carries a ``__dict__``, a fields-set set, private
+attribute storage and a Money object per price. A record is a plain
+slotted tuple of fields: amounts are integer minor units and repeated
+strings (agent ids, currency codes) are interned, so a million
+mandates from the same few agents share one copy of each id.
+
+Conversion is lossless in both directions:
+``MandateRecord.from_model(m).to_model() == m``.
+"""
+
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+
+from .ap2_types import LineItem, PaymentMandate, PaymentStatus
+from .money import Money
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if value is not None else None
+
+
+@dataclass(frozen=True, slots=True)
+class LineItemRecord:
+    """Compact, immutable form of a LineItem."""
+    description: str
+    quantity: int
+    unit_price_minor: int
+    currency: str
+
+    @classmethod
+    def from_model(cls, item: LineItem) -> "LineItemRecord":
+        return cls(
+            description=item.description,
+            quantity=item.quantity,
+            unit_price_minor=item.unit_price.minor,
+            currency=sys.intern(item.currency),
+        )
+
+    def to_model(self) -> LineItem:
+        return LineItem.trusted(
+            description=self.description,
+            unit_price=Money(self.unit_price_minor, self.currency),
+            quantity=self.quantity,
+            currency=self.currency,
+        )
+
+    @property
+    def total_minor(self) -> int:
+        return self.unit_price_minor * self.quantity
+
+
+@dataclass(frozen=True, slots=True)
+class MandateRecord:
+    """
+    Compact, immutable form of a PaymentMandate.
+
+    Field names match PaymentMandate, so read-only code (indexes,
+    reports) can use either.
+    """
+    mandate_id: str
+    shopper_agent_id: str
+    merchant_agent_id: str
+    user_id: str
+    line_items: tuple[LineItemRecord, ...]
+    currency: str
+    status: PaymentStatus
+    user_authorization_token: str | None
+    authorization_timestamp: datetime | None
+    expires_at: datetime | None
+    created_at: datetime
+    merchant_reference: str | None
+    description: str | None
+
+    @classmethod
+    def from_model(cls, mandate: PaymentMandate) -> "MandateRecord":
+        return cls(
+            mandate_id=mandate.mandate_id,
+            shopper_agent_id=sys.intern(mandate.shopper_agent_id),
+            merchant_agent_id=sys.intern(mandate.merchant_agent_id),
+            user_id=sys.intern(mandate.user_id),
+            line_items=tuple(LineItemRecord.from_model(item) for item in mandate.line_items),
+            currency=sys.intern(mandate.currency),
+            status=mandate.status,
+            user_authorization_token=mandate.user_authorization_token,
+            authorization_timestamp=mandate.authorization_timestamp,
+            expires_at=mandate.expires_at,
+            created_at=mandate.created_at,
+            merchant_reference=_intern(mandate.merchant_reference),
+            description=mandate.description,
+        )
+
+    def to_model(self) -> PaymentMandate:
+        """Rebuild the pydantic mandate (a new, mutable instance each call)."""
+        return PaymentMandate.trusted(
+            mandate_id=self.mandate_id,
+            shopper_agent_id=self.shopper_agent_id,
+            merchant_agent_id=self.merchant_agent_id,
+            user_id=self.user_id,
+            line_items=[item.to_model() for item in self.line_items],
+            currency=self.currency,
+            status=self.status,
+            user_authorization_token=self.user_authorization_token,
+            authorization_timestamp=self.authorization_timestamp,
+            expires_at=self.expires_at,
+            created_at=self.created_at,
+            merchant_reference=self.merchant_reference,
+            description=self.description,
+        )
+
+    @property
+    def total_minor(self) -> int:
+        """Mandate total in integer minor units."""
+        return sum(item.total_minor for item in self.line_items)
+
+    @property
+    def total_amount(self) -> Money:
+        return Money(self.total_minor, self.currency)
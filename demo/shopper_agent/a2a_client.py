@@ -0,0 +1,196 @@
+"""
+A2A Client
+
+Calls tools on remote merchant agents over A2A (JSON-RPC ``message/send``).
+
+The merchant is an ADK agent, so a request is a message asking it to
+run one of its tools; the tool's structured result comes back as an
+ADK ``function_response`` data part, which is what we read instead of
+the model's prose.
+
+Connections are pooled: each event loop gets one keep-alive HTTP
+session that is reused by every call made on it.
+"""
+
+import asyncio
+import json
+import uuid
+import weakref
+from typing import Any
+
+import httpx
+
+
+# Data part metadata ADK uses to mark a tool's result
+FUNCTION_RESPONSE_METADATA = ("adk_type", "function_response")
+
+# Responses worth retrying when the request is safe to repeat
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+
+class A2AError(Exception):
+    """Raised when a remote agent cannot be reached or returns no usable result."""
+
+
+class A2AClient:
+    """
+    Client for one remote A2A agent.
+
+    Args:
+        url: The agent's A2A endpoint (its agent card ``url``)
+        timeout: Seconds to wait for a response (the merchant runs a model turn)
+        connect_timeout: Seconds to wait for a connection
+        retries: Extra attempts after a transient failure
+        retry_backoff: Seconds before the first retry; doubles on each retry
+        max_connections: Size of the keep-alive pool
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 30.0,
+        connect_timeout: float = 3.0,
+        retries: int = 2,
+        retry_backoff: float = 0.2,
+        max_connections: int = 20,
+    ):
+        self.url = url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        # httpx sessions are tied to the event loop that opened them
+        self._sessions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _session(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.is_closed:
+            session = self._sessions[loop] = httpx.AsyncClient(
+                timeout=self.timeout, limits=self.limits
+            )
+        return session
+
+    async def aclose(self) -> None:
+        """Close the session opened on the running event loop."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.aclose()
+
+    async def send_message(
+        self,
+        text: str,
+        data: dict[str, Any] | None = None,
+        idempotent: bool = True,
+    ) -> dict[str, Any]:
+        """
+        Send one message to the agent and return the JSON-RPC result.
+
+        Connection failures are always retried, since the request never
+        reached the agent. Timeouts and gateway errors are retried only
+        when the request is idempotent.
+
+        Raises:
+            A2AError: If the agent is unreachable or answers with an error
+        """
+        parts: list[dict[str, Any]] = [{"kind": "text", "text": text}]
+        if data is not None:
+            parts.append({"kind": "data", "data": data})
+
+        payload = {
+            "jsonrpc": "2.0",
+            "id": str(uuid.uuid4()),
+            "method": "message/send",
+            "params": {
+                "message": {
+                    "kind": "message",
+                    "role": "user",
+                    "messageId": str(uuid.uuid4()),
+                    "parts": parts,
+                },
+            },
+        }
+
+        attempt = 0
+        while True:
+            retryable = attempt < self.retries
+            try:
+                response = await self._session().post(self.url, json=payload)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if not retryable:
+                    raise A2AError(f"Could not connect to {self.url}: {e}") from e
+            except httpx.TransportError as e:
+                if not (retryable and idempotent):
+                    raise A2AError(f"Request to {self.url} failed: {e!r}") from e
+            else:
+                if response.status_code == 200:
+                    return self._result(response)
+                if not (response.status_code in RETRYABLE_STATUS_CODES and retryable and idempotent):
+                    raise A2AError(f"{self.url} answered HTTP {response.status_code}")
+
+            await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+            attempt += 1
+
+    def _result(self, response: httpx.Response) -> dict[str, Any]:
+        try:
+            body = response.json()
+        except ValueError:
+            raise A2AError(f"{self.url} returned invalid JSON") from None
+        if "error" in body:
+            error = body["error"]
+            raise A2AError(f"{self.url} returned an error: {error.get('message', error)}")
+        return body.get("result") or {}
+
+    async def call_tool(
+        self,
+        tool: str,
+        arguments: dict[str, Any],
+        idempotent: bool = True,
+    ) -> dict[str, Any]:
+        """
+        Ask the remote agent to run one of its tools and return the tool's result.
+
+        Raises:
+            A2AError: If the call fails or the agent did not run the tool
+        """
+        result = await self.send_message(
+            f"Call the {tool} tool with exactly these arguments and return its result: "
+            f"{json.dumps(arguments)}",
+            data={"tool": tool, "arguments": arguments},
+            idempotent=idempotent,
+        )
+
+        response = find_function_response(result, tool)
+        if response is None:
+            raise A2AError(f"{self.url} did not return a {tool} result")
+        return response
+
+
+def find_function_response(result: Any, tool: str) -> dict[str, Any] | None:
+    """
+    Return the last result of tool found anywhere in an A2A task or message.
+
+    ADK reports tool results as data parts tagged with
+    ``adk_type: function_response`` holding ``{"name", "response"}``.
+    """
+    found = None
+    stack = [result]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            data = node.get("data")
+            metadata = node.get("metadata") or {}
+            if (
+                isinstance(data, dict)
+                and metadata.get(FUNCTION_RESPONSE_METADATA[0]) == FUNCTION_RESPONSE_METADATA[1]
+                and data.get("name") == tool
+            ):
+                found = data.get("response")
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return found
@@ -5,15 +5,17 @@ This agent acts as a shopper in the AP2 protocol, helping users
 find and book travel arrangements by communicating with merchant agents.
 """
 
+import json
 import os
 import sys
-from typing import Any
+import time
+from typing import Any, Awaitable, Callable
 
 # Add shared module to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from google.adk import Agent
-from google.adk.tools import FunctionTool
+from google.adk.tools import FunctionTool, ToolContext
 from google.adk.agents import SequentialAgent
 
 from shared.ap2_types import (
@@ -21,6 +23,14 @@ from shared.ap2_types import (
     PaymentStatus,
     create_ap2_extension,
 )
+from shared.aio import async_tool, run_sync
+from shared.authorization import AuthorizationSigner, mandate_digest
+from shared.expiry import ExpiryQueue
+from shared.money import Money
+
+from .a2a_client import A2AClient, A2AError
+from .fanout import fan_out_search, is_valid_offer, merge_offers
+from .offer_cache import OfferCache, query_key, session_lookup, session_store
 
 
 # ============================================================================
@@ -38,6 +48,114 @@ USER_SESSION = {
 
 PENDING_MANDATES: dict[str, dict] = {}
 
+# Seconds an authorization request is kept before it is evicted
+MANDATE_TTL_SECONDS = float(os.getenv("SHOPPER_MANDATE_TTL", 15 * 60))
+
+# Eviction deadlines for PENDING_MANDATES
+MANDATE_EXPIRY = ExpiryQueue()
+
+
+def build_device_signer() -> AuthorizationSigner:
+    """
+    Load the user's device key, which signs payment authorizations.
+
+    Set SHOPPER_SIGNING_KEY to the hex-encoded 32-byte Ed25519 private
+    seed (the merchant must trust its public key). Without it the
+    well-known demo key for the session user is used, which merchants
+    accept only when they opt in with MERCHANT_ALLOW_DEMO_KEYS=1.
+    """
+    seed = os.getenv("SHOPPER_SIGNING_KEY")
+    if seed:
+        return AuthorizationSigner.from_seed(bytes.fromhex(seed))
+    return AuthorizationSigner.for_demo_user(USER_SESSION["user_id"])
+
+
+# Signs the mandates the user approves
+DEVICE_SIGNER = build_device_signer()
+
+
+def _default_merchant_url() -> str:
+    """The merchant's A2A endpoint, from its agent card."""
+    card_path = os.path.join(os.path.dirname(__file__), "..", "merchant_agent", "agent_card.json")
+    with open(card_path) as f:
+        return json.load(f)["url"]
+
+
+def _a2a_enabled() -> bool:
+    return os.getenv("SHOPPER_MERCHANT_MODE", "simulated").lower() == "a2a"
+
+
+def _merchant_client(url: str) -> A2AClient:
+    return A2AClient(
+        url,
+        timeout=float(os.getenv("SHOPPER_A2A_TIMEOUT", 30)),
+        retries=int(os.getenv("SHOPPER_A2A_RETRIES", 2)),
+    )
+
+
+def build_merchant_client() -> A2AClient | None:
+    """
+    Build the A2A client for the merchant agent, or None to simulate it.
+
+    SHOPPER_MERCHANT_MODE=a2a calls the merchant over A2A at
+    MERCHANT_A2A_URL (default: the url in merchant_agent/agent_card.json),
+    using SHOPPER_A2A_TIMEOUT seconds per request and SHOPPER_A2A_RETRIES
+    retries. Any other value keeps the simulated merchant responses.
+    """
+    if not _a2a_enabled():
+        return None
+    return _merchant_client(os.getenv("MERCHANT_A2A_URL") or _default_merchant_url())
+
+
+def build_merchant_clients() -> dict[str, A2AClient]:
+    """
+    Build A2A clients for every merchant searched by search_all_merchants.
+
+    SHOPPER_MERCHANT_URLS is a comma-separated list of merchant A2A
+    endpoints (default: just the booking merchant). Each merchant is
+    named by the last path segment of its URL. Empty when simulating.
+    """
+    if not _a2a_enabled():
+        return {}
+    urls = os.getenv("SHOPPER_MERCHANT_URLS") or os.getenv("MERCHANT_A2A_URL") or _default_merchant_url()
+    clients = {}
+    for url in (url.strip() for url in urls.split(",")):
+        if url:
+            clients[url.rstrip("/").rsplit("/", 1)[-1]] = _merchant_client(url)
+    return clients
+
+
+# Client for the remote merchant agent (None when simulating it)
+MERCHANT_CLIENT = build_merchant_client()
+
+# Every merchant to search, by name
+MERCHANT_CLIENTS = build_merchant_clients()
+
+# Seconds each merchant gets to answer a multi-merchant search
+MERCHANT_SEARCH_DEADLINE = float(os.getenv("SHOPPER_MERCHANT_DEADLINE", 5))
+
+# Merchant search responses shared by every session: served as is for
+# SHOPPER_OFFER_CACHE_TTL seconds, then for SHOPPER_OFFER_CACHE_STALE more
+# while a background refresh runs
+OFFER_CACHE = OfferCache(
+    fresh_for=float(os.getenv("SHOPPER_OFFER_CACHE_TTL", 60)),
+    stale_for=float(os.getenv("SHOPPER_OFFER_CACHE_STALE", 300)),
+    fetch_timeout=float(os.getenv("SHOPPER_OFFER_CACHE_TIMEOUT", 30)),
+)
+
+
+def evict_expired_mandates() -> list[str]:
+    """
+    Drop authorization requests whose TTL has passed.
+
+    Returns:
+        IDs of the evicted mandates
+    """
+    evicted = MANDATE_EXPIRY.pop_due()
+    for mandate_id in evicted:
+        PENDING_MANDATES.pop(mandate_id, None)
+    return evicted
+
 
 # ============================================================================
 # Shopper Tools
@@ -63,7 +181,7 @@ def get_user_preferences() -> dict[str, Any]:
     }
 
 
-def request_user_authorization(
+async def request_user_authorization_async(
     mandate_id: str,
     merchant_name: str,
     amount: str,
@@ -86,6 +204,8 @@ def request_user_authorization(
     Returns:
         Authorization status and token if approved
     """
+    evict_expired_mandates()
+
     # Store the pending mandate
     PENDING_MANDATES[mandate_id] = {
         "mandate_id": mandate_id,
@@ -95,6 +215,7 @@ def request_user_authorization(
         "line_items": line_items,
         "status": "pending_user_input",
     }
+    MANDATE_EXPIRY.schedule_in(mandate_id, MANDATE_TTL_SECONDS)
 
     # In a real implementation, this would:
     # 1. Display a secure UI to the user
@@ -125,7 +246,18 @@ For this demo, use the 'confirm_payment' tool with the mandate_id.
     }
 
 
-def confirm_payment(mandate_id: str, approved: bool = True) -> dict[str, Any]:
+def request_user_authorization(
+    mandate_id: str,
+    merchant_name: str,
+    amount: str,
+    description: str,
+    line_items: list[str],
+) -> dict[str, Any]:
+    """Synchronous wrapper for request_user_authorization_async."""
+    return run_sync(request_user_authorization_async(mandate_id, merchant_name, amount, description, line_items))
+
+
+async def confirm_payment_async(mandate_id: str, approved: bool = True) -> dict[str, Any]:
     """
     Confirm or reject a payment authorization.
 
@@ -138,6 +270,8 @@ def confirm_payment(mandate_id: str, approved: bool = True) -> dict[str, Any]:
     Returns:
         Authorization token if approved, rejection if not
     """
+    evict_expired_mandates()
+
     if mandate_id not in PENDING_MANDATES:
         return {
             "status": "error",
@@ -154,12 +288,18 @@ def confirm_payment(mandate_id: str, approved: bool = True) -> dict[str, Any]:
             "mandate_id": mandate_id,
         }
 
-    # Generate authorization token (simulated)
-    # In real AP2, this would be a cryptographic token signed by the user's device
-    import hashlib
-    import time
-    token_data = f"{mandate_id}:{USER_SESSION['user_id']}:{time.time()}"
-    authorization_token = hashlib.sha256(token_data.encode()).hexdigest()[:32]
+    # Sign exactly what the user was shown: the merchant verifies the
+    # signature against its own copy of the mandate, so a token cannot
+    # be used for another mandate or amount
+    try:
+        amount = Money.parse(mandate["amount"])
+    except ValueError:
+        return {
+            "status": "error",
+            "message": f"Cannot authorize an unrecognized amount: {mandate['amount']}"
+        }
+    digest = mandate_digest(mandate_id, USER_SESSION["user_id"], mandate["merchant"], amount)
+    authorization_token = DEVICE_SIGNER.sign(digest)
 
     mandate["status"] = "authorized"
     mandate["authorization_token"] = authorization_token
@@ -174,6 +314,11 @@ def confirm_payment(mandate_id: str, approved: bool = True) -> dict[str, Any]:
     }
 
 
+def confirm_payment(mandate_id: str, approved: bool = True) -> dict[str, Any]:
+    """Synchronous wrapper for confirm_payment_async."""
+    return run_sync(confirm_payment_async(mandate_id, approved))
+
+
 def get_payment_methods() -> dict[str, Any]:
     """
     Get the user's available payment methods.
@@ -196,17 +341,20 @@ def get_payment_methods() -> dict[str, Any]:
     }
 
 
-def search_merchant_flights(
+async def search_merchant_flights_async(
     origin: str,
     destination: str,
     date: str | None = None,
     travel_class: str | None = None,
+    tool_context: ToolContext | None = None,
 ) -> dict[str, Any]:
     """
     Search for flights via the merchant agent.
 
-    In a full A2A implementation, this would call the remote merchant agent.
-    For this demo, we'll simulate the merchant's response.
+    Calls the remote merchant over A2A when SHOPPER_MERCHANT_MODE=a2a;
+    otherwise the merchant's response is simulated. Repeating a search
+    reuses the offers already fetched instead of asking the merchant
+    again.
 
     Args:
         origin: Origin airport code
@@ -217,7 +365,48 @@ def search_merchant_flights(
     Returns:
         Flight search results from merchant
     """
-    # Simulated merchant response (in real A2A, this calls RemoteA2aAgent)
+    return await _cached_search(
+        query_key("search_merchant_flights", origin, destination, date, travel_class),
+        lambda: _fetch_merchant_flights(origin, destination, date, travel_class),
+        tool_context,
+    )
+
+
+async def _cached_search(
+    key: str,
+    fetch: Callable[[], Awaitable[dict[str, Any]]],
+    tool_context: ToolContext | None,
+) -> dict[str, Any]:
+    """
+    Answer a search from this session's offers, then the shared offer
+    cache, and only then from the merchant.
+
+    Cached answers say where they came from in ``cached`` ("session",
+    "fresh" or "stale").
+    """
+    state = tool_context.state if tool_context is not None else None
+    if state is not None:
+        shown = session_lookup(state, key, OFFER_CACHE.fresh_for + OFFER_CACHE.stale_for)
+        if shown is not None:
+            return {**shown, "cached": "session"}
+
+    response, served = await OFFER_CACHE.get(key, fetch)
+    if state is not None and response.get("status") == "success":
+        session_store(state, key, response)
+    return response if served == "miss" else {**response, "cached": served}
+
+
+async def _fetch_merchant_flights(
+    origin: str,
+    destination: str,
+    date: str | None,
+    travel_class: str | None,
+) -> dict[str, Any]:
+    """Ask the merchant (or its simulation) for flights."""
+    if MERCHANT_CLIENT is not None:
+        return await _search_remote_merchant(origin, destination, date, travel_class)
+
+    # Simulated merchant response
     flights = [
         {
             "flight_id": "FL001",
@@ -257,9 +446,181 @@ def search_merchant_flights(
     }
 
 
-def initiate_booking(
+def search_merchant_flights(
+    origin: str,
+    destination: str,
+    date: str | None = None,
+    travel_class: str | None = None,
+) -> dict[str, Any]:
+    """Synchronous wrapper for search_merchant_flights_async."""
+    return run_sync(search_merchant_flights_async(origin, destination, date, travel_class))
+
+
+async def _search_remote_merchant(
+    origin: str,
+    destination: str,
+    date: str | None,
+    travel_class: str | None,
+) -> dict[str, Any]:
+    """Run search_flights on the merchant over A2A and shape the offers for the user."""
+    try:
+        response = await MERCHANT_CLIENT.call_tool(
+            "search_flights", _search_arguments(origin, destination, date, travel_class)
+        )
+    except A2AError as e:
+        return {
+            "status": "error",
+            "message": f"Merchant unavailable: {e}"
+        }
+
+    if not isinstance(response, dict) or response.get("status") != "success":
+        return {
+            "status": "error",
+            "message": response.get("message", "Merchant search failed") if isinstance(response, dict)
+            else "Unreadable search response from merchant"
+        }
+
+    flights = response.get("flights", [])
+    flights = [_offer_for_user(flight) for flight in flights if is_valid_offer(flight)] if isinstance(flights, list) else []
+
+    return {
+        "status": "success",
+        "source": "flight_merchant_agent",
+        "search": {"origin": origin, "destination": destination, "date": date},
+        "results": flights,
+        "message": f"Found {len(flights)} flights from {origin} to {destination}",
+    }
+
+
+def _offer_for_user(flight: dict[str, Any]) -> dict[str, Any]:
+    """Shape a merchant's flight record for display."""
+    return {
+        "flight_id": flight["flight_id"],
+        "airline": flight["airline"],
+        "route": f"{flight['origin']} → {flight['destination']}",
+        "departure": flight["departure"],
+        "arrival": flight["arrival"],
+        "price": f"${flight['price']:,.2f}",
+        "class": flight["class"],
+    }
+
+
+def _search_arguments(
+    origin: str,
+    destination: str,
+    date: str | None,
+    travel_class: str | None,
+) -> dict[str, Any]:
+    arguments = {"origin": origin, "destination": destination}
+    if date:
+        arguments["date"] = date
+    if travel_class:
+        arguments["travel_class"] = travel_class
+    return arguments
+
+
+async def search_all_merchants_async(
+    origin: str,
+    destination: str,
+    date: str | None = None,
+    travel_class: str | None = None,
+    max_results: int | None = None,
+    tool_context: ToolContext | None = None,
+) -> dict[str, Any]:
+    """
+    Search every known merchant at once and merge their offers.
+
+    Merchants are queried concurrently, each with its own deadline. Slow
+    or unavailable merchants are reported but do not hold up the others.
+    A flight sold by several merchants is listed once, at the best price,
+    and offers are ranked cheapest first. Repeating a search reuses the
+    offers already fetched.
+
+    Args:
+        origin: Origin airport code
+        destination: Destination airport code
+        date: Travel date (YYYY-MM-DD)
+        travel_class: Preferred class
+        max_results: Optional maximum number of offers to return
+
+    Returns:
+        Ranked offers (each naming its merchant) and a per-merchant report
+    """
+    return await _cached_search(
+        query_key("search_all_merchants", origin, destination, date, travel_class, max_results),
+        lambda: _fetch_all_merchants(origin, destination, date, travel_class, max_results),
+        tool_context,
+    )
+
+
+async def _fetch_all_merchants(
+    origin: str,
+    destination: str,
+    date: str | None,
+    travel_class: str | None,
+    max_results: int | None,
+) -> dict[str, Any]:
+    """Fan the search out to every merchant and merge the answers."""
+    if not MERCHANT_CLIENTS:
+        # Simulated mode: there is only the one merchant
+        response = await _fetch_merchant_flights(origin, destination, date, travel_class)
+        results = response.get("results", [])[:max_results]
+        return {
+            **response,
+            "results": [{**offer, "merchant": response.get("source")} for offer in results],
+            "merchants": [{"merchant": response.get("source"), "status": "ok", "offers": len(results)}],
+        }
+
+    searches = await fan_out_search(
+        MERCHANT_CLIENTS,
+        _search_arguments(origin, destination, date, travel_class),
+        MERCHANT_SEARCH_DEADLINE,
+    )
+    offers = merge_offers(searches)
+    if max_results is not None:
+        offers = offers[:max_results]
+
+    answered = sum(1 for search in searches if search.status == "ok")
+    if answered == len(searches):
+        status = "success"
+    elif answered:
+        status = "partial"
+    else:
+        status = "error"
+
+    return {
+        "status": status,
+        "search": {"origin": origin, "destination": destination, "date": date},
+        "results": [
+            {**_offer_for_user(offer), "merchant": offer["merchant"], "also_offered_by": offer["also_offered_by"]}
+            for offer in offers
+        ],
+        "merchants": [search.summary() for search in searches],
+        "message": f"Found {len(offers)} flights from {origin} to {destination} "
+                   f"({answered} of {len(searches)} merchants answered)",
+    }
+
+
+def search_all_merchants(
+    origin: str,
+    destination: str,
+    date: str | None = None,
+    travel_class: str | None = None,
+    max_results: int | None = None,
+) -> dict[str, Any]:
+    """Synchronous wrapper for search_all_merchants_async."""
+    return run_sync(search_all_merchants_async(origin, destination, date, travel_class, max_results))
+
+
+def get_offer_cache_stats() -> dict[str, Any]:
+    """Shared offer cache hits for this process; each hit saved a merchant round trip."""
+    return OFFER_CACHE.stats()
+
+
+async def initiate_booking_async(
     flight_id: str,
     passenger_name: str,
+    merchant: str | None = None,
 ) -> dict[str, Any]:
     """
     Initiate a flight booking with the merchant.
@@ -270,13 +631,17 @@ def initiate_booking(
     Args:
         flight_id: The flight to book
         passenger_name: Name for the booking
+        merchant: Optional merchant selling the flight (from search_all_merchants)
 
     Returns:
         Payment mandate details requiring user authorization
     """
-    # Simulated merchant response (in real A2A, this calls the merchant agent)
-    # The merchant creates a payment mandate
+    if merchant and merchant in MERCHANT_CLIENTS:
+        return await _book_with_remote_merchant(MERCHANT_CLIENTS[merchant], flight_id, passenger_name)
+    if MERCHANT_CLIENT is not None:
+        return await _book_with_remote_merchant(MERCHANT_CLIENT, flight_id, passenger_name)
 
+    # Simulated merchant response: the merchant creates a payment mandate
     import uuid
     mandate_id = str(uuid.uuid4())[:8]
 
@@ -304,17 +669,117 @@ def initiate_booking(
     }
 
 
+def initiate_booking(
+    flight_id: str,
+    passenger_name: str,
+    merchant: str | None = None,
+) -> dict[str, Any]:
+    """Synchronous wrapper for initiate_booking_async."""
+    return run_sync(initiate_booking_async(flight_id, passenger_name, merchant))
+
+
+async def _book_with_remote_merchant(
+    client: A2AClient,
+    flight_id: str,
+    passenger_name: str,
+) -> dict[str, Any]:
+    """Have a merchant create a payment mandate over A2A."""
+    try:
+        # Not idempotent: a retried request could create a second mandate,
+        # so only connection failures are retried
+        response = await client.call_tool(
+            "create_booking_mandate",
+            {
+                "flight_id": flight_id,
+                "passenger_name": passenger_name,
+                "shopper_agent_id": "travel_shopper_agent",
+                "user_id": USER_SESSION["user_id"],
+            },
+            idempotent=False,
+        )
+    except A2AError as e:
+        return {
+            "status": "error",
+            "message": f"Merchant unavailable: {e}"
+        }
+
+    if not isinstance(response, dict):
+        return {
+            "status": "error",
+            "message": "Unreadable booking response from merchant"
+        }
+
+    if response.get("status") != "success":
+        return {
+            "status": "error",
+            "message": response.get("message", "Merchant could not create a mandate")
+        }
+
+    read = _read_mandate(response)
+    if read is None:
+        return {
+            "status": "error",
+            "message": "Unreadable payment mandate from merchant"
+        }
+
+    mandate, total = read
+    return {
+        "status": "mandate_created",
+        "message": "Merchant created payment mandate - user authorization required",
+        "mandate_id": mandate["mandate_id"],
+        "merchant": mandate["merchant"],
+        "booking_details": {
+            "flight_id": flight_id,
+            "passenger": passenger_name,
+        },
+        "payment": {
+            "total": mandate["total"],
+            "currency": total.currency,
+        },
+        "line_items": mandate["items"],
+        "expires_at": response.get("expires_at"),
+        "next_step": "Request user authorization using request_user_authorization tool",
+    }
+
+
+def _read_mandate(response: dict[str, Any]) -> tuple[dict[str, Any], Money] | None:
+    """
+    The mandate summary in a merchant's create_booking_mandate answer and
+    its parsed total, or None if the summary lacks a field the booking
+    relies on (mandate_id, merchant, a readable total, items as text).
+    """
+    mandate = response.get("mandate")
+    if not isinstance(mandate, dict):
+        return None
+    if not all(isinstance(mandate.get(name), str) for name in ("mandate_id", "merchant", "total")):
+        return None
+    items = mandate.get("items")
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        return None
+    try:
+        return mandate, Money.parse(mandate["total"])
+    except ValueError:
+        return None
+
+
 # ============================================================================
 # Create the Shopper Agent
 # ============================================================================
 
 # Define tools
 get_user_preferences_tool = FunctionTool(func=get_user_preferences)
-request_user_authorization_tool = FunctionTool(func=request_user_authorization)
-confirm_payment_tool = FunctionTool(func=confirm_payment)
+request_user_authorization_tool = FunctionTool(
+    func=async_tool(request_user_authorization_async, "request_user_authorization")
+)
+confirm_payment_tool = FunctionTool(func=async_tool(confirm_payment_async, "confirm_payment"))
 get_payment_methods_tool = FunctionTool(func=get_payment_methods)
-search_merchant_flights_tool = FunctionTool(func=search_merchant_flights)
-initiate_booking_tool = FunctionTool(func=initiate_booking)
+search_merchant_flights_tool = FunctionTool(
+    func=async_tool(search_merchant_flights_async, "search_merchant_flights")
+)
+initiate_booking_tool = FunctionTool(func=async_tool(initiate_booking_async, "initiate_booking"))
+search_all_merchants_tool = FunctionTool(
+    func=async_tool(search_all_merchants_async, "search_all_merchants")
+)
 
 # Create the agent
 shopper_agent = Agent(
@@ -327,9 +792,11 @@ shopper_agent = Agent(
 
     Your workflow for booking a flight:
 
-    1. SEARCH: When user wants to book travel, search for flights using search_merchant_flights
+    1. SEARCH: When user wants to book travel, search for flights using search_merchant_flights,
+       or search_all_merchants to compare offers from every merchant
     2. PRESENT: Show the user their options clearly with prices
     3. SELECT: When user chooses a flight, initiate the booking with initiate_booking
+       (pass the offer's merchant when it came from search_all_merchants)
     4. AUTHORIZE: Request user authorization for the payment using request_user_authorization
     5. CONFIRM: After user confirms, use confirm_payment to generate the authorization token
     6. COMPLETE: The authorization token is sent to merchant to complete the booking
@@ -344,6 +811,7 @@ shopper_agent = Agent(
     tools=[
         get_user_preferences_tool,
         search_merchant_flights_tool,
+        search_all_merchants_tool,
         initiate_booking_tool,
         request_user_authorization_tool,
         confirm_payment_tool,
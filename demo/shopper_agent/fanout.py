@@ -0,0 +1,149 @@
+"""
+Multi-Merchant Search
+
+Fans a flight search out to every known merchant at once and merges
+what comes back.
+
+Each merchant gets its own deadline; a merchant that is slow or down
+only drops its own offers, and the search returns whatever the others
+answered in time. Likewise a merchant whose answer cannot be read (not
+a search result, or offers missing the fields below) is reported as
+that merchant's error instead of failing the search. The same flight
+sold by several merchants is shown once, at the best price.
+"""
+
+import asyncio
+import logging
+import numbers
+import time
+from dataclasses import dataclass, field
+from typing import Any, Mapping
+
+from .a2a_client import A2AClient
+
+logger = logging.getLogger(__name__)
+
+# Fields every offer must carry to be merged and shown
+OFFER_FIELDS = ("flight_id", "airline", "origin", "destination", "departure", "arrival", "class", "price")
+
+
+@dataclass
+class MerchantSearch:
+    """One merchant's part of a fan-out search."""
+    merchant: str
+    status: str  # "ok", "timeout" or "error"
+    flights: list[dict[str, Any]] = field(default_factory=list)
+    elapsed: float = 0.0
+    error: str | None = None
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "merchant": self.merchant,
+            "status": self.status,
+            "offers": len(self.flights),
+            "elapsed_ms": round(self.elapsed * 1000, 1),
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+async def search_merchant(
+    merchant: str,
+    client: A2AClient,
+    arguments: dict[str, Any],
+    deadline: float,
+) -> MerchantSearch:
+    """Run search_flights on one merchant, giving up after deadline seconds."""
+    started = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(client.call_tool("search_flights", arguments), deadline)
+    except asyncio.TimeoutError:
+        return MerchantSearch(merchant, "timeout", elapsed=time.perf_counter() - started,
+                              error=f"No answer within {deadline:g}s")
+    except Exception as e:
+        # Any failure talking to one merchant only costs that merchant's offers
+        logger.warning("Search on merchant %s failed: %r", merchant, e)
+        return MerchantSearch(merchant, "error", elapsed=time.perf_counter() - started, error=str(e) or repr(e))
+
+    elapsed = time.perf_counter() - started
+    if not isinstance(response, dict):
+        logger.warning("Merchant %s answered the search with a %s", merchant, type(response).__name__)
+        return MerchantSearch(merchant, "error", elapsed=elapsed, error="Unreadable search response")
+    if response.get("status") != "success":
+        return MerchantSearch(merchant, "error", elapsed=elapsed,
+                              error=response.get("message", "Search failed"))
+
+    flights = response.get("flights", [])
+    if not isinstance(flights, list):
+        logger.warning("Merchant %s answered the search with flights of type %s", merchant, type(flights).__name__)
+        return MerchantSearch(merchant, "error", elapsed=elapsed, error="Unreadable search response")
+    offers = [flight for flight in flights if is_valid_offer(flight)]
+    if len(offers) < len(flights):
+        logger.warning("Dropped %d malformed offers from merchant %s", len(flights) - len(offers), merchant)
+    return MerchantSearch(merchant, "ok", offers, elapsed)
+
+
+def is_valid_offer(flight: Any) -> bool:
+    """Whether a merchant's flight record has every field merging and display rely on."""
+    if not isinstance(flight, dict) or any(name not in flight for name in OFFER_FIELDS):
+        return False
+    price = flight["price"]
+    return (
+        isinstance(price, numbers.Real) and not isinstance(price, bool)
+        and all(isinstance(flight[name], str) for name in OFFER_FIELDS if name != "price")
+    )
+
+
+async def fan_out_search(
+    clients: Mapping[str, A2AClient],
+    arguments: dict[str, Any],
+    deadline: float,
+) -> list[MerchantSearch]:
+    """Search every merchant concurrently. Never raises for a single merchant's failure."""
+    return list(await asyncio.gather(*(
+        search_merchant(merchant, client, arguments, deadline)
+        for merchant, client in clients.items()
+    )))
+
+
+def offer_key(flight: dict[str, Any]) -> tuple:
+    """
+    Identity of a flight across merchants.
+
+    Merchants assign their own flight_ids, so the same seat on the same
+    departure is recognised by carrier, route, time and cabin instead.
+    """
+    return (
+        flight["airline"],
+        flight["origin"].upper(),
+        flight["destination"].upper(),
+        flight["departure"],
+        flight["class"].lower(),
+    )
+
+
+def merge_offers(searches: list[MerchantSearch]) -> list[dict[str, Any]]:
+    """
+    De-duplicate offers from every merchant and rank them.
+
+    Each flight is kept once, from the merchant selling it cheapest, with
+    the other sellers listed in ``also_offered_by``. Offers are ranked by
+    price, then departure time.
+    """
+    best: dict[tuple, dict[str, Any]] = {}
+    sellers: dict[tuple, list[str]] = {}
+
+    for search in searches:
+        for flight in search.flights:
+            key = offer_key(flight)
+            sellers.setdefault(key, []).append(search.merchant)
+            current = best.get(key)
+            if current is None or flight["price"] < current["price"]:
+                best[key] = {**flight, "merchant": search.merchant}
+
+    merged = []
+    for key, offer in best.items():
+        offer["also_offered_by"] = [m for m in sellers[key] if m != offer["merchant"]]
+        merged.append(offer)
+
+    merged.sort(key=lambda offer: (offer["price"], offer["departure"]))
+    return merged
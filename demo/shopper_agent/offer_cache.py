@@ -0,0 +1,272 @@
+"""
+Offer Cache
+
+Keeps merchant search responses so that re-showing offers does not
+cost another merchant round trip.
+
+Two layers:
+    - Per session: the offers a conversation has already been shown,
+      kept in the ADK session state, so "show me those flights again"
+      answers with exactly the same list.
+    - Across sessions: an in-process LRU shared by every conversation,
+      with stale-while-revalidate. A fresh entry is served as is; a
+      stale one is served immediately while a single background refresh
+      fetches a new copy; only an expired or missing entry makes the
+      caller wait for the merchant.
+
+Background refreshes run on the cache's own long-lived event loop
+thread, never the caller's: a caller may be a sync wrapper whose
+private loop stops as soon as its call returns, which would strand the
+refresh. Every fetch is bounded by a timeout, and so is every wait on
+another caller's fetch.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, MutableMapping
+
+
+# Session state key holding a conversation's cached searches
+SESSION_STATE_KEY = "offer_cache"
+
+
+def query_key(tool: str, *args: Any) -> str:
+    """
+    Normalize a search into a cache key.
+
+    Airport codes are case-insensitive and empty filters count as none,
+    so equivalent searches share an entry. The key is a string so it can
+    live in session state.
+    """
+    parts = [tool]
+    for arg in args:
+        if arg is None or arg == "":
+            parts.append("")
+        elif isinstance(arg, str):
+            parts.append(arg.strip().upper())
+        else:
+            parts.append(str(arg))
+    return "|".join(parts)
+
+
+@dataclass
+class _Entry:
+    response: dict[str, Any]
+    fetched_at: float
+
+
+class OfferCache:
+    """
+    Cross-session cache of merchant responses with stale-while-revalidate.
+
+    Concurrent misses for the same search share one merchant call, even
+    when they come from different event loops.
+
+    Args:
+        fresh_for: Seconds an entry is served without a refresh
+        stale_for: Further seconds a stale entry may be served while it
+            is refreshed in the background
+        max_entries: Searches to keep (least recently used are evicted)
+        fetch_timeout: Seconds a merchant call, or a wait for another
+            caller's call, may take
+        clock: Time source (monotonic seconds)
+    """
+
+    def __init__(
+        self,
+        fresh_for: float = 60.0,
+        stale_for: float = 300.0,
+        max_entries: int = 512,
+        fetch_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self.max_entries = max_entries
+        self.fetch_timeout = fetch_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._fetching: dict[str, concurrent.futures.Future] = {}
+        # Runs background refreshes; started on the first one
+        self._refresh_loop: asyncio.AbstractEventLoop | None = None
+        # Background refreshes, kept referenced until they finish
+        self._refreshes: set[asyncio.Task] = set()
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def get(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> tuple[dict[str, Any], str]:
+        """
+        Return the response for key, calling fetch only when needed.
+
+        Only successful responses are cached. A stale entry's refresh
+        calls fetch on the cache's background loop, so fetch must not
+        depend on the caller's event loop.
+
+        Returns:
+            (response, how it was served: "fresh", "stale" or "miss")
+
+        Raises:
+            asyncio.TimeoutError: If the merchant call takes longer than
+                fetch_timeout
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            age = self._clock() - entry.fetched_at if entry else None
+            if entry is not None and age < self.fresh_for:
+                self._entries.move_to_end(key)
+                self.fresh_hits += 1
+                return entry.response, "fresh"
+            if entry is not None and age < self.fresh_for + self.stale_for:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                refresh = None
+                if key not in self._fetching:
+                    refresh = self._fetching[key] = concurrent.futures.Future()
+                    self.refreshes += 1
+            else:
+                entry = None
+                self.misses += 1
+                waiting = self._fetching.get(key)
+                if waiting is None:
+                    future = self._fetching[key] = concurrent.futures.Future()
+
+        if entry is not None:
+            if refresh is not None:
+                self._start_refresh(key, refresh, fetch)
+            return entry.response, "stale"
+
+        if waiting is not None:
+            try:
+                # Shielded: giving up must not cancel the fetch for others
+                response = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(waiting)), self.fetch_timeout)
+                return response, "miss"
+            except asyncio.TimeoutError:
+                pass
+            # The fetch being shared is stuck; stop sharing it and call the merchant
+            with self._lock:
+                future = concurrent.futures.Future()
+                if self._fetching.get(key) is waiting:
+                    self._fetching[key] = future
+        return await self._fetch(key, future, fetch), "miss"
+
+    async def _fetch(
+        self,
+        key: str,
+        future: concurrent.futures.Future,
+        fetch: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        """Call the merchant, store a successful answer and wake any waiters."""
+        try:
+            response = await asyncio.wait_for(fetch(), self.fetch_timeout)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            with self._lock:
+                if response.get("status") == "success":
+                    self._entries[key] = _Entry(response, self._clock())
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            future.set_result(response)
+            return response
+        finally:
+            with self._lock:
+                if self._fetching.get(key) is future:
+                    del self._fetching[key]
+
+    def _start_refresh(
+        self,
+        key: str,
+        future: concurrent.futures.Future,
+        fetch: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> None:
+        """Refresh key on the background loop, starting the loop if needed."""
+        with self._lock:
+            loop = self._refresh_loop
+            if loop is None:
+                loop = self._refresh_loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="offer-cache-refresh", daemon=True).start()
+
+        def start() -> None:
+            task = loop.create_task(self._revalidate(key, future, fetch))
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+
+        loop.call_soon_threadsafe(start)
+
+    async def _revalidate(
+        self,
+        key: str,
+        future: concurrent.futures.Future,
+        fetch: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> None:
+        try:
+            await self._fetch(key, future, fetch)
+        except Exception:
+            # The stale entry keeps being served until the next refresh succeeds
+            pass
+
+    def invalidate(self, key: str | None = None) -> None:
+        """Forget one search, or every search when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict[str, Any]:
+        """Hit counts; every hit is a merchant round trip saved."""
+        with self._lock:
+            lookups = self.fresh_hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "fresh_hits": self.fresh_hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "hit_rate": round((self.fresh_hits + self.stale_hits) / lookups, 4) if lookups else None,
+            }
+
+
+def session_lookup(
+    state: MutableMapping[str, Any],
+    key: str,
+    max_age: float,
+) -> dict[str, Any] | None:
+    """Return the response this session was already shown for key, if recent enough."""
+    entry = (state.get(SESSION_STATE_KEY) or {}).get(key)
+    if entry is None or time.time() - entry["cached_at"] >= max_age:
+        return None
+    return entry["response"]
+
+
+def session_store(
+    state: MutableMapping[str, Any],
+    key: str,
+    response: dict[str, Any],
+    max_entries: int = 8,
+) -> None:
+    """
+    Remember the response shown to this session for key.
+
+    Only the most recent max_entries searches are kept. The mapping is
+    replaced rather than edited in place so ADK records the change.
+    """
+    cached = dict(state.get(SESSION_STATE_KEY) or {})
+    cached.pop(key, None)
+    cached[key] = {"cached_at": time.time(), "response": response}
+    while len(cached) > max_entries:
+        del cached[next(iter(cached))]
+    state[SESSION_STATE_KEY] = cached
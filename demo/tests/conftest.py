@@ -0,0 +1,82 @@
+"""
+Shared fixtures.
+
+The merchant agent reads its configuration from the environment when
+it is imported, so the tests pin it to the in-memory store, with no
+demo keys accepted, before anything imports it.
+"""
+
+import os
+import random
+import sys
+import uuid
+
+import pytest
+
+# Add the demo directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+for name in ("MERCHANT_STORE_PATH", "MERCHANT_JOURNAL_PATH", "MERCHANT_TRUSTED_KEYS", "MERCHANT_ALLOW_DEMO_KEYS"):
+    os.environ.pop(name, None)
+
+from shared.authorization import AuthorizationSigner  # noqa: E402
+
+
+@pytest.fixture
+def schedule():
+    """Build n random flights (seeded), spread over a few routes, days, classes and prices."""
+
+    def build(n: int, seed: int = 0, prices: tuple[float, ...] | None = None) -> list[dict]:
+        rng = random.Random(seed)
+        flights = []
+        for i in range(n):
+            day = f"2025-{rng.randint(3, 4):02d}-{rng.randint(1, 28):02d}"
+            hour = rng.randint(0, 20)
+            flights.append({
+                "flight_id": f"FL{i:05d}",
+                "airline": rng.choice(["SkyHigh Airlines", "Premium Air", "Budget Wings"]),
+                "origin": rng.choice(["SFO", "LAX"]),
+                "destination": rng.choice(["CDG", "LHR"]),
+                "departure": f"{day} {hour:02d}:00",
+                "arrival": f"{day} {hour + rng.randint(1, 3):02d}:30",
+                "price": rng.choice(prices) if prices else float(rng.randint(300, 2000)),
+                "class": rng.choice(["economy", "business", "first"]),
+                "seats_available": rng.randint(0, 9),
+            })
+        return flights
+
+    return build
+
+
+@pytest.fixture
+def merchant():
+    """The merchant agent module, with its processor restored after the test."""
+    from merchant_agent import agent
+
+    processor = agent.PAYMENT_PROCESSOR
+    yield agent
+    agent.PAYMENT_PROCESSOR = processor
+
+
+@pytest.fixture
+def user(merchant):
+    """A fresh user whose device key the merchant trusts."""
+    user_id = f"user_{uuid.uuid4().hex[:8]}"
+    signer = AuthorizationSigner.from_seed(os.urandom(32))
+    merchant.AUTHORIZATION_VERIFIER.trust(user_id, signer.public_key_hex)
+    return user_id, signer
+
+
+@pytest.fixture
+def booking(merchant, user):
+    """Create a mandate for user (on FL004 by default); returns (mandate_id, authorization_token)."""
+    user_id, signer = user
+
+    def create(flight_id: str = "FL004") -> tuple[str, str]:
+        created = merchant.create_booking_mandate(flight_id, "Test Passenger", "test_shopper", user_id)
+        assert created["status"] == "success", created
+        mandate_id = created["mandate_id"]
+        digest = merchant._authorization_digest(merchant.MANDATE_STORE.get_mandate(mandate_id))
+        return mandate_id, signer.sign(digest)
+
+    return create
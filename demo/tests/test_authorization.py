@@ -0,0 +1,123 @@
+"""Authorization tokens: only the user's own key, over the exact mandate, recently."""
+
+import os
+
+import pytest
+
+from shared.authorization import (
+    AuthorizationSigner,
+    InvalidAuthorizationToken,
+    TokenVerifier,
+    mandate_digest,
+)
+from shared.money import Money
+
+NOW = 1_750_000_000
+
+
+def digest(amount_minor: int = 95200, mandate_id: str = "MND-1", user_id: str = "alice") -> bytes:
+    return mandate_digest(mandate_id, user_id, "flight_merchant_agent", Money(amount_minor, "USD"))
+
+
+@pytest.fixture
+def alice() -> AuthorizationSigner:
+    return AuthorizationSigner.from_seed(os.urandom(32))
+
+
+@pytest.fixture
+def verifier(alice) -> TokenVerifier:
+    return TokenVerifier({"alice": [alice.public_key_hex]}, max_age=900, clock=lambda: NOW)
+
+
+def test_accepts_the_users_signature(verifier, alice):
+    verifier.verify(alice.sign(digest(), issued_at=NOW), digest(), "alice")
+
+
+@pytest.mark.parametrize("other", [
+    digest(amount_minor=1),         # a different amount
+    digest(mandate_id="MND-2"),     # a different mandate
+    digest(user_id="mallory"),      # a different user's terms
+])
+def test_rejects_a_token_for_other_terms(verifier, alice, other):
+    with pytest.raises(InvalidAuthorizationToken, match="does not match"):
+        verifier.verify(alice.sign(other, issued_at=NOW), digest(), "alice")
+
+
+def test_rejects_an_untrusted_key(verifier):
+    mallory = AuthorizationSigner.from_seed(os.urandom(32))
+    with pytest.raises(InvalidAuthorizationToken, match="not signed by a key trusted"):
+        verifier.verify(mallory.sign(digest(), issued_at=NOW), digest(), "alice")
+
+
+def test_rejects_another_users_token(verifier, alice):
+    with pytest.raises(InvalidAuthorizationToken):
+        verifier.verify(alice.sign(digest(user_id="bob"), issued_at=NOW), digest(user_id="bob"), "bob")
+
+
+@pytest.mark.parametrize("token", ["", "ap2v1", "ap2v1.key.now.sig", f"ap2v1.key.{NOW}.!!!", f"v0.key.{NOW}.AAAA"])
+def test_rejects_malformed_tokens(verifier, token):
+    with pytest.raises(InvalidAuthorizationToken, match="malformed"):
+        verifier.verify(token, digest(), "alice")
+
+
+def test_rejects_a_tampered_signature(verifier, alice):
+    token = alice.sign(digest(), issued_at=NOW)
+    header, signature = token.rsplit(".", 1)
+    forged = header + "." + ("A" if signature[0] != "A" else "B") + signature[1:]
+    with pytest.raises(InvalidAuthorizationToken):
+        verifier.verify(forged, digest(), "alice")
+
+
+def test_demo_keys_need_an_opt_in():
+    demo = AuthorizationSigner.for_demo_user("alice")
+    token = demo.sign(digest(), issued_at=NOW)
+
+    with pytest.raises(InvalidAuthorizationToken):
+        TokenVerifier().verify(token, digest(), "alice")
+    TokenVerifier(demo_keys=True).verify(token, digest(), "alice")
+
+
+def test_rejects_old_and_future_tokens(verifier, alice):
+    with pytest.raises(InvalidAuthorizationToken, match="expired"):
+        verifier.verify(alice.sign(digest(), issued_at=NOW - 901), digest(), "alice")
+    with pytest.raises(InvalidAuthorizationToken, match="future"):
+        verifier.verify(alice.sign(digest(), issued_at=NOW + 3600), digest(), "alice")
+
+
+def test_cached_verdict_does_not_outlive_max_age(alice):
+    now = [NOW]
+    verifier = TokenVerifier({"alice": [alice.public_key_hex]}, max_age=900, clock=lambda: now[0])
+    token = alice.sign(digest(), issued_at=NOW)
+    verifier.verify(token, digest(), "alice")
+
+    now[0] += 901
+    with pytest.raises(InvalidAuthorizationToken, match="expired"):
+        verifier.verify(token, digest(), "alice")
+
+
+def test_batch_verifies_each_distinct_check_once(verifier, alice):
+    good = (alice.sign(digest(), issued_at=NOW), digest(), "alice")
+    other = (alice.sign(digest(mandate_id="MND-2"), issued_at=NOW), digest(mandate_id="MND-2"), "alice")
+    forged = (good[0], digest(amount_minor=1), "alice")
+
+    verdicts = verifier.verify_many([good, forged, good, other, ("", digest(), "alice")])
+
+    assert verdicts == [None, "signature does not match the mandate", None, None, "malformed authorization token"]
+    assert verifier.misses == 4
+    # Verdicts, rejections included, are cached
+    assert verifier.verify_many([forged, other]) == ["signature does not match the mandate", None]
+    assert verifier.hits == 2
+    assert verifier.stats()["verified"] == 4 and verifier.stats()["rejected"] == 3
+
+
+def test_merchant_rejects_forged_payment(merchant, booking):
+    mandate_id, _ = booking()
+    mallory = AuthorizationSigner.for_demo_user("mallory")
+    forged = mallory.sign(merchant._authorization_digest(merchant.MANDATE_STORE.get_mandate(mandate_id)))
+
+    result = merchant.process_authorized_payment(mandate_id, forged)
+
+    assert result["status"] == "error"
+    assert "Authorization rejected" in result["message"]
+    # The mandate stays payable with the real token
+    assert merchant.MANDATE_STORE.get_mandate(mandate_id).status.value == "pending"
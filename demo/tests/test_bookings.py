@@ -0,0 +1,65 @@
+"""Batch mandate creation: items succeed or fail on their own, one hold each."""
+
+
+def cancel_all(merchant, created: dict) -> None:
+    for result in created["results"]:
+        if result["status"] == "success":
+            merchant.cancel_booking_mandate(result["mandate_id"])
+
+
+def test_batch_reports_each_item_in_request_order(merchant, user):
+    user_id, _ = user
+    seats = merchant.SEAT_INVENTORY.available("FL004")
+
+    created = merchant.create_booking_mandates(
+        [
+            {"flight_id": "FL004", "passenger_name": "Ada"},
+            {"flight_id": "FL999", "passenger_name": "Grace"},
+            {"flight_id": "FL004"},
+            {"flight_id": "FL004", "passenger_name": "Alan"},
+        ],
+        "test_shopper",
+        user_id,
+    )
+
+    assert created["status"] == "partial"
+    assert (created["created"], created["failed"]) == (2, 2)
+    assert [result["status"] for result in created["results"]] == ["success", "error", "error", "success"]
+    assert "FL999 not found" in created["results"][1]["message"]
+    assert merchant.SEAT_INVENTORY.available("FL004") == seats - 2
+
+    for result in (created["results"][0], created["results"][3]):
+        mandate = merchant.MANDATE_STORE.get_mandate(result["mandate_id"])
+        assert mandate.user_id == user_id and mandate.merchant_reference == "FL004"
+        assert merchant.SEAT_INVENTORY.get_hold(mandate.mandate_id).seats == 1
+        assert result["mandate"]["total"] == str(mandate.total_amount)
+
+    cancel_all(merchant, created)
+    assert merchant.SEAT_INVENTORY.available("FL004") == seats
+
+
+def test_only_the_items_past_the_last_seat_fail(merchant, user):
+    user_id, _ = user
+    seats = merchant.SEAT_INVENTORY.available("FL003")
+
+    created = merchant.create_booking_mandates(
+        [{"flight_id": "FL003", "passenger_name": f"Passenger {i}"} for i in range(seats + 2)],
+        "test_shopper",
+        user_id,
+    )
+
+    assert (created["created"], created["failed"]) == (seats, 2)
+    assert [result["status"] for result in created["results"][seats:]] == ["error", "error"]
+    assert merchant.SEAT_INVENTORY.available("FL003") == 0
+
+    cancel_all(merchant, created)
+    assert merchant.SEAT_INVENTORY.available("FL003") == seats
+
+
+def test_a_batch_with_nothing_bookable_is_an_error(merchant, user):
+    user_id, _ = user
+
+    created = merchant.create_booking_mandates([{"flight_id": "FL999", "passenger_name": "Ada"}], "test_shopper", user_id)
+
+    assert created["status"] == "error"
+    assert (created["created"], created["failed"]) == (0, 1)
@@ -0,0 +1,70 @@
+"""Flight catalog: lookups by id, and search indexes kept in step with every change."""
+
+import pytest
+
+from merchant_agent.catalog import FlightCatalog
+
+
+def ids(flights):
+    return sorted(flight["flight_id"] for flight in flights)
+
+
+def test_lookups_return_the_stored_flight(schedule):
+    flights = schedule(500)
+    catalog = FlightCatalog(flights)
+
+    assert len(catalog) == 500
+    assert catalog["FL00042"] is flights[42]
+    assert catalog.get("FL00042") is flights[42]
+    assert "FL00499" in catalog
+    assert catalog.get("FL99999") is None
+    with pytest.raises(KeyError):
+        catalog["FL99999"]
+
+
+def test_update_of_an_indexed_field_reindexes(schedule):
+    catalog = FlightCatalog(schedule(1))
+    flight = catalog["FL00000"]
+    catalog.update("FL00000", origin="SFO", destination="CDG", seats_available=5, price=700.0)
+
+    catalog.update("FL00000", origin="JFK", price=400.0)
+
+    assert catalog.search("SFO", "CDG") == []
+    assert catalog.search("JFK", "CDG", max_price=450) == [flight]
+    assert flight["price"] == 400.0
+
+
+def test_update_of_other_fields_is_in_place(schedule):
+    catalog = FlightCatalog(schedule(1))
+    flight = catalog["FL00000"]
+
+    catalog.update("FL00000", airline="Other Air", seats_available=3)
+
+    assert catalog["FL00000"] is flight
+    assert flight["airline"] == "Other Air"
+
+
+def test_removed_flight_is_gone_from_lookups_and_searches(schedule):
+    flights = schedule(50)
+    catalog = FlightCatalog(flights)
+    flight = flights[7]
+
+    assert catalog.remove(flight["flight_id"]) is flight
+
+    assert flight["flight_id"] not in catalog
+    assert flight["flight_id"] not in ids(catalog.search(flight["origin"], flight["destination"]))
+    with pytest.raises(KeyError):
+        catalog.remove(flight["flight_id"])
+
+
+def test_merchant_tools_share_the_catalog(merchant, user):
+    user_id, _ = user
+
+    details = merchant.get_flight_details("FL002")
+    created = merchant.create_booking_mandate("FL002", "Test Passenger", "test_shopper", user_id)
+
+    assert details["flight"] is merchant.FLIGHT_CATALOG["FL002"]
+    assert created["status"] == "success"
+    assert merchant.MANDATE_STORE.get_mandate(created["mandate_id"]).merchant_reference == "FL002"
+    assert merchant.get_flight_details("FL999")["status"] == "error"
+    assert merchant.create_booking_mandate("FL999", "Test Passenger", "test_shopper", user_id)["status"] == "error"
@@ -0,0 +1,55 @@
+"""Columnar catalog: vectorized searches agree with the indexed catalog."""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from merchant_agent.catalog import FlightCatalog  # noqa: E402
+from merchant_agent.columnar import ColumnarFlightCatalog  # noqa: E402
+
+QUERIES = [
+    {"origin": "SFO", "destination": "CDG"},
+    {"origin": "sfo", "destination": "cdg", "date": "2025-03-14"},
+    {"origin": "SFO", "destination": "LHR", "date": "2025-04"},
+    {"origin": "LAX", "destination": "LHR", "date": "2025-03-1"},
+    {"origin": "LAX", "destination": "CDG", "travel_class": "FIRST", "max_price": 1500},
+    {"origin": "SFO", "destination": "JFK"},
+    {"origin": "SFO", "destination": "CDG", "travel_class": "premium"},
+]
+
+
+def ids(flights):
+    return sorted(flight["flight_id"] for flight in flights)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_agrees_with_the_indexed_catalog(schedule, query):
+    flights = schedule(3000)
+    # More rows than the initial column capacity, so the columns grow
+    columnar = ColumnarFlightCatalog(flights)
+
+    assert ids(columnar.search(**query)) == ids(FlightCatalog(flights).search(**query))
+
+
+def test_rows_round_trip(schedule):
+    flights = schedule(20)
+    columnar = ColumnarFlightCatalog(flights)
+
+    for flight in flights:
+        assert columnar[flight["flight_id"]] == flight
+
+
+def test_update_and_remove(schedule):
+    flights = schedule(20)
+    columnar = ColumnarFlightCatalog(flights)
+    flight_id = flights[3]["flight_id"]
+
+    updated = columnar.update(flight_id, seats_available=0)
+    removed = columnar.remove(flights[4]["flight_id"])
+
+    assert updated["seats_available"] == 0
+    assert columnar.get(flight_id)["seats_available"] == 0
+    assert removed == flights[4] and flights[4]["flight_id"] not in columnar
+    found = ids(columnar.search(flights[3]["origin"], flights[3]["destination"]))
+    assert flight_id not in found and flights[4]["flight_id"] not in found
+    assert len(columnar) == 19
@@ -0,0 +1,73 @@
+"""Mandate expiry: abandoned mandates give their seats back, and only due ones are touched."""
+
+from datetime import datetime, timedelta
+
+from shared.expiry import ExpiryQueue
+
+
+def test_pop_due_returns_only_due_keys_in_deadline_order():
+    now = [0.0]
+    queue = ExpiryQueue(clock=lambda: now[0])
+    queue.schedule("late", 30)
+    queue.schedule("early", 10)
+    queue.schedule_in("middle", 20)
+
+    now[0] = 25
+    assert queue.pop_due() == ["early", "middle"]
+    assert "late" in queue and len(queue) == 1
+
+
+def test_cancelled_and_rescheduled_keys_are_skipped():
+    now = [0.0]
+    queue = ExpiryQueue(clock=lambda: now[0])
+    for i in range(200):
+        queue.schedule(i, 10)
+    for i in range(150):
+        queue.cancel(i)
+    queue.schedule(199, 50)
+
+    now[0] = 20
+    assert queue.pop_due() == list(range(150, 199))
+    now[0] = 60
+    assert queue.pop_due() == [199]
+    assert len(queue) == 0
+
+
+def lapse(merchant, mandate_id: str) -> None:
+    """Move a pending mandate past its TTL."""
+    mandate = merchant.MANDATE_STORE.get_mandate(mandate_id)
+    mandate.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    merchant.MANDATE_STORE.save_mandate(mandate)
+    merchant.MANDATE_EXPIRY.schedule(mandate_id, merchant.MANDATE_EXPIRY.now())
+
+
+def test_expired_mandate_releases_its_seat_and_is_evicted(merchant, booking):
+    seats = merchant.SEAT_INVENTORY.available("FL004")
+    mandate_id, token = booking()
+    lapse(merchant, mandate_id)
+
+    assert mandate_id in merchant.expire_stale_mandates()
+
+    assert merchant.SEAT_INVENTORY.available("FL004") == seats
+    assert merchant.MANDATE_STORE.get_mandate(mandate_id) is None
+    assert merchant.process_authorized_payment(mandate_id, token)["status"] == "error"
+
+
+def test_paying_a_lapsed_mandate_expires_it_on_the_spot(merchant, booking):
+    seats = merchant.SEAT_INVENTORY.available("FL004")
+    mandate_id, token = booking()
+    mandate = merchant.MANDATE_STORE.get_mandate(mandate_id)
+    mandate.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    merchant.MANDATE_STORE.save_mandate(mandate)
+
+    result = merchant.process_authorized_payment(mandate_id, token)
+
+    assert result["status"] == "error" and "expired" in result["message"]
+    assert merchant.SEAT_INVENTORY.available("FL004") == seats
+
+
+def test_sweep_leaves_live_mandates_alone(merchant, booking):
+    mandate_id, _ = booking()
+
+    assert mandate_id not in merchant.expire_stale_mandates()
+    assert merchant.MANDATE_STORE.get_mandate(mandate_id).status.value == "pending"
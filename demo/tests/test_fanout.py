@@ -0,0 +1,84 @@
+"""Multi-merchant search: one merchant's failure only costs its own offers."""
+
+import asyncio
+
+from shopper_agent.fanout import MerchantSearch, fan_out_search, is_valid_offer, merge_offers
+
+
+def offer(flight_id: str = "FL001", price: float = 850.0, **changes) -> dict:
+    return {
+        "flight_id": flight_id,
+        "airline": "SkyHigh Airlines",
+        "origin": "SFO",
+        "destination": "CDG",
+        "departure": "2025-03-15 10:00",
+        "arrival": "2025-03-16 06:00",
+        "class": "economy",
+        "price": price,
+        **changes,
+    }
+
+
+class FakeClient:
+    """Answers search_flights after delay seconds, with reply (raised if an exception)."""
+
+    def __init__(self, reply, delay: float = 0.0):
+        self.reply = reply
+        self.delay = delay
+
+    async def call_tool(self, name, arguments, idempotent=True):
+        await asyncio.sleep(self.delay)
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply
+
+
+def search(clients: dict, deadline: float = 1.0) -> dict[str, MerchantSearch]:
+    searches = asyncio.run(fan_out_search(clients, {"origin": "SFO", "destination": "CDG"}, deadline))
+    return {result.merchant: result for result in searches}
+
+
+def test_each_merchant_fails_on_its_own():
+    searches = search({
+        "good": FakeClient({"status": "success", "flights": [offer()]}),
+        "slow": FakeClient({"status": "success", "flights": [offer()]}, delay=5),
+        "down": FakeClient(ConnectionError("refused")),
+        "refuses": FakeClient({"status": "error", "message": "Unknown route"}),
+        "garbled": FakeClient(["not", "a", "search"]),
+        "bad_flights": FakeClient({"status": "success", "flights": "FL001"}),
+    }, deadline=0.2)
+
+    assert {name: result.status for name, result in searches.items()} == {
+        "good": "ok",
+        "slow": "timeout",
+        "down": "error",
+        "refuses": "error",
+        "garbled": "error",
+        "bad_flights": "error",
+    }
+    assert searches["good"].flights == [offer()]
+    assert searches["refuses"].error == "Unknown route"
+    assert searches["slow"].elapsed < 1
+
+
+def test_malformed_offers_are_dropped():
+    flights = [offer(), offer(price="cheap"), offer(price=True), {"flight_id": "FL002"}, None, offer(airline=None)]
+
+    searches = search({"merchant": FakeClient({"status": "success", "flights": flights})})
+
+    assert searches["merchant"].flights == [offer()]
+    assert [is_valid_offer(flight) for flight in flights] == [True, False, False, False, False, False]
+
+
+def test_same_flight_is_shown_once_at_the_best_price():
+    searches = [
+        MerchantSearch("a", "ok", [offer("A1", 900.0), offer("A2", 400.0, departure="2025-03-15 18:00")]),
+        MerchantSearch("b", "ok", [offer("B1", 850.0, origin="sfo", **{"class": "Economy"})]),
+        MerchantSearch("c", "ok", [offer("C1", 870.0)]),
+    ]
+
+    merged = merge_offers(searches)
+
+    assert [(flight["flight_id"], flight["merchant"]) for flight in merged] == [("A2", "a"), ("B1", "b")]
+    assert merged[0]["also_offered_by"] == []
+    assert merged[1]["also_offered_by"] == ["a", "c"]
@@ -0,0 +1,84 @@
+"""Flight inventory: indexed searches return exactly what a full scan would."""
+
+import pytest
+
+from merchant_agent.inventory import FlightInventory
+
+
+def scan(flights, origin, destination, date=None, travel_class=None, max_price=None):
+    """The search the indexes replace: test every flight."""
+    return [
+        flight for flight in flights
+        if flight["origin"] == origin.upper()
+        and flight["destination"] == destination.upper()
+        and (not date or flight["departure"].startswith(date))
+        and (not travel_class or flight["class"] == travel_class.lower())
+        and (not max_price or flight["price"] <= max_price)
+        and flight["seats_available"] > 0
+    ]
+
+
+def ids(flights):
+    return sorted(flight["flight_id"] for flight in flights)
+
+
+@pytest.mark.parametrize("query", [
+    {"origin": "SFO", "destination": "CDG"},
+    {"origin": "sfo", "destination": "cdg", "date": "2025-03-14"},
+    {"origin": "SFO", "destination": "LHR", "date": "2025-04"},
+    {"origin": "LAX", "destination": "CDG", "date": "2025"},
+    {"origin": "LAX", "destination": "LHR", "date": "2025-03-1"},
+    {"origin": "SFO", "destination": "CDG", "travel_class": "Business"},
+    {"origin": "SFO", "destination": "CDG", "max_price": 900},
+    {"origin": "LAX", "destination": "LHR", "date": "2025-03", "travel_class": "economy", "max_price": 1200},
+    {"origin": "SFO", "destination": "JFK"},
+])
+def test_search_matches_a_full_scan(schedule, query):
+    flights = schedule(2000)
+    inventory = FlightInventory(flights)
+
+    assert ids(inventory.search(**query)) == ids(scan(flights, **query))
+    assert ids(inventory.iter_search(**query)) == ids(scan(flights, **query))
+
+
+def test_max_price_is_inclusive(schedule):
+    flights = schedule(200, prices=(500.0, 900.0, 1400.0))
+    inventory = FlightInventory(flights)
+
+    found = inventory.search("SFO", "CDG", max_price=900)
+
+    assert {flight["price"] for flight in found} <= {500.0, 900.0}
+    assert ids(found) == ids(scan(flights, "SFO", "CDG", max_price=900))
+
+
+def test_removed_flights_leave_every_index(schedule):
+    flights = schedule(300)
+    inventory = FlightInventory(flights)
+    removed = {flight["flight_id"] for flight in flights[::3]}
+
+    for flight_id in removed:
+        inventory.remove(flight_id)
+
+    kept = [flight for flight in flights if flight["flight_id"] not in removed]
+    assert len(inventory) == len(kept)
+    for query in ({"origin": "SFO", "destination": "CDG"}, {"origin": "LAX", "destination": "LHR", "travel_class": "first"}):
+        assert ids(inventory.search(**query)) == ids(scan(kept, **query))
+
+
+def test_sold_out_flights_are_skipped_without_reindexing(schedule):
+    flights = schedule(100)
+    inventory = FlightInventory(flights)
+
+    # Seat counts are read from the stored dicts at search time
+    for flight in flights:
+        flight["seats_available"] = 0
+
+    assert inventory.search("SFO", "CDG") == []
+
+
+def test_duplicate_flight_id_is_rejected(schedule):
+    flights = schedule(1)
+    inventory = FlightInventory(flights)
+
+    with pytest.raises(ValueError):
+        inventory.add(dict(flights[0]))
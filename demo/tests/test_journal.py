@@ -0,0 +1,80 @@
+"""Event journal: committed events replay in order, and a torn commit is dropped whole."""
+
+import os
+
+import pytest
+
+from merchant_agent.journal import EventKind, EventLog, JournalError, read_events
+
+
+def events(path: str) -> list[tuple[int, bytes, bytes]]:
+    """Replay path, dropping the timestamps."""
+    log = EventLog(path, fsync=False)
+    replayed = [(kind, key, body) for _, kind, key, body in log.replay()]
+    log.close()
+    return replayed
+
+
+def test_commits_replay_in_order(tmp_path):
+    path = str(tmp_path / "merchant.journal")
+    log = EventLog(path, fsync=False)
+    log.append(EventKind.MANDATE, "m1", b"created")
+    sequence = log.append(EventKind.TRANSITION, "m1", b"authorized")
+    log.commit(sequence)
+    log.append(EventKind.EVICT, "m1")
+    log.close()
+
+    assert log.commits == 2
+    assert sequence == 2
+    assert events(path) == [
+        (EventKind.MANDATE, b"m1", b"created"),
+        (EventKind.TRANSITION, b"m1", b"authorized"),
+        (EventKind.EVICT, b"m1", b""),
+    ]
+
+
+@pytest.mark.parametrize("damage", ["truncate", "corrupt"])
+def test_torn_commit_is_dropped_and_appends_follow_the_last_good_one(tmp_path, damage):
+    path = str(tmp_path / "merchant.journal")
+    log = EventLog(path, fsync=False)
+    log.append(EventKind.MANDATE, "m1", b"created")
+    log.commit()
+    good = log.size()
+    log.append(EventKind.TRANSITION, "m1", b"authorized")
+    log.append(EventKind.TRANSITION, "m1", b"completed")
+    log.close()
+    with open(path, "r+b") as file:
+        if damage == "truncate":
+            file.truncate(os.path.getsize(path) - 3)
+        else:
+            file.seek(-1, os.SEEK_END)
+            file.write(b"!")
+
+    log = EventLog(path, fsync=False)
+    assert [key for _, _, key, _ in log.replay()] == [b"m1"]
+    assert os.path.getsize(path) == log.size() == good
+    log.append(EventKind.MANDATE, "m2", b"created")
+    log.close()
+
+    assert [key for _, key, _ in events(path)] == [b"m1", b"m2"]
+
+
+def test_rotate_archives_the_log(tmp_path):
+    path = str(tmp_path / "merchant.journal")
+    log = EventLog(path, fsync=False)
+    log.append(EventKind.MANDATE, "m1", b"created")
+    log.rotate(path + ".1")
+    assert log.append(EventKind.MANDATE, "m2", b"created") == 2
+    log.close()
+
+    assert [key for _, _, key, _ in read_events(path + ".1")] == [b"m1"]
+    assert [key for _, key, _ in events(path)] == [b"m2"]
+
+
+def test_log_is_replayed_once(tmp_path):
+    log = EventLog(str(tmp_path / "merchant.journal"), fsync=False)
+    log.append(EventKind.MANDATE, "m1", b"created")
+
+    with pytest.raises(JournalError):
+        list(log.replay())
+    log.close()
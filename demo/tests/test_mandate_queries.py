@@ -0,0 +1,42 @@
+"""Support queries: mandates and bookings looked up by user, status and flight."""
+
+
+def test_find_mandates_by_user_and_status(merchant, user, booking):
+    user_id, _ = user
+    paid = booking()
+    pending = booking("FL002")
+    merchant.process_authorized_payment(*paid)
+
+    found = merchant.find_mandates(user_id=user_id)
+    assert found["status"] == "success" and found["total"] == 2
+    assert [mandate["mandate_id"] for mandate in found["mandates"]] == [pending[0], paid[0]]
+    assert found["mandates"][0]["user_id"] == user_id
+    assert found["mandates"][0]["flight_id"] == "FL002"
+
+    completed = merchant.find_mandates(user_id=user_id, status="COMPLETED", limit=1)
+    assert completed["total"] == 1
+    assert [mandate["mandate_id"] for mandate in completed["mandates"]] == [paid[0]]
+
+
+def test_unknown_status_is_an_error(merchant):
+    result = merchant.find_mandates(status="settled")
+
+    assert result["status"] == "error"
+    assert "pending" in result["message"]
+
+
+def test_find_bookings_and_counts(merchant, user, booking):
+    user_id, _ = user
+    paid = booking()
+    booking("FL002")
+    merchant.process_authorized_payment(*paid)
+
+    bookings = merchant.find_bookings(user_id=user_id)
+    assert bookings["count"] == 1
+    assert bookings["bookings"][0]["mandate_id"] == paid[0]
+    assert bookings["bookings"][0]["user_id"] == user_id
+    assert merchant.find_bookings(user_id=user_id, flight_id="FL002")["count"] == 0
+
+    counts = merchant.count_mandates_by_status(user_id=user_id)
+    assert counts["completed"] == 1 and counts["pending"] == 1
+    assert sum(counts.values()) == 2
@@ -0,0 +1,93 @@
+"""PaymentMandate: the trusted construction path builds the same mandates as validation."""
+
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from shared.ap2_types import LineItem, PaymentMandate, PaymentStatus
+
+
+def build(constructor, item):
+    return constructor(
+        mandate_id="MND-1",
+        shopper_agent_id="test_shopper",
+        merchant_agent_id="flight_merchant_agent",
+        user_id="alice",
+        line_items=[item(description="Flight FL001: SFO → CDG", unit_price=850.00),
+                    item(description="Taxes and fees", unit_price=102.00)],
+        created_at=datetime(2025, 3, 1),
+        merchant_reference="FL001",
+        description="Flight booking",
+    )
+
+
+def test_trusted_mandate_equals_validated():
+    trusted = build(PaymentMandate.trusted, LineItem.trusted)
+    validated = build(PaymentMandate, LineItem)
+
+    assert trusted == validated
+    assert trusted.model_dump() == validated.model_dump()
+    assert trusted.to_summary() == validated.to_summary()
+    assert str(trusted.total_amount) == "USD 952.00"
+
+
+def test_trusted_line_items_are_shared():
+    first = LineItem.trusted(description="Taxes and fees", unit_price=102.00)
+
+    assert LineItem.trusted(description="Taxes and fees", unit_price=102.00) is first
+    assert LineItem.trusted(description="Taxes and fees", unit_price=103.00) is not first
+
+
+def test_trusted_mandates_are_independent():
+    first = PaymentMandate.trusted(
+        shopper_agent_id="s", merchant_agent_id="m", user_id="u",
+        line_items=[LineItem.trusted(description="Fare", unit_price=10)],
+    )
+    second = PaymentMandate.trusted(
+        shopper_agent_id="s", merchant_agent_id="m", user_id="u",
+        line_items=[LineItem.trusted(description="Fare", unit_price=20)],
+    )
+
+    first.authorize("token")
+    first.add_line_item(LineItem.trusted(description="Bag", unit_price=5))
+
+    assert first.mandate_id != second.mandate_id
+    assert second.status == PaymentStatus.PENDING and second.user_authorization_token is None
+    assert (first.total_minor, second.total_minor) == (1500, 2000)
+
+
+def test_summary_follows_status_and_line_item_changes():
+    mandate = build(PaymentMandate.trusted, LineItem.trusted)
+    assert mandate.to_summary()["status"] == "pending"
+
+    mandate.cancel()
+    mandate.add_line_item(LineItem.trusted(description="Seat", unit_price=48.00))
+
+    summary = mandate.to_summary()
+    assert summary["status"] == "cancelled"
+    assert summary["total"] == "USD 1000.00"
+    assert summary["items"][-1] == "Seat x1 = USD 48.00"
+
+
+def test_cached_total_follows_line_item_changes():
+    mandate = build(PaymentMandate.trusted, LineItem.trusted)
+    assert mandate.total_minor == 95200
+
+    mandate.line_items = [LineItem.trusted(description="Fare", unit_price=100.00)]
+    assert mandate.total_minor == 10000
+
+    mandate.add_line_item(LineItem.trusted(description="Bag", unit_price=25.50, quantity=2))
+    assert mandate.total_minor == 15100
+    assert isinstance(mandate.line_items, tuple)
+
+
+def test_line_items_cannot_change_under_a_cached_total():
+    mandate = build(PaymentMandate, LineItem)
+    assert mandate.total_minor == 95200
+
+    with pytest.raises(ValidationError):
+        mandate.line_items[0].unit_price = 1
+    with pytest.raises(ValidationError):
+        mandate.line_items[0].quantity = 3
+    assert mandate.total_minor == 95200
@@ -0,0 +1,65 @@
+"""Money: exact minor-unit amounts and the batch totals used at settlement."""
+
+import pytest
+
+from shared.ap2_types import LineItem, PaymentMandate, mandate_totals
+from shared.money import Money, batch_totals, batch_totals_minor, sum_money
+
+
+def test_of_converts_floats_exactly():
+    assert Money.of(0.1).minor == 10
+    assert Money.of(850).minor == 85000
+    assert Money.of("0.005").minor == 1
+    assert sum_money(Money.of(0.1) for _ in range(1000)) == Money.of(100)
+
+
+def test_of_rejects_bad_amounts():
+    for bad in (True, "abc", float("nan"), float("inf")):
+        with pytest.raises((TypeError, ValueError)):
+            Money.of(bad)
+
+
+def test_parse_round_trips_str():
+    price = Money.of("952.00")
+    assert Money.parse(str(price)) == price
+    assert Money.parse("$1,234.50") == Money.of("1234.50")
+    with pytest.raises(ValueError):
+        Money.parse("USD 1 EUR")
+
+
+def test_mixed_currencies_are_refused():
+    with pytest.raises(ValueError):
+        Money.of(1) + Money.of(1, "EUR")
+    with pytest.raises(ValueError):
+        sum_money([Money.of(1, "EUR")])
+
+
+def test_batch_totals_match_sum_money():
+    np = pytest.importorskip("numpy")
+    groups = [[Money(c) for c in range(n)] for n in (0, 1, 5, 3)]
+
+    assert batch_totals(groups) == [sum_money(group) for group in groups]
+    totals = batch_totals_minor(np.asarray([1, 2, 3, 4, 5], dtype=np.int64), np.asarray([2, 0, 3]))
+    assert totals.tolist() == [3, 0, 12]
+    with pytest.raises(ValueError):
+        batch_totals([[Money(1, "EUR")]])
+
+
+def test_mandate_totals_match_and_cache_each_total():
+    mandates = [
+        PaymentMandate(
+            shopper_agent_id="test_shopper",
+            merchant_agent_id="flight_merchant_agent",
+            user_id="alice",
+            line_items=[LineItem(description="Fare", unit_price=price, quantity=2),
+                        LineItem(description="Taxes and fees", unit_price=0.1)],
+        )
+        for price in (850.00, 0.1, 1234.56)
+    ]
+    expected = [mandate.total_amount for mandate in mandates]
+    for mandate in mandates:
+        mandate._total_minor = None
+
+    assert mandate_totals(mandates) == expected
+    assert [mandate._total_minor for mandate in mandates] == [total.minor for total in expected]
+    assert mandate_totals([]) == []
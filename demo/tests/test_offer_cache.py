@@ -0,0 +1,111 @@
+"""Offer cache: stale-while-revalidate that never leaves a caller waiting forever."""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from shared.aio import run_sync
+from shopper_agent.offer_cache import OfferCache
+
+
+class Merchant:
+    """A fetch that counts its calls; each answer carries its call number."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        return {"status": "success", "call": call}
+
+
+def wait_until(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_stale_refresh_started_from_a_sync_caller_completes():
+    now = [0.0]
+    cache = OfferCache(fresh_for=1, stale_for=100, fetch_timeout=1, clock=lambda: now[0])
+    merchant = Merchant(delay=0.02)
+    run_sync(cache.get("k", merchant))
+
+    now[0] = 5
+    # run_sync's loop stops as soon as this returns; the refresh must not
+    response, served = run_sync(cache.get("k", merchant))
+    assert (response["call"], served) == (1, "stale")
+    assert wait_until(lambda: merchant.calls == 2 and not cache._fetching)
+
+    assert run_sync(cache.get("k", merchant)) == ({"status": "success", "call": 2}, "fresh")
+
+
+def test_miss_after_a_stale_refresh_does_not_hang():
+    now = [0.0]
+    cache = OfferCache(fresh_for=1, stale_for=100, fetch_timeout=1, clock=lambda: now[0])
+    merchant = Merchant()
+    run_sync(cache.get("k", merchant))
+    now[0] = 5
+    run_sync(cache.get("k", merchant))
+
+    now[0] = 1000
+    started = time.monotonic()
+    response, served = run_sync(cache.get("k", merchant))
+
+    assert served == "miss" and response["status"] == "success"
+    assert time.monotonic() - started < 1
+
+
+def test_waiter_gives_up_on_a_stuck_fetch():
+    cache = OfferCache(fetch_timeout=0.2)
+    # Registered by a caller that never finished
+    cache._fetching["k"] = concurrent.futures.Future()
+
+    started = time.monotonic()
+    response, served = run_sync(cache.get("k", Merchant()))
+
+    assert (response["call"], served) == (1, "miss")
+    assert time.monotonic() - started < 1
+    assert not cache._fetching
+
+
+def test_slow_merchant_times_out_and_clears_the_fetch():
+    cache = OfferCache(fetch_timeout=0.1)
+
+    async def hang() -> dict:
+        await asyncio.sleep(10)
+        return {"status": "success"}
+
+    try:
+        run_sync(cache.get("k", hang))
+    except asyncio.TimeoutError:
+        pass
+    else:
+        raise AssertionError("expected a timeout")
+    assert not cache._fetching
+    assert run_sync(cache.get("k", Merchant()))[1] == "miss"
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = OfferCache()
+    merchant = Merchant(delay=0.1)
+    results = []
+
+    def search() -> None:
+        results.append(run_sync(cache.get("k", merchant)))
+
+    threads = [threading.Thread(target=search) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert merchant.calls == 1
+    assert all(response["call"] == 1 for response, _ in results)
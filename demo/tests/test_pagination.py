@@ -0,0 +1,105 @@
+"""Paginated search: every page of an ordered result set, with no flight repeated or skipped."""
+
+import pytest
+
+from merchant_agent.catalog import FlightCatalog
+from merchant_agent.results import decode_cursor, encode_cursor, iter_sorted, sort_key
+
+try:
+    from merchant_agent.columnar import ColumnarFlightCatalog
+    import numpy  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    ColumnarFlightCatalog = None
+
+CATALOGS = [
+    FlightCatalog,
+    pytest.param(
+        ColumnarFlightCatalog,
+        marks=pytest.mark.skipif(ColumnarFlightCatalog is None, reason="numpy is not installed"),
+    ),
+]
+
+
+def pages(catalog, limit, **query):
+    offset, flights = 0, []
+    while True:
+        page, total = catalog.search_page(offset=offset, limit=limit, **query)
+        flights.extend(page)
+        offset += len(page)
+        if offset >= total or not page:
+            return flights, total
+
+
+@pytest.mark.parametrize("catalog_type", CATALOGS)
+@pytest.mark.parametrize("sort_by", ["price", "departure", "duration"])
+def test_pages_cover_a_tie_heavy_result_set_once(schedule, catalog_type, sort_by):
+    # Three prices for thousands of flights: nearly every row ties with others
+    flights = [dict(flight, origin="SFO", destination="CDG", seats_available=1)
+               for flight in schedule(2000, prices=(500.0, 700.0, 900.0))]
+    catalog = catalog_type(flights)
+
+    paged, total = pages(catalog, 37, origin="SFO", destination="CDG", sort_by=sort_by)
+
+    assert total == 2000
+    assert len({flight["flight_id"] for flight in paged}) == 2000
+    key = sort_key(sort_by)
+    assert [key(flight) for flight in paged] == sorted(key(flight) for flight in flights)
+
+
+@pytest.mark.parametrize("catalog_type", CATALOGS)
+def test_pages_follow_the_full_ordering(schedule, catalog_type):
+    catalog = catalog_type(schedule(2000, prices=(500.0, 700.0, 900.0)))
+    everything, total = catalog.search_page("SFO", "CDG", sort_by="price")
+
+    paged, _ = pages(catalog, 10, origin="SFO", destination="CDG", sort_by="price")
+
+    assert [flight["flight_id"] for flight in paged] == [flight["flight_id"] for flight in everything]
+    assert len(everything) == total
+
+
+@pytest.mark.parametrize("catalog_type", CATALOGS)
+def test_streamed_results_are_in_order(schedule, catalog_type):
+    catalog = catalog_type(schedule(1000))
+
+    streamed = list(catalog.iter_search("LAX", "LHR", sort_by="price"))
+
+    assert [flight["price"] for flight in streamed] == sorted(flight["price"] for flight in streamed)
+    assert len(streamed) == catalog.search_page("LAX", "LHR")[1]
+
+
+def test_iter_sorted_is_lazy():
+    consumed = []
+
+    def flights():
+        for price in (3.0, 1.0, 2.0):
+            consumed.append(price)
+            yield {"price": price}
+
+    first = next(iter_sorted(flights(), "price"))
+
+    assert first == {"price": 1.0}
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor(37)) == 37
+    for cursor in ("", "garbage", encode_cursor(0).replace("o", "x")):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+def test_search_flights_pages_with_cursors(merchant):
+    seen = []
+    cursor = None
+    while True:
+        response = merchant.search_flights("SFO", "CDG", sort_by="price", limit=1, cursor=cursor)
+        assert response["status"] == "success"
+        seen.extend(flight["flight_id"] for flight in response["flights"])
+        cursor = response["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == response["total_results"] == len(set(seen))
+    prices = [merchant.FLIGHT_CATALOG[flight_id]["price"] for flight_id in seen]
+    assert prices == sorted(prices)
+    assert merchant.search_flights("SFO", "CDG", sort_by="seat")["status"] == "error"
+    assert merchant.search_flights("SFO", "CDG", cursor="garbage")["status"] == "error"
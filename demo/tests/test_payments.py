@@ -0,0 +1,256 @@
+"""Settlement: one charge per mandate, and no payment declined on a guess."""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from merchant_agent.payments import AsyncPaymentProcessor, Charge, ProcessorError, StubPaymentProcessor
+from merchant_agent.pipeline import SettlementPipeline
+from shared.money import Money
+from shared.ap2_types import PaymentStatus
+
+
+class CountingProcessor(StubPaymentProcessor):
+    """Approves every charge, slowly, counting charges per mandate."""
+
+    def __init__(self, round_trip_seconds: float = 0.05):
+        super().__init__(round_trip_seconds=round_trip_seconds)
+        self.charged: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def charge_batch(self, charges):
+        with self._lock:
+            for charge in charges:
+                self.charged[charge.mandate_id] = self.charged.get(charge.mandate_id, 0) + 1
+        return super().charge_batch(charges)
+
+
+class LostReplyProcessor(StubPaymentProcessor):
+    """Captures the first round trip's charges, then loses the answer."""
+
+    def __init__(self):
+        super().__init__()
+        self.captured = None
+
+    def charge_batch(self, charges):
+        results = super().charge_batch(charges)
+        if self.captured is None:
+            self.captured = results
+            raise ProcessorError("timed out")
+        return results
+
+
+def reconcile(merchant, mandate_id: str) -> None:
+    """Run the sweep once mandate_id's reconciliation is due."""
+    merchant.MANDATE_EXPIRY.schedule(mandate_id, merchant.MANDATE_EXPIRY.now())
+    merchant.expire_stale_mandates()
+
+
+def test_concurrent_payments_charge_once(merchant, booking):
+    processor = merchant.PAYMENT_PROCESSOR = CountingProcessor()
+    mandate_id, token = booking()
+
+    results = []
+    barrier = threading.Barrier(8)
+
+    def pay():
+        barrier.wait()
+        results.append(merchant.process_authorized_payment(mandate_id, token))
+
+    threads = [threading.Thread(target=pay) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert processor.charged == {mandate_id: 1}
+    assert [result["status"] for result in results] == ["success"] * 8
+    assert len({result["booking"]["booking_id"] for result in results}) == 1
+
+
+def test_retry_after_payment_replays_receipt(merchant, booking):
+    processor = merchant.PAYMENT_PROCESSOR = CountingProcessor(round_trip_seconds=0)
+    mandate_id, token = booking()
+
+    first = merchant.process_authorized_payment(mandate_id, token)
+    retry = merchant.process_authorized_payment(mandate_id, token)
+
+    assert processor.charged == {mandate_id: 1}
+    assert retry["booking"] == first["booking"]
+    assert retry["idempotent_replay"] is True
+
+
+def test_retry_with_another_idempotency_key_is_refused(merchant, booking):
+    merchant.PAYMENT_PROCESSOR = CountingProcessor(round_trip_seconds=0)
+    mandate_id, token = booking()
+    merchant.process_authorized_payment(mandate_id, token, idempotency_key="first")
+
+    retry = merchant.process_authorized_payment(mandate_id, token, idempotency_key="second")
+
+    assert retry["status"] == "error"
+    assert "different idempotency key" in retry["message"]
+
+
+def test_batch_settlement_does_not_charge_paid_mandates_again(merchant, booking):
+    processor = merchant.PAYMENT_PROCESSOR = CountingProcessor(round_trip_seconds=0)
+    payments = [booking() for _ in range(3)]
+    merchant.process_authorized_payment(*payments[0])
+
+    result = merchant.process_authorized_payments(
+        [{"mandate_id": mandate_id, "authorization_token": token} for mandate_id, token in payments]
+    )
+
+    # The paid mandate's receipt is replayed
+    assert result["settled"] == 3
+    assert processor.charged == {mandate_id: 1 for mandate_id, _ in payments}
+
+
+def test_lost_answer_leaves_the_payment_processing_until_reconciled(merchant, booking):
+    processor = merchant.PAYMENT_PROCESSOR = LostReplyProcessor()
+    mandate_id, token = booking()
+    seats = merchant.SEAT_INVENTORY.available("FL004")
+
+    result = merchant.process_authorized_payment(mandate_id, token)
+
+    # Not declined: the seat stays sold and nothing is restocked
+    assert result["status"] == "processing"
+    assert merchant.MANDATE_STORE.get_mandate(mandate_id).status == PaymentStatus.PROCESSING
+    assert merchant.SEAT_INVENTORY.available("FL004") == seats
+
+    reconcile(merchant, mandate_id)
+
+    receipt = merchant.get_payment_status(mandate_id)
+    assert receipt["status"] == "success"
+    assert receipt["ap2_receipt"]["transaction_id"] == processor.captured[0].transaction_id
+    assert merchant.process_authorized_payment(mandate_id, token)["idempotent_replay"] is True
+    assert merchant.SEAT_INVENTORY.available("FL004") == seats
+
+
+def test_lost_batch_answer_is_reconciled_in_one_round_trip(merchant, booking):
+    processor = merchant.PAYMENT_PROCESSOR = LostReplyProcessor()
+    payments = [booking() for _ in range(3)]
+
+    result = merchant.process_authorized_payments(
+        [{"mandate_id": mandate_id, "authorization_token": token} for mandate_id, token in payments]
+    )
+
+    assert (result["settled"], result["processing"], result["failed"]) == (0, 3, 0)
+    rounds = processor.round_trips
+    for mandate_id, _ in payments:
+        merchant.MANDATE_EXPIRY.schedule(mandate_id, merchant.MANDATE_EXPIRY.now())
+    merchant.expire_stale_mandates()
+
+    assert processor.round_trips == rounds + 1
+    transactions = [merchant.get_payment_status(mandate_id)["ap2_receipt"]["transaction_id"] for mandate_id, _ in payments]
+    assert transactions == [answer.transaction_id for answer in processor.captured]
+
+
+class BrokenProcessor(AsyncPaymentProcessor):
+    def __init__(self, error: Exception):
+        self.error = error
+        self.round_trips = 0
+
+    async def charge_batch(self, charges):
+        self.round_trips += 1
+        raise self.error
+
+
+@pytest.mark.parametrize("error", [ProcessorError("processor down"), RuntimeError("bad reply")])
+def test_pipeline_reports_failed_round_trips_as_unknown(error):
+    processor = BrokenProcessor(error)
+    pipeline = SettlementPipeline(processor, retries=1, retry_backoff=0)
+    charge = Charge("MND-1", Money.of(10), "token", "MND-1")
+
+    try:
+        result = pipeline.submit(charge).result(timeout=5)
+    finally:
+        pipeline.stop()
+
+    assert result.unknown and not result.approved
+    # Outages are retried; other errors would fail the same way again
+    assert processor.round_trips == (2 if isinstance(error, ProcessorError) else 1)
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_submitted_payment_is_confirmed(merchant, booking):
+    mandate_id, token = booking()
+
+    assert merchant.submit_authorized_payment(mandate_id, token)["status"] == "processing"
+
+    assert _wait_for(lambda: merchant.MANDATE_STORE.get_mandate(mandate_id).status == PaymentStatus.COMPLETED)
+    assert merchant.get_payment_status(mandate_id)["status"] == "success"
+
+
+def test_submitted_payment_is_reconciled_when_recording_fails(merchant, booking, monkeypatch):
+    record = merchant._record_submitted_payment
+    answers = []
+
+    def broken_once(idempotency_key, charge, outcome):
+        answers.append(outcome)
+        if len(answers) == 1:
+            raise RuntimeError("store unavailable")
+        record(idempotency_key, charge, outcome)
+
+    monkeypatch.setattr(merchant, "_record_submitted_payment", broken_once)
+    mandate_id, token = booking()
+    seats = merchant.SEAT_INVENTORY.available("FL004")
+
+    merchant.submit_authorized_payment(mandate_id, token, idempotency_key="client-key")
+
+    # The answer was lost with the failed write: still processing, seat still sold
+    assert _wait_for(lambda: mandate_id in merchant.UNRESOLVED_PAYMENTS)
+    assert merchant.MANDATE_STORE.get_mandate(mandate_id).status == PaymentStatus.PROCESSING
+    assert merchant.SEAT_INVENTORY.available("FL004") == seats
+
+    reconcile(merchant, mandate_id)
+
+    assert _wait_for(lambda: merchant.MANDATE_STORE.get_receipt(mandate_id) is not None)
+    key, receipt = merchant.MANDATE_STORE.get_receipt(mandate_id)
+    assert key == "client-key"
+    # Resent under the same idempotency key: the original capture, not a new one
+    assert receipt["ap2_receipt"]["transaction_id"] == answers[0].transaction_id
+    assert merchant.SEAT_INVENTORY.available("FL004") == seats
+
+
+def test_processing_payment_left_by_a_restart_is_reconciled(merchant, booking):
+    merchant.PAYMENT_PROCESSOR = CountingProcessor(round_trip_seconds=0)
+    mandate_id, _ = booking()
+    store = merchant.MANDATE_STORE
+    # A previous run claimed the mandate, then died before the processor answered
+    mandate = store.get_mandate(mandate_id)
+    mandate.authorize("lost")
+    mandate.authorization_timestamp = datetime.utcnow() - timedelta(hours=1)
+    mandate.status = PaymentStatus.PROCESSING
+    assert store.transition_mandate(mandate, PaymentStatus.PENDING)
+    merchant.SEAT_INVENTORY.commit(mandate_id)
+    seats = merchant.SEAT_INVENTORY.available("FL004")
+
+    merchant.restore_merchant_state()
+    merchant.expire_stale_mandates()
+
+    assert store.get_mandate(mandate_id).status == PaymentStatus.COMPLETED
+    assert store.get_receipt(mandate_id)[0] == mandate_id
+    assert merchant.SEAT_INVENTORY.available("FL004") == seats
+
+
+@pytest.mark.parametrize("attempts", [2, 8])
+def test_only_one_claim_wins(merchant, booking, attempts):
+    mandate_id, _ = booking()
+    store = merchant.MANDATE_STORE
+
+    def claim() -> bool:
+        mandate = store.get_mandate(mandate_id)
+        mandate.status = PaymentStatus.PROCESSING
+        return store.transition_mandate(mandate, PaymentStatus.PENDING)
+
+    assert sum(claim() for _ in range(attempts)) == 1
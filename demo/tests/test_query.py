@@ -0,0 +1,92 @@
+"""Filter plans: normalized once, hashable, and compiled to the same answers as a plain scan."""
+
+import pytest
+
+from merchant_agent.query import FilterPlan, day_ordinal
+
+
+def scan(flights: list[dict], date=None, travel_class=None, max_price=None) -> list[str]:
+    """Brute-force reference for a plan's row tests."""
+    return [
+        flight["flight_id"] for flight in flights
+        if (not date or flight["departure"].startswith(date))
+        and (not travel_class or flight["class"] == travel_class.lower())
+        and (not max_price or flight["price"] <= max_price)
+        and flight["seats_available"] > 0
+    ]
+
+
+def test_equivalent_searches_make_equal_plans():
+    plan = FilterPlan.from_query(" sfo", "CDG ", date=" 2025-03 ", travel_class="Economy", max_price=900)
+
+    assert plan == FilterPlan.from_query("SFO", "cdg", date="2025-03", travel_class="economy", max_price=900.0)
+    assert hash(plan) == hash(FilterPlan.from_query("SFO", "CDG", "2025-03", "economy", 900))
+    assert plan.route == ("SFO", "CDG")
+    # Empty filters (and a max_price of 0) mean none
+    assert FilterPlan.from_query("SFO", "CDG", date="", travel_class=" ", max_price=0) == FilterPlan.from_query("SFO", "CDG")
+
+
+@pytest.mark.parametrize("date, first, end", [
+    ("2025", "2025-01-01", "2026-01-01"),
+    ("2025-12", "2025-12-01", "2026-01-01"),
+    ("2025-02", "2025-02-01", "2025-03-01"),
+    ("2025-03-15", "2025-03-15", "2025-03-16"),
+])
+def test_dates_become_day_ranges(date, first, end):
+    plan = FilterPlan.from_query("SFO", "CDG", date=date)
+
+    assert plan.days == (day_ordinal(f"{first} 00:00"), day_ordinal(f"{end} 00:00"))
+    assert plan.single_day == (len(date) == 10)
+
+
+@pytest.mark.parametrize("date", ["2025-03-1", "2025-13", "march"])
+def test_irregular_dates_fall_back_to_prefix_matching(date):
+    plan = FilterPlan.from_query("SFO", "CDG", date=date)
+    flight = {"departure": "2025-03-15 10:00", "class": "economy", "price": 850.0, "seats_available": 1}
+
+    assert plan.days is None
+    assert plan.compile()(flight, day_ordinal(flight["departure"])) == flight["departure"].startswith(date)
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"date": "2025-03"},
+    {"date": "2025-04-02"},
+    {"date": "2025-03-1"},
+    {"travel_class": "Business"},
+    {"max_price": 1000},
+    {"date": "2025", "travel_class": "first", "max_price": 1500},
+])
+def test_compiled_plan_matches_a_scan(schedule, filters):
+    flights = schedule(500)
+    plan = FilterPlan.from_query("SFO", "CDG", **filters)
+    matches = plan.compile()
+
+    assert [f["flight_id"] for f in flights if matches(f, day_ordinal(f["departure"]))] == scan(flights, **filters)
+
+
+def test_guaranteed_filters_are_left_out():
+    plan = FilterPlan.from_query("SFO", "CDG", date="2025-03-15", travel_class="economy", max_price=900)
+
+    assert len(plan.terms()) == 4
+    assert len(plan.terms(frozenset({"date", "class"}))) == 2
+    assert plan.terms(frozenset({"date", "class", "max_price", "seats"})) == []
+    assert plan.compile(frozenset({"date", "class", "max_price", "seats"}))({}, 0) is True
+
+
+def test_compiled_plans_are_cached():
+    plan = FilterPlan.from_query("SFO", "CDG", travel_class="economy", max_price=900)
+
+    assert plan.compile() is FilterPlan.from_query("sfo", "cdg", travel_class="ECONOMY", max_price=900).compile()
+
+
+def test_could_match_ignores_seats():
+    plan = FilterPlan.from_query("SFO", "CDG", date="2025-03", travel_class="economy")
+    flight = {
+        "origin": "sfo", "destination": "CDG", "departure": "2025-03-15 10:00",
+        "class": "economy", "price": 850.0, "seats_available": 0,
+    }
+
+    assert plan.could_match(flight)
+    assert not plan.could_match({**flight, "class": "first"})
+    assert not plan.could_match({**flight, "destination": "LHR"})
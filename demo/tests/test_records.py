@@ -0,0 +1,70 @@
+"""Compact records: lossless round trips, and a compact store that behaves like the plain one."""
+
+from datetime import datetime
+
+import pytest
+
+from merchant_agent.store import InMemoryMandateStore
+from shared.ap2_types import LineItem, PaymentMandate, PaymentStatus
+from shared.records import LineItemRecord, MandateRecord
+
+
+def make_mandate(**changes) -> PaymentMandate:
+    mandate = PaymentMandate(
+        shopper_agent_id="test_shopper",
+        merchant_agent_id="flight_merchant_agent",
+        user_id="alice",
+        line_items=[
+            LineItem(description="Flight FL001: SFO → CDG", unit_price=850.10, quantity=2),
+            LineItem(description="Taxes and fees", unit_price=102.00),
+        ],
+        merchant_reference="FL001",
+        description="Flight booking",
+        **changes,
+    )
+    mandate.set_ttl(900)
+    return mandate
+
+
+@pytest.mark.parametrize("status", list(PaymentStatus))
+def test_mandate_round_trips(status):
+    mandate = make_mandate(status=status)
+    if status != PaymentStatus.PENDING:
+        mandate.authorize("token")
+
+    record = MandateRecord.from_model(mandate)
+    restored = record.to_model()
+
+    assert restored == mandate
+    assert restored is not record.to_model()
+    assert record.total_amount == mandate.total_amount
+    assert record.total_minor == 85010 * 2 + 10200
+
+
+def test_records_are_compact_and_share_repeated_strings():
+    first = MandateRecord.from_model(make_mandate())
+    second = MandateRecord.from_model(make_mandate())
+
+    assert not hasattr(first, "__dict__")
+    assert first.merchant_agent_id is second.merchant_agent_id
+    assert first.line_items[0].currency is second.line_items[0].currency
+    assert first.line_items[0] == LineItemRecord("Flight FL001: SFO → CDG", 2, 85010, "USD")
+    with pytest.raises(AttributeError):
+        first.status = PaymentStatus.FAILED
+
+
+def test_compact_store_keeps_settled_mandates_as_records():
+    store = InMemoryMandateStore(compact_settled=True)
+    pending = make_mandate(created_at=datetime(2025, 3, 1))
+    settled = make_mandate(created_at=datetime(2025, 3, 2))
+    store.save_mandate(pending)
+    settled.status = PaymentStatus.COMPLETED
+    store.save_mandate(settled)
+
+    assert store.get_mandate(pending.mandate_id) is pending
+    assert isinstance(store.mandates[settled.mandate_id], MandateRecord)
+    assert store.get_mandate(settled.mandate_id) == settled
+    # Each read of a settled mandate is a fresh copy
+    assert store.get_mandate(settled.mandate_id) is not store.get_mandate(settled.mandate_id)
+    assert [m.mandate_id for m in store.find_mandates(user_id="alice")] == [settled.mandate_id, pending.mandate_id]
+    assert store.count_mandates(status=PaymentStatus.COMPLETED) == 1
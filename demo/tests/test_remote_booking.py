@@ -0,0 +1,79 @@
+"""Booking over A2A: a merchant's mandate reply is checked before the user is asked to pay."""
+
+import asyncio
+
+import pytest
+
+from shopper_agent import agent as shopper
+from shopper_agent.a2a_client import A2AError
+
+
+class FakeClient:
+    """Answers create_booking_mandate with a canned reply (or raises it)."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    async def call_tool(self, name, arguments, idempotent=True):
+        self.calls.append((name, arguments, idempotent))
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply
+
+
+def book(reply) -> dict:
+    return asyncio.run(shopper._book_with_remote_merchant(FakeClient(reply), "FL001", "Ada"))
+
+
+MANDATE = {
+    "mandate_id": "MND-1",
+    "merchant": "flight_merchant_agent",
+    "total": "EUR 952.00",
+    "items": ["Flight FL001: SFO → CDG - EUR 850.00", "Taxes and fees - EUR 102.00"],
+    "status": "pending",
+}
+
+
+def test_valid_mandate_is_passed_on():
+    booked = book({"status": "success", "mandate": MANDATE, "expires_at": "2025-03-01T00:15:00"})
+
+    assert booked["status"] == "mandate_created"
+    assert booked["mandate_id"] == "MND-1"
+    assert booked["payment"] == {"total": "EUR 952.00", "currency": "EUR"}
+    assert booked["line_items"] == MANDATE["items"]
+
+
+@pytest.mark.parametrize("reply", [
+    None,
+    ["not", "a", "dict"],
+    {"status": "success"},
+    {"status": "success", "mandate": "MND-1"},
+    {"status": "success", "mandate": {**MANDATE, "mandate_id": None}},
+    {"status": "success", "mandate": {key: value for key, value in MANDATE.items() if key != "merchant"}},
+    {"status": "success", "mandate": {**MANDATE, "total": "lots"}},
+    {"status": "success", "mandate": {**MANDATE, "total": 952.0}},
+    {"status": "success", "mandate": {**MANDATE, "items": "Flight FL001"}},
+    {"status": "success", "mandate": {**MANDATE, "items": [{"description": "Flight FL001"}]}},
+])
+def test_malformed_reply_is_an_error(reply):
+    booked = book(reply)
+
+    assert booked["status"] == "error"
+    assert "Unreadable" in booked["message"]
+
+
+def test_merchant_errors_are_passed_on():
+    assert book({"status": "error", "message": "No seats available"}) == {
+        "status": "error",
+        "message": "No seats available",
+    }
+    assert "Merchant unavailable" in book(A2AError("connection refused"))["message"]
+
+
+def test_booking_is_never_retried():
+    client = FakeClient({"status": "success", "mandate": MANDATE})
+
+    asyncio.run(shopper._book_with_remote_merchant(client, "FL001", "Ada"))
+
+    assert [(name, idempotent) for name, _, idempotent in client.calls] == [("create_booking_mandate", False)]
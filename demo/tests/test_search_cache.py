@@ -0,0 +1,97 @@
+"""Search cache: LRU eviction, TTL expiry, and seat changes dropping only affected entries."""
+
+from merchant_agent.query import FilterPlan
+from merchant_agent.search_cache import SearchCache
+
+
+FLIGHT = {
+    "flight_id": "FL001",
+    "origin": "SFO",
+    "destination": "CDG",
+    "departure": "2025-03-15 10:00",
+    "class": "economy",
+    "price": 850.0,
+    "seats_available": 0,
+}
+
+
+def plan(origin: str = "SFO", destination: str = "CDG", **filters) -> FilterPlan:
+    return FilterPlan.from_query(origin, destination, **filters)
+
+
+def cached(cache: SearchCache, key: FilterPlan) -> bool:
+    """Whether key is served from the cache (a miss then caches an empty result)."""
+    hits = cache.hits
+    cache.get_or_search(key, list)
+    return cache.hits > hits
+
+
+def test_hit_returns_the_stored_results():
+    cache = SearchCache()
+    flights = [FLIGHT]
+    calls = []
+
+    def search():
+        calls.append(1)
+        return flights
+
+    assert cache.get_or_search(plan(), search) is flights
+    assert cache.get_or_search(plan(" sfo ", "cdg"), search) is flights
+    assert len(calls) == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SearchCache(max_entries=2)
+    for date in ("2025-03-01", "2025-03-02"):
+        cache.get_or_search(plan(date=date), list)
+    cache.get_or_search(plan(date="2025-03-01"), list)
+    cache.get_or_search(plan(date="2025-03-03"), list)
+
+    assert cache.evictions == 1
+    assert cached(cache, plan(date="2025-03-01"))
+    assert not cached(cache, plan(date="2025-03-02"))
+
+
+def test_entries_expire_after_the_ttl():
+    now = [0.0]
+    cache = SearchCache(ttl=30, clock=lambda: now[0])
+    cache.get_or_search(plan(), list)
+
+    now[0] = 29
+    assert cached(cache, plan())
+    now[0] = 31
+    assert not cached(cache, plan())
+    assert cache.expirations == 1
+
+
+def test_seat_change_drops_only_searches_that_could_include_the_flight():
+    cache = SearchCache()
+    affected = [plan(), plan(date="2025-03"), plan(travel_class="economy"), plan(max_price=900)]
+    unaffected = [plan(date="2025-04"), plan(travel_class="first"), plan(max_price=500), plan("LAX", "CDG")]
+    for key in affected + unaffected:
+        cache.get_or_search(key, list)
+
+    assert cache.invalidate_flight(FLIGHT) == len(affected)
+    assert [cached(cache, key) for key in unaffected] == [True] * len(unaffected)
+    assert [cached(cache, key) for key in affected] == [False] * len(affected)
+
+
+def test_search_racing_a_seat_change_is_not_cached():
+    cache = SearchCache()
+
+    def search():
+        cache.invalidate_flight(FLIGHT)
+        return [FLIGHT]
+
+    cache.get_or_search(plan(), search)
+
+    assert len(cache) == 0
+
+
+def test_zero_entries_disables_caching():
+    cache = SearchCache(max_entries=0)
+    cache.get_or_search(plan(), list)
+
+    assert len(cache) == 0
+    assert cache.stats()["approx_bytes"] == 0
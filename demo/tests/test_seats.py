@@ -0,0 +1,138 @@
+"""Seat inventory: a flight is never sold past its last seat, however many workers or restarts."""
+
+import copy
+import threading
+import time
+
+import pytest
+
+from merchant_agent.catalog import FlightCatalog
+from merchant_agent.seats import HoldExpiredError, SeatInventory, SeatUnavailableError
+from merchant_agent.store import SQLiteMandateStore
+
+FLIGHT = {
+    "flight_id": "FL100",
+    "airline": "Test Air",
+    "origin": "SFO",
+    "destination": "CDG",
+    "departure": "2025-03-15 10:00",
+    "arrival": "2025-03-16 06:00",
+    "duration": "11h",
+    "price": 850.0,
+    "class": "economy",
+    "seats_available": 8,
+}
+
+
+def local_inventory(clock=time.monotonic) -> SeatInventory:
+    """A single process's inventory, with no shared ledger and one-minute holds."""
+    return SeatInventory(FlightCatalog([copy.deepcopy(FLIGHT)]), hold_ttl=60, clock=clock)
+
+
+def worker(path: str) -> tuple[SQLiteMandateStore, SeatInventory]:
+    """One merchant process: its own store connection, catalog and inventory."""
+    store = SQLiteMandateStore(path)
+    return store, SeatInventory(FlightCatalog([copy.deepcopy(FLIGHT)]), ledger=store)
+
+
+def hold_all(inventory: SeatInventory, prefix: str, attempts: int) -> int:
+    held = 0
+    for i in range(attempts):
+        try:
+            inventory.hold("FL100", f"{prefix}-{i}")
+            held += 1
+        except SeatUnavailableError:
+            pass
+    return held
+
+
+def test_workers_sharing_a_store_never_oversell(tmp_path):
+    path = str(tmp_path / "merchant.db")
+    workers = [worker(path) for _ in range(3)]
+    held = [0] * len(workers)
+
+    def sell(n: int) -> None:
+        held[n] = hold_all(workers[n][1], f"w{n}", 10)
+
+    threads = [threading.Thread(target=sell, args=(n,)) for n in range(len(workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(held) == FLIGHT["seats_available"]
+    assert workers[0][0].load_seats() == {"FL100": 0}
+
+
+def test_restart_does_not_resell_held_seats(tmp_path):
+    path = str(tmp_path / "merchant.db")
+    store, inventory = worker(path)
+    assert hold_all(inventory, "first", 5) == 5
+    inventory.commit("first-0")
+    store.close()
+
+    # A restarted process starts from the catalog's original count
+    store, inventory = worker(path)
+    assert hold_all(inventory, "second", 10) == 3
+    assert inventory.available("FL100") == 0
+    store.close()
+
+
+def test_release_returns_the_seat_to_every_worker(tmp_path):
+    path = str(tmp_path / "merchant.db")
+    (_, first), (_, second) = worker(path), worker(path)
+    assert hold_all(first, "a", 8) == 8
+    with pytest.raises(SeatUnavailableError):
+        second.hold("FL100", "b-0")
+
+    # Any worker may release a hold another one placed
+    second.release("a-3")
+
+    second.hold("FL100", "b-0")
+    with pytest.raises(SeatUnavailableError):
+        first.hold("FL100", "a-8")
+
+
+def test_concurrent_holds_never_oversell():
+    inventory = local_inventory()
+    held = [0] * 8
+    barrier = threading.Barrier(len(held))
+
+    def sell(n: int) -> None:
+        barrier.wait()
+        held[n] = hold_all(inventory, f"t{n}", 5)
+
+    threads = [threading.Thread(target=sell, args=(n,)) for n in range(len(held))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(held) == FLIGHT["seats_available"]
+    assert inventory.available("FL100") == 0
+
+
+def test_lapsed_hold_goes_back_on_sale():
+    now = [0.0]
+    inventory = local_inventory(clock=lambda: now[0])
+    inventory.hold("FL100", "late")
+    inventory.hold("FL100", "expired")
+
+    now[0] = 61
+    with pytest.raises(HoldExpiredError):
+        inventory.commit("late")
+    assert [hold.mandate_id for hold in inventory.release_expired()] == ["expired"]
+
+    assert inventory.available("FL100") == FLIGHT["seats_available"]
+
+
+def test_cancelled_mandate_releases_its_seat(merchant, user):
+    user_id, _ = user
+    seats = merchant.SEAT_INVENTORY.available("FL001")
+    created = merchant.create_booking_mandate("FL001", "Test Passenger", "test_shopper", user_id)
+    assert merchant.SEAT_INVENTORY.available("FL001") == seats - 1
+
+    assert merchant.cancel_booking_mandate(created["mandate_id"])["status"] == "success"
+
+    assert merchant.SEAT_INVENTORY.available("FL001") == seats
+    assert merchant.cancel_booking_mandate(created["mandate_id"])["status"] == "error"
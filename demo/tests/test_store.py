@@ -0,0 +1,233 @@
+"""Mandate stores: every backend keeps mandates, bookings and receipts the same way."""
+
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from merchant_agent.store import (
+    DuplicateReceiptError,
+    InMemoryMandateStore,
+    JournaledMandateStore,
+    MandateStore,
+    SQLiteMandateStore,
+)
+from shared.ap2_types import LineItem, PaymentMandate, PaymentStatus
+
+
+def make_mandate(i: int) -> PaymentMandate:
+    mandate = PaymentMandate.trusted(
+        mandate_id=str(uuid.UUID(int=i)),
+        shopper_agent_id="test_shopper",
+        merchant_agent_id="flight_merchant_agent",
+        user_id=f"user_{i % 10}",
+        line_items=[LineItem.trusted(description="Flight FL001: SFO → CDG", unit_price=850.00)],
+        created_at=datetime(2025, 3, 1) + timedelta(seconds=i),
+        merchant_reference="FL001",
+        description="Flight booking",
+    )
+    mandate.set_ttl(900)
+    return mandate
+
+
+def settle(store: MandateStore, i: int) -> None:
+    """Create, pay and book mandate i."""
+    mandate = make_mandate(i)
+    store.save_mandate(mandate)
+    with store.batch():
+        mandate.status = PaymentStatus.COMPLETED
+        store.save_mandate(mandate)
+        store.save_booking({"booking_id": f"BK{i:08d}", "mandate_id": mandate.mandate_id})
+        store.save_receipt(mandate.mandate_id, f"idem_{i}", {"status": "success"})
+
+
+@pytest.fixture(params=["memory", "journal", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = InMemoryMandateStore()
+    elif request.param == "journal":
+        store = JournaledMandateStore(str(tmp_path / "merchant.journal"), fsync=False)
+    else:
+        store = SQLiteMandateStore(str(tmp_path / "merchant.db"))
+    yield store
+    if hasattr(store, "close"):
+        store.close()
+
+
+def test_mandates_bookings_and_receipts_round_trip(store):
+    settle(store, 1)
+    mandate_id = make_mandate(1).mandate_id
+
+    loaded = store.get_mandate(mandate_id)
+    assert loaded.status == PaymentStatus.COMPLETED
+    assert loaded.total_amount == make_mandate(1).total_amount
+    assert store.get_booking("BK00000001") == {"booking_id": "BK00000001", "mandate_id": mandate_id}
+    assert store.find_bookings([mandate_id]) == [store.get_booking("BK00000001")]
+    assert store.get_receipt(mandate_id) == ("idem_1", {"status": "success"})
+    assert store.get_mandate("missing") is None and store.get_receipt("missing") is None
+
+
+def test_receipts_are_write_once(store):
+    settle(store, 1)
+
+    with pytest.raises(DuplicateReceiptError):
+        store.save_receipt(make_mandate(1).mandate_id, "other", {"status": "success"})
+    assert store.get_receipt(make_mandate(1).mandate_id)[0] == "idem_1"
+
+
+def test_failed_batch_saves_nothing(store):
+    kept = make_mandate(1)
+    store.save_mandate(kept)
+
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.save_mandate(make_mandate(2))
+            store.evict_mandate(kept.mandate_id)
+            raise RuntimeError("fail mid-batch")
+
+    assert store.get_mandate(make_mandate(2).mandate_id) is None
+    assert store.get_mandate(kept.mandate_id) is not None
+
+
+def test_nested_batches_commit_with_the_outermost(store):
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            with store.batch():
+                store.save_mandate(make_mandate(1))
+            raise RuntimeError("fail after the inner batch")
+
+    assert store.get_mandate(make_mandate(1).mandate_id) is None
+
+
+def test_claim_is_compare_and_set(store):
+    mandate = make_mandate(1)
+    store.save_mandate(mandate)
+    wins = []
+    barrier = threading.Barrier(6)
+
+    def claim() -> None:
+        claimed = store.get_mandate(mandate.mandate_id)
+        claimed.status = PaymentStatus.PROCESSING
+        barrier.wait()
+        wins.append(store.transition_mandate(claimed, PaymentStatus.PENDING))
+
+    threads = [threading.Thread(target=claim) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert wins.count(True) == 1
+
+
+def test_find_and_count_through_the_indexes(store):
+    for i in range(30):
+        store.save_mandate(make_mandate(i))
+    for i in range(0, 30, 3):
+        settle(store, i)
+
+    # Newest first; a settled mandate moved from the pending index to the completed one
+    found = store.find_mandates(user_id="user_3", status=PaymentStatus.PENDING)
+    assert [mandate.mandate_id for mandate in found] == [make_mandate(i).mandate_id for i in (23, 13)]
+    assert store.count_mandates(user_id="user_3", status=PaymentStatus.PENDING) == 2
+    assert store.count_mandates(user_id="user_3", status=PaymentStatus.COMPLETED) == 1
+    assert store.count_mandates(status=PaymentStatus.COMPLETED, merchant_reference="FL001") == 10
+    assert store.count_mandates(shopper_agent_id="test_shopper") == 30
+    assert store.count_mandates(merchant_reference="FL999") == 0
+
+    latest = store.find_mandates(status=PaymentStatus.COMPLETED, limit=3)
+    assert [mandate.mandate_id for mandate in latest] == [make_mandate(i).mandate_id for i in (27, 24, 21)]
+
+
+def test_find_bookings_keeps_the_requested_order(store):
+    for i in (1, 2, 3):
+        settle(store, i)
+    store.save_mandate(make_mandate(4))
+
+    mandate_ids = [make_mandate(i).mandate_id for i in (3, 4, 1)]
+
+    assert [booking["booking_id"] for booking in store.find_bookings(mandate_ids)] == ["BK00000003", "BK00000001"]
+
+
+def test_sqlite_claim_across_connections(tmp_path):
+    path = str(tmp_path / "merchant.db")
+    first, second = SQLiteMandateStore(path), SQLiteMandateStore(path)
+    mandate = make_mandate(1)
+    first.save_mandate(mandate)
+
+    claims = []
+    for store in (first, second):
+        claimed = store.get_mandate(mandate.mandate_id)
+        claimed.status = PaymentStatus.PROCESSING
+        claims.append(store.transition_mandate(claimed, PaymentStatus.PENDING))
+
+    assert claims == [True, False]
+
+
+def test_sqlite_store_survives_a_restart(tmp_path):
+    path = str(tmp_path / "merchant.db")
+    store = SQLiteMandateStore(path)
+    settle(store, 1)
+    store.save_mandate(make_mandate(2))
+    store.close()
+
+    store = SQLiteMandateStore(path)
+    assert store.get_mandate(make_mandate(1).mandate_id).status == PaymentStatus.COMPLETED
+    assert store.get_mandate(make_mandate(2).mandate_id) == make_mandate(2)
+    assert store.get_receipt(make_mandate(1).mandate_id) is not None
+    store.close()
+
+
+def test_journal_store_survives_a_restart(tmp_path):
+    path = str(tmp_path / "merchant.journal")
+    store = JournaledMandateStore(path, fsync=False)
+    settle(store, 1)
+    pending = make_mandate(2)
+    store.save_mandate(pending)
+    pending.authorize("token")
+    store.save_mandate(pending)
+    store.close()
+
+    store = JournaledMandateStore(path, fsync=False)
+    assert store.get_mandate(make_mandate(1).mandate_id).status == PaymentStatus.COMPLETED
+    assert store.get_mandate(pending.mandate_id) == pending
+    assert store.get_receipt(make_mandate(1).mandate_id) == ("idem_1", {"status": "success"})
+    assert [booking["booking_id"] for booking in store.bookings.values()] == ["BK00000001"]
+    store.close()
+
+
+def test_journal_restart_after_snapshot(tmp_path):
+    path = str(tmp_path / "merchant.journal")
+    store = JournaledMandateStore(path, fsync=False)
+    for i in range(20):
+        settle(store, i)
+    pending = make_mandate(100)
+    store.save_mandate(pending)
+    store.save_seats("FL001", 7)
+    store.snapshot()
+    settle(store, 20)
+    store.close()
+
+    store = JournaledMandateStore(path, fsync=False)
+    # Only live mandates and the tail are loaded at startup
+    assert [m.mandate_id for m in store.find_mandates(status=PaymentStatus.PENDING)] == [pending.mandate_id]
+    assert store.get_receipt(pending.mandate_id) is None
+    assert len(store.mandates) == 2
+
+    # Settled history comes back from the cold segment on demand
+    assert store.count_mandates(status=PaymentStatus.COMPLETED) == 21
+    assert store.get_receipt(make_mandate(3).mandate_id) is not None
+    assert store.load_seats() == {"FL001": 7}
+    store.close()
+
+
+def test_journal_seat_counts_survive_a_crash(tmp_path):
+    path = str(tmp_path / "merchant.journal")
+    store = JournaledMandateStore(path, fsync=False)
+    store.save_seats("FL001", 7)
+
+    # Read back without closing the first store, as after a crash
+    assert JournaledMandateStore(path, fsync=False).load_seats() == {"FL001": 7}
+    assert os.path.getsize(path) > 0